@@ -50,6 +50,7 @@ from .course import courses_from_this_school, Course, UndergraduateCourse, \
 from .employee import UndergraduateStudent, MastersStudent, DoctoralStudent, \
     Postdoc, VisitingProfessor, ThesisCommittee, DissertationCommittee, \
     Collaborator, write_Collaborators_table
+from .coa import write_COA
 
 from .presentation import Presentation, Poster, InvitedTalk, Interview
 
@@ -65,10 +66,22 @@ from .service import InternationalService, NationalService, RegionalService, \
     RegionalSessionChair, NationalSessionChair, InternationalSessionChair
 
 from .data import CV_data
+from .browserpool import BrowserPool, FakeDriver, set_browser_pool
+from .attachments import Attachment, AttachmentManifest
 
 from .makeCV import write_CV
-from .makeDossier import write_Dossier
+from .makeDossier import write_Dossier, fit_Dossier
 from .makeBiosketch import write_NSF_Biosketch
 from .makeListOfPapers import write_List_of_Papers
+from .makeStudentReport import write_Student_Report
+from .makeCurrentPending import write_Current_and_Pending
+from .watch import watch_CV
+from .htmlpreview import preview
+from .journalmetrics import JournalMetrics
+from .affiliations import AffiliationIndex
+from .metadata import MetadataIndex
+from .columnar import Table, department_tables, write_columns
+from .snapshots import Snapshot
+from .network import CoauthorNetwork
 
 from .__main__ import create_new_user
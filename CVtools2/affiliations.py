@@ -0,0 +1,285 @@
+'''Where collaborators work, from .bib files and offline metadata dumps.
+
+update_collaborators has no way to know anyone's affiliation, so it leaves
+them as "UNKNOWN/FIXME". An AffiliationIndex collects the latest affiliation
+it has seen for each person, from
+
+  - the affiliation (or affiliations) field of .bib entries, as Scopus and
+    Web of Science export them: one affiliation per author, separated by
+    semicolons, or one for all of them; and
+  - JSON dumps (one record per line, gzipped or not) of Crossref works
+    ("author": [{"given", "family", "affiliation": [{"name"}]}], "issued")
+    or of plain records {"name" (or "given" and "family"), "affiliation",
+    "year"}, such as those made from ORCID or ROR data.
+
+and keeps it in a SQLite file, so each source is only read once (until it
+changes) and later proposals just look people up:
+
+    index = AffiliationIndex('affiliations.sqlite')
+    index.load_bib('group.bib')
+    index.load_json('crossref-sample.jsonl.gz')
+    CV.resolve_affiliations(index)
+
+or set_AFFILIATIONS('affiliations.sqlite'), and update_collaborators and
+write_COA will use it. People are blocked by last name and first initial
+(see people.normalize_name), so a lookup only compares the few people with
+the same block; within it, the given names must agree as far as both go
+("J. T." matches "John Thomas" but not "James"), and a name that could be
+either of two people has no affiliation.'''
+
+import os
+import re
+import sys
+import gzip
+import json
+import sqlite3
+from . import constants
+from .bibrender import split_names
+from .bibimport import read_entries
+from .people import normalize_name, given_names, compatible, same_person
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS person (block TEXT, given TEXT, affiliation TEXT,
+    year INTEGER, PRIMARY KEY (block, given)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS source (filename TEXT PRIMARY KEY, mtime REAL,
+    size INTEGER);
+'''
+
+# words that mark the part of an address that names the organization
+ORGANIZATION = re.compile(r'\b((univ|inst|lab|coll|ctr|corp|inc|ltd|gmbh|' +
+    r'natl|cnrs|csic)\b|universit|institut|laborator|college|school|' +
+    r'academ|cent(er|re)|hospital|clinic|company|agency|foundation|' +
+    r'council|ministry|national)', re.IGNORECASE)
+
+PLACEHOLDER = re.compile('FIXME|UNKNOWN')
+
+def organization (address) : # {{{1
+    '''The organization in an address, e.g. "Dept. of Physics, Univ. of
+       Somewhere, City, ST 12345, USA" -> "Univ. of Somewhere".'''
+    address = ' '.join(address.split())
+    if address.startswith('{') and address.endswith('}') :
+        address = address[1:-1]
+    # Web of Science: "Smith, JT (Corresponding Author), Univ Somewhere, ..."
+    address = re.sub(r'^[^,]*,[^,(]*\(Corresponding Author\),\s*', '',
+        address)
+    parts = [x.strip() for x in address.split(',')]
+    for part in parts :
+        if ORGANIZATION.search(part) and not re.match(r'(dept|department|' +
+                r'div|division|sch|school) of\b', part, re.IGNORECASE) :
+            return part
+    for part in parts :
+        if ORGANIZATION.search(part) :
+            return part
+    return parts[0].rstrip('.')
+
+##############################################################################
+
+class AffiliationIndex : # {{{1
+
+    '''The latest known affiliation of each person, by block (last name and
+       first initial) and given names, kept in the SQLite file filename (by
+       default constants.AFFILIATIONS, or ":memory:" for none).'''
+
+    def __init__ (self, filename = None) : # {{{2
+        if filename is None :
+            filename = constants.AFFILIATIONS or ':memory:'
+        self.filename = filename
+        self._connection = None
+        self._blocks = {}
+
+    @property
+    def connection (self) : # {{{2
+        if self._connection is None :
+            self._connection = sqlite3.connect(self.filename)
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def close (self) : # {{{2
+        if self._connection is not None :
+            self._connection.close()
+            self._connection = None
+
+    def _unchanged (self, filename) : # {{{2
+        stat = os.stat(filename)
+        known = self.connection.execute('SELECT mtime, size FROM source ' +
+            'WHERE filename = ?', (os.path.abspath(filename),)).fetchone()
+        return known == (stat.st_mtime, stat.st_size)
+
+    def _loaded (self, filename) : # {{{2
+        stat = os.stat(filename)
+        self.connection.execute('INSERT OR REPLACE INTO source VALUES ' +
+            '(?, ?, ?)', (os.path.abspath(filename), stat.st_mtime,
+            stat.st_size))
+        self.connection.commit()
+        self._blocks.clear()
+
+    def add (self, records) : # {{{2
+
+        '''Adds (name, affiliation, year) records; a person's affiliation is
+           replaced only by one at least as recent. Returns the number of
+           records added.'''
+
+        rows = []
+        for (name, affiliation, year) in records :
+            block = normalize_name(name)
+            if block == '' or affiliation is None or \
+                    PLACEHOLDER.search(affiliation) :
+                continue
+            rows.append((block, given_names(name), affiliation,
+                int(year or 0)))
+        self.connection.executemany('''INSERT INTO person VALUES (?, ?, ?, ?)
+            ON CONFLICT (block, given) DO UPDATE SET
+            affiliation = excluded.affiliation, year = excluded.year
+            WHERE excluded.year >= person.year''', rows)
+        self.connection.commit()
+        self._blocks.clear()
+        return len(rows)
+
+    def load_bib (self, filenames) : # {{{2
+
+        '''Adds the affiliations of the authors of the entries in the .bib
+           files filenames (a name or a list). Files already loaded and
+           unchanged since are skipped. Returns the number of affiliations
+           added.'''
+
+        if isinstance(filenames, str) :
+            filenames = [filenames]
+        filenames = [x for x in filenames if not self._unchanged(x)]
+        if len(filenames) == 0 :
+            return 0
+        n = self.add(self._bib_records(filenames))
+        for filename in filenames :
+            self._loaded(filename)
+        return n
+
+    def _bib_records (self, filenames) : # {{{2
+        for entry in read_entries(filenames) :
+            field = entry.get('affiliation') or entry.get('affiliations')
+            year = entry.get('year') or ''
+            year = int(year[:4]) if re.match(r'[0-9]{4}', year) else 0
+            if field is None or entry.get('author') is None :
+                continue
+            authors = split_names(entry.get('author'))
+            places = [x for x in field.split(';') if x.strip() != '']
+            if len(places) == 1 :
+                places = places * len(authors)
+            elif len(places) != len(authors) :
+                continue # no telling who is where
+            for (author, place) in zip(authors, places) :
+                yield (author, organization(place), year)
+
+    def load_json (self, filename) : # {{{2
+
+        '''Adds the affiliations in a JSON-lines dump (see the module
+           docstring), which may be gzipped. Skipped if already loaded and
+           unchanged since. Returns the number of affiliations added.'''
+
+        if self._unchanged(filename) :
+            return 0
+        n = self.add(self._json_records(filename))
+        self._loaded(filename)
+        return n
+
+    def _json_records (self, filename) : # {{{2
+        opener = gzip.open if filename.endswith('.gz') else open
+        with opener(filename, 'rt', encoding = 'utf-8') as dump :
+            for line in dump :
+                line = line.strip().rstrip(',')
+                if line in ('', '[', ']') :
+                    continue
+                try :
+                    record = json.loads(line)
+                except ValueError :
+                    print ('WARNING: skipping a line of', filename, 'that',
+                        'is not JSON', file = sys.stderr)
+                    continue
+                if isinstance(record.get('author'), list) : # Crossref
+                    try :
+                        year = record['issued']['date-parts'][0][0]
+                    except (KeyError, IndexError, TypeError) :
+                        year = 0
+                    for author in record['author'] :
+                        places = author.get('affiliation') or []
+                        if len(places) == 0 or 'family' not in author :
+                            continue
+                        place = places[0]
+                        if isinstance(place, dict) :
+                            place = place.get('name')
+                        yield (author.get('given', '') + ' ' +
+                            author['family'], organization(place or ''),
+                            year or 0)
+                    continue
+                name = record.get('name') or (record.get('given', '') +
+                    ' ' + record.get('family', ''))
+                place = record.get('affiliation')
+                if isinstance(place, dict) :
+                    place = place.get('name')
+                if place :
+                    yield (name, place, record.get('year') or 0)
+
+    def _candidates (self, block) : # {{{2
+        try :
+            return self._blocks[block]
+        except KeyError :
+            found = self._blocks[block] = self.connection.execute('''SELECT
+                given, affiliation, year FROM person WHERE block = ?
+                ORDER BY year DESC''', (block,)).fetchall()
+            return found
+
+    def prefetch (self, names, chunk = 500) : # {{{2
+        '''Reads the candidates for everyone in names at once (a query per
+           chunk names), rather than one query per resolve().'''
+        blocks = [x for x in set(normalize_name(y) for y in names) \
+            if x not in self._blocks]
+        for block in blocks :
+            self._blocks[block] = []
+        for i in range(0, len(blocks), chunk) :
+            part = blocks[i:i+chunk]
+            for row in self.connection.execute('SELECT block, given, ' +
+                    'affiliation, year FROM person WHERE block IN (' +
+                    ','.join('?' * len(part)) + ') ORDER BY year DESC', part) :
+                self._blocks[row[0]].append(row[1:])
+
+    def resolve (self, name) : # {{{2
+        '''The latest known affiliation of the person named name, or None if
+           there is none or name could be more than one person (e.g. "J.
+           Smith", with John T. and James Smith known). Among the forms of
+           the one person's name, the one whose given names agree most fully
+           wins, then the most recent.'''
+        given = given_names(name)
+        found = [x for x in self._candidates(normalize_name(name)) if
+            same_person(given, x[0])]
+        exact = [x for x in found if x[0] == given]
+        if len(exact) > 0 :
+            found = exact
+        elif any(not compatible(a[0], b[0]) for a in found for b in found) :
+            return None # several people
+        best = None
+        for (other, affiliation, year) in found :
+            score = (sum(len(a) > 1 and a == b for (a, b) in \
+                zip(given.split(), other.split())), year)
+            if best is None or score > best[0] :
+                best = (score, affiliation)
+        return None if best is None else best[1]
+
+    def fill (self, collaborators, overwrite = False) : # {{{2
+
+        '''Sets the institution of each of collaborators (Collaborator
+           objects) that has none, or a placeholder like "UNKNOWN/FIXME"
+           (or any, if overwrite is True), to their latest known
+           affiliation. Returns the number filled.'''
+
+        todo = [x for x in collaborators if overwrite or
+            x.institution is None or PLACEHOLDER.search(x.institution)]
+        names = [x.first + ' ' + ('' if x.middle is None else x.middle +
+            ' ') + x.last for x in todo]
+        self.prefetch(names)
+        n = 0
+        for (collaborator, name) in zip(todo, names) :
+            affiliation = self.resolve(name)
+            if affiliation is not None :
+                collaborator.institution = affiliation
+                n += 1
+        return n
+
+# vim: foldmethod=marker
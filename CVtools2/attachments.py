@@ -0,0 +1,312 @@
+'''External PDFs (letters, reviews, teaching samples) appended to the dossier.
+
+The dossier includes scanned letters and the like at fixed places: the offer
+letter, post-tenure reviews, peer teaching reviews, teaching samples, and so
+on. Which files go where is given by an AttachmentManifest, which maps each
+place (a "slot" such as "post-tenure-review") to a list of PDFs. It can be
+read from a JSON file,
+
+    {"offer-letter": ["letters/offer.pdf"],
+     "post-tenure-review": ["ptr-2019.pdf", {"file": "ptr-2024.pdf",
+                            "title": "Post-Tenure Review (2024)"}]}
+
+or made from the file names write_Dossier has always looked for
+(AttachmentManifest.conventional).
+
+Rather than have pdflatex import every page of every attachment on each of
+its passes, the document only reserves page numbers for them and records
+where each one goes; PDFAssembly.assemble then inserts the pages into the
+finished PDF in one pass, with page labels and a bookmark for each. This
+needs pypdf; without it, the attachments are included with \\includepdf as
+before.'''
+
+import os
+import re
+import sys
+import json
+
+# slot: the file names write_Dossier has always looked for there
+CONVENTIONAL = (
+    ('offer-letter', ['offer-letter.pdf']),
+    ('mid-probationary-review', ['appointment-extension-3.pdf']),
+    ('probationary-extension', ['probationary-extension.pdf']),
+    ('post-tenure-review',
+        ['post-tenure-review-' + str(n) + '.pdf' for n in range(1,6)]),
+    ('teaching-statement', ['teaching-statement.pdf']),
+    ('teaching-eval-interpretation', ['teaching-eval-interpretation.pdf']),
+    ('peer-teaching-review',
+        ['peer-teaching-review-' + str(n) + '.pdf' for n in range(1,4)]),
+    ('teaching-sample',
+        ['teaching-sample-' + str(n) + '.pdf' for n in range(1,3)]),
+)
+
+def _pypdf () : # {{{1
+    'Returns the pypdf module, or None if it is not installed.'
+    try :
+        import pypdf
+        return pypdf
+    except ModuleNotFoundError :
+        return None
+
+##############################################################################
+
+class Attachment : # {{{1
+
+    '''One external PDF. title is used for its bookmark (by default it is
+       made from the file name) and pages, if given, is the most pages of it
+       to include.'''
+
+    def __init__ (self, filename, title = None, pages = None) : # {{{2
+        self.filename = filename
+        if title is None :
+            title = os.path.splitext(os.path.basename(filename))[0]
+            title = title.replace('-', ' ').replace('_', ' ').capitalize()
+        self.title = title
+        self.pages = pages
+        self._npages = None
+
+    @property
+    def npages (self) : # {{{2
+        'The number of pages that will be included (needs pypdf).'
+        if self._npages is None :
+            npages = len(_pypdf().PdfReader(self.filename).pages)
+            if self.pages is not None :
+                npages = min(npages, self.pages)
+            self._npages = npages
+        return self._npages
+
+    def __repr__ (self) : # {{{2
+        return 'Attachment(' + repr(self.filename) + ')'
+
+##############################################################################
+
+class AttachmentManifest : # {{{1
+
+    '''Maps slot names to lists of Attachments. Slots may be given lists of
+       file names, dictionaries with "file" and optionally "title" and
+       "pages", or Attachment objects.'''
+
+    def __init__ (self, slots = None) : # {{{2
+        self.slots = {}
+        for (slot, attachments) in (slots or {}).items() :
+            if isinstance(attachments, (str, dict, Attachment)) :
+                attachments = [attachments]
+            self.slots[slot] = [self._attachment(x) for x in attachments]
+
+    @staticmethod
+    def _attachment (item) : # {{{2
+        if isinstance(item, Attachment) :
+            return item
+        if isinstance(item, str) :
+            return Attachment(item)
+        return Attachment(item['file'], item.get('title'), item.get('pages'))
+
+    @classmethod
+    def load (cls, filename) : # {{{2
+        'Reads a manifest from a JSON file.'
+        with open(filename, 'r') as manifest :
+            slots = json.load(manifest)
+        directory = os.path.dirname(filename)
+        manifest = cls(slots)
+        # file names are relative to the manifest
+        for attachments in manifest.slots.values() :
+            for attachment in attachments :
+                attachment.filename = os.path.join(directory,
+                    attachment.filename)
+        return manifest
+
+    @classmethod
+    def conventional (cls, directory = '.') : # {{{2
+        '''Makes a manifest of whichever of the conventionally named files
+           (see CONVENTIONAL) are in directory.'''
+        slots = {}
+        for (slot, names) in CONVENTIONAL :
+            found = [os.path.join(directory, x) for x in names \
+                if os.path.isfile(os.path.join(directory, x))]
+            if len(found) > 0 :
+                slots[slot] = found
+        manifest = cls(slots)
+        if 'teaching-statement' in manifest.slots :
+            # the statement is limited to one page
+            manifest.slots['teaching-statement'][0].pages = 1
+        return manifest
+
+    def get (self, slot) : # {{{2
+        'The list of attachments for slot (empty if there are none).'
+        return self.slots.get(slot, [])
+
+    def check (self) : # {{{2
+        'Warns about attachments whose files are missing, and drops them.'
+        for (slot, attachments) in self.slots.items() :
+            for attachment in list(attachments) :
+                if not os.path.isfile(attachment.filename) :
+                    print ('WARNING: attachment', attachment.filename,
+                        'for', slot, 'does not exist', file = sys.stderr)
+                    attachments.remove(attachment)
+
+##############################################################################
+
+class PDFAssembly : # {{{1
+
+    '''Places attachments in a document. If external is True (the default
+       when pypdf is installed), the document gets placeholders and
+       assemble() merges the attachments into the PDF afterward; otherwise
+       they are included with \\includepdf.'''
+
+    def __init__ (self, manifest = None, external = None) : # {{{2
+        if manifest is None :
+            manifest = AttachmentManifest.conventional()
+        elif isinstance(manifest, str) :
+            manifest = AttachmentManifest.load(manifest)
+        elif isinstance(manifest, dict) :
+            manifest = AttachmentManifest(manifest)
+        manifest.check()
+        self.manifest = manifest
+        if external is None :
+            external = _pypdf() is not None
+        elif external and _pypdf() is None :
+            print ('WARNING: pypdf is not installed; attachments will be',
+                'included by pdflatex', file = sys.stderr)
+            external = False
+        self.external = external
+        self.placed = []
+
+    def get (self, slot) : # {{{2
+        return self.manifest.get(slot)
+
+    def filenames (self) : # {{{2
+        'The files of every attachment in the manifest.'
+        return [attachment.filename for attachments in \
+            self.manifest.slots.values() for attachment in attachments]
+
+    def write_preamble (self, texfile) : # {{{2
+        'Opens the file in which the document records where each one goes.'
+        if self.external :
+            print (r'\newwrite\CVattachments', file = texfile)
+            print (r'\immediate\openout\CVattachments=\jobname.att',
+                file = texfile)
+
+    def include (self, texfile, attachment) : # {{{2
+
+        '''Writes attachment into the document at this point (which should
+           be the start of a page).'''
+
+        if not self.external :
+            pages = '-' if attachment.pages is None \
+                else '1-' + str(attachment.pages)
+            print (r'\includepdf[pages=' + pages + ']{' + \
+                attachment.filename + '}', file = texfile)
+            return
+        # record how many pages precede it and its first page number, then
+        # skip the page numbers it will have
+        print (r'\immediate\write\CVattachments{' + str(len(self.placed)),
+            r'\the\ReadonlyShipoutCounter\space\arabic{page}}%',
+            file = texfile)
+        print (r'\addtocounter{page}{' + str(attachment.npages) + '}%',
+            file = texfile)
+        self.placed.append(attachment)
+
+    def assemble (self, pdf) : # {{{2
+
+        '''Inserts the attachments placed in the document into its PDF (the
+           file pdf, which is rewritten), fixing its page labels and adding
+           a bookmark for each attachment. Returns the number inserted.'''
+
+        if not self.external or len(self.placed) == 0 :
+            return 0
+        pypdf = _pypdf()
+        where = {}
+        with open(os.path.splitext(pdf)[0] + '.att', 'r') as places :
+            for line in places :
+                (n, before, number) = (int(x) for x in line.split())
+                where[n] = (before, number)
+        labels = list(pypdf.PdfReader(pdf).page_labels)
+        writer = pypdf.PdfWriter(clone_from = pdf)
+        inserted = []
+        # from the back, so the earlier positions stay put; of those at one
+        # position, the last placed goes in first and ends up last
+        for n in sorted(where, key = lambda n: (where[n][0], n),
+                reverse = True) :
+            (before, number) = where[n]
+            attachment = self.placed[n]
+            reader = pypdf.PdfReader(attachment.filename)
+            first = None
+            for i in reversed(range(attachment.npages)) :
+                first = writer.insert_page(reader.pages[i], before)
+            labels[before:before] = [str(number + i) for i in \
+                range(attachment.npages)]
+            inserted.append((attachment, first))
+        _set_page_labels(writer, labels)
+        for (attachment, first) in reversed(inserted) :
+            writer.add_outline_item(attachment.title, first,
+                parent = _outline_parent(writer, first))
+        with open(pdf + '.tmp', 'wb') as output :
+            writer.write(output)
+        os.replace(pdf + '.tmp', pdf)
+        return len(inserted)
+
+##############################################################################
+
+def _label_style (label) : # {{{1
+    'Splits a page label into its (style, number) for /PageLabels.'
+    if re.fullmatch(r'[0-9]+', label) :
+        return ('/D', int(label))
+    for (style, numerals) in (('/r', 'ivxlcdm'), ('/R', 'IVXLCDM')) :
+        if label != '' and all(c in numerals for c in label) :
+            value = 0
+            digits = [{'i': 1, 'v': 5, 'x': 10, 'l': 50, 'c': 100,
+                'd': 500, 'm': 1000}[c.lower()] for c in label]
+            for (i, digit) in enumerate(digits) :
+                value += -digit if i + 1 < len(digits) \
+                    and digits[i+1] > digit else digit
+            return (style, value)
+    return (None, label)
+
+def _set_page_labels (writer, labels) : # {{{1
+    'Replaces the page labels of writer by labels, one string per page.'
+    if '/PageLabels' in writer.root_object :
+        del writer.root_object['/PageLabels']
+    start = 0
+    for i in range(1, len(labels) + 1) :
+        (style, value) = _label_style(labels[start])
+        if i < len(labels) :
+            (next_style, next_value) = _label_style(labels[i])
+            if style is None and labels[i] == labels[start] :
+                continue
+            if style is not None and next_style == style and \
+                    next_value == value + (i - start) :
+                continue
+        if style is None :
+            writer.set_page_label(start, i - 1, prefix = value)
+        else :
+            writer.set_page_label(start, i - 1, style = style, start = value)
+        start = i
+
+def _outline_parent (writer, page) : # {{{1
+
+    '''The bookmark a bookmark to page should go under: the last one (at
+       any depth) pointing at or before it, or None for the top level.'''
+
+    index = writer.get_page_number(page)
+    parent = None
+    stack = [iter(writer.outline)]
+    while len(stack) > 0 :
+        try :
+            item = next(stack[-1])
+        except StopIteration :
+            stack.pop()
+            continue
+        if isinstance(item, list) :
+            stack.append(iter(item))
+            continue
+        try :
+            if writer.get_destination_page_number(item) <= index :
+                parent = item
+        except Exception : # bookmarks to nowhere
+            continue
+    if parent is None :
+        return None
+    return parent.node.indirect_reference if hasattr(parent, 'node') \
+        else None
+
+# vim: foldmethod=marker
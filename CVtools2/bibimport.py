@@ -0,0 +1,220 @@
+'''Makes the publications of a CV from .bib files.
+
+Publications with a BibTeX key are typeset from the .bib file, but their key,
+year, authors, DOI, and so on also had to be typed into the input script.
+import_bib reads them from the .bib files instead:
+
+    CV.import_bib('group.bib', overrides = {
+        'Smith2019': {'student': 'J. Smith', 'significant': True},
+        'Jones2021': {'status': ACCEPTED}})
+
+Each entry becomes a JournalArticle, BookChapter, ConferenceProceedings,
+Book, or Patent (see TYPES); by default only the entries by the author of the
+CV (constants.AUTHOR) are kept. The student, undergraduate, and corauth
+fields of an entry (see README.md) are used as well. overrides gives any
+other arguments by key, and they win. Publications the script already made
+with a key are kept as they are, and only get what they lack from the .bib
+file (DOI, title, and the like).
+
+The files are read an entry at a time, and each entry is parsed only once as
+long as its text does not change, so reading the same large files again
+(e.g. in watch mode) takes almost no time.'''
+
+import os
+import re
+import sys
+import hashlib
+from . import constants
+from .bibrender import parse_bib, split_names, format_name, find_file, \
+    MONTHS
+from .people import NameIndex
+from .publication import JournalArticle, BookChapter, \
+    ConferenceProceedings, Book, Patent
+
+# entry type: class of publication
+TYPES = {'article': JournalArticle, 'incollection': BookChapter,
+    'inbook': BookChapter, 'inproceedings': ConferenceProceedings,
+    'conference': ConferenceProceedings, 'book': Book, 'patent': Patent}
+
+# argument: field, for the fields that go over unchanged (but for braces)
+FIELDS = {'title': 'title', 'journal': 'journal', 'booktitle': 'booktitle',
+    'volume': 'volume', 'number': 'number', 'pages': 'pages',
+    'publisher': 'publisher', 'address': 'address', 'series': 'series',
+    'school': 'school', 'chapter': 'chapter', 'note': 'note',
+    'doi': 'doi'}
+NAMES = ('author', 'editor', 'student', 'undergraduate', 'corauth')
+PATENT_FIELDS = ('title', 'number', 'month')
+
+_chunk_cache = {} # file: {(text, @strings): entries} of its last reading
+
+def _chunks (filename) : # {{{1
+
+    '''Generator over the text of each @-thing in filename, read a line at a
+       time (an entry starts with a line that starts with @).'''
+
+    chunk = []
+    with open(filename, 'r', errors = 'replace') as bibfile :
+        for line in bibfile :
+            if line.lstrip().startswith('@') and len(chunk) > 0 :
+                yield ''.join(chunk)
+                chunk = []
+            chunk.append(line)
+    if len(chunk) > 0 :
+        yield ''.join(chunk)
+
+def read_entries (filenames) : # {{{1
+
+    '''Generator over the BibEntry objects in the .bib files filenames (a
+       name or a list of names), in order, with cross-references resolved.
+       Entries whose text and @strings are unchanged since the file was last
+       read are not parsed again; only those of its last reading are kept.'''
+
+    if isinstance(filenames, str) :
+        filenames = [filenames]
+    macros = dict(MONTHS)
+    strings = hashlib.sha1() # of the @strings so far
+    entries = {}
+    for filename in filenames :
+        cache = _chunk_cache.get(os.path.abspath(filename), {})
+        fresh = {}
+        for chunk in _chunks(filename) :
+            if re.match(r'\s*@\s*string\b', chunk, re.IGNORECASE) :
+                parse_bib(chunk, macros)
+                strings.update(chunk.encode())
+                continue
+            stamp = (chunk, strings.digest())
+            found = cache.get(stamp)
+            if found is None :
+                found = parse_bib(chunk, macros)[0]
+            fresh[stamp] = found
+            for (key, entry) in found.items() :
+                entries.setdefault(key, entry)
+        _chunk_cache[os.path.abspath(filename)] = fresh
+    for entry in entries.values() :
+        parent = entries.get((entry.get('crossref') or '').lower())
+        if parent is not None :
+            fields = dict(parent.fields)
+            fields.update(entry.fields)
+            del fields['crossref']
+            entry = type(entry)(entry.type, entry.key, fields)
+        yield entry
+
+def bib_entries (keys, bibliography) : # {{{1
+
+    '''Dictionary of the entries with keys (lower case) in the .bib files
+       in bibliography (a comma-separated string of names, as for write_CV,
+       found as bibtex would find them), by key; for the publications that
+       have only a key in the input script. Empty if bibliography is None.'''
+
+    found = {}
+    if bibliography is None or len(keys) == 0 :
+        return found
+    files = [x.strip() for x in bibliography.split(',')]
+    files = [find_file(x if x.endswith('.bib') else x + '.bib') \
+        for x in files]
+    for entry in read_entries([x for x in files if x is not None]) :
+        if entry.key.lower() in keys :
+            found[entry.key.lower()] = entry
+    return found
+
+##############################################################################
+
+def _unbrace (value) : # {{{1
+    'Removes the braces that protect case in a field, e.g. "{DNA} repair".'
+    return re.sub(r'(?<!\\)[{}]', '', value).strip()
+
+def _names (value) : # {{{1
+    'Turns a BibTeX name list into a list of names like "J.~T. Smith".'
+    return [format_name(x) for x in split_names(value)]
+
+def publication_arguments (entry) : # {{{1
+
+    '''The arguments for the publication class of entry (see TYPES), or None
+       if it cannot be one (it has no year).'''
+
+    year = entry.get('year')
+    if year is None or not re.match(r'\s*[0-9]{4}', year) :
+        return None
+    arguments = {'key': entry.key, 'year': int(year.strip()[:4])}
+    for name in NAMES :
+        if entry.get(name) is not None :
+            arguments[name] = _names(entry.get(name))
+    if TYPES.get(entry.type) is Patent :
+        fields = {x: FIELDS.get(x, x) for x in PATENT_FIELDS}
+        arguments = {x: arguments[x] for x in ('key', 'year', 'author',
+            'student', 'undergraduate') if x in arguments}
+    else :
+        fields = FIELDS
+        if entry.get('month') is not None :
+            arguments['month'] = entry.get('month')
+    for (argument, field) in fields.items() :
+        if entry.get(field) is not None :
+            arguments[argument] = _unbrace(entry.get(field))
+    return arguments
+
+def _by_author (entry, authors) : # {{{1
+    '''True if anyone in authors (a NameIndex, see people) wrote or edited
+       entry.'''
+    for name in ('author', 'editor') :
+        if any(authors.find(x) is not None for x in \
+                split_names(entry.get(name) or '')) :
+            return True
+    return False
+
+##############################################################################
+
+def import_bib (data, filenames, overrides = None, only_author = True, # {{{1
+        batch = 1000) :
+
+    '''Adds the publications in the .bib files filenames to the CV_data
+       object data (see the module docstring); overrides maps keys to
+       dictionaries of arguments. If only_author is True, only entries by
+       constants.AUTHOR are added. Publications are added batch at a time.
+       Returns the number added.'''
+
+    overrides = {key.lower(): value for (key, value) in \
+        (overrides or {}).items()}
+    names = constants.AUTHOR
+    if isinstance(names, str) :
+        names = [names]
+    authors = NameIndex()
+    for name in names or [] :
+        authors.find(name, True)
+    existing = {}
+    for collection in ('publication', 'patent') :
+        for item in getattr(data, collection) :
+            if item.key is not None :
+                existing[item.key.lower()] = item
+    added = 0
+    pending = []
+    for entry in read_entries(filenames) :
+        cls = TYPES.get(entry.type)
+        if cls is None :
+            continue
+        if only_author and entry.key.lower() not in overrides \
+                and not _by_author(entry, authors) :
+            continue
+        arguments = publication_arguments(entry)
+        if arguments is None :
+            print ('WARNING: no year for', entry.key + '; not imported',
+                file = sys.stderr)
+            continue
+        override = overrides.get(entry.key.lower(), {})
+        item = existing.get(entry.key.lower())
+        if item is not None : # the script's own; fill in what it lacks
+            for (name, value) in arguments.items() :
+                if hasattr(item, name) and getattr(item, name) is None :
+                    setattr(item, name, value)
+            for (name, value) in override.items() :
+                setattr(item, name, value)
+            continue
+        arguments.update(override)
+        pending.append(cls(**arguments))
+        if len(pending) >= batch :
+            data.extend (pending)
+            added += len(pending)
+            pending = []
+    data.extend (pending)
+    return added + len(pending)
+
+# vim: foldmethod=marker
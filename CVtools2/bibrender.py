@@ -0,0 +1,1262 @@
+'''Renders the bibliography in Python instead of running bibtex.
+
+Publications with a key are typeset by \bibentry from the .bbl file that
+bibtex writes using CV.bst, CV-short.bst, or CV-with-doi.bst. This module
+reads the .bib files itself and writes the same .bbl those styles would
+(authors formatted "J.~Smith", the CV's author in bold, students in italics,
+undergraduates in slanted sans serif, corresponding authors starred, and so
+on), so the .bbl is already there for the first pdflatex pass and the
+document needs only as many passes as its own labels and page references.
+
+Each style is a class whose methods mirror the functions of the .bst file of
+the same name. Formatted entries are cached by their contents, so documents
+that are rebuilt over and over (fit_Dossier, watch mode) only format an entry
+again when it changes. Cross-referenced entries inherit the fields of their
+parents, but are always formatted as if they stood alone.
+
+Use constants.set_NATIVE_BIBLIOGRAPHY(True) to have generate_pdf use this
+instead of bibtex; documents using any other style still go through bibtex.'''
+
+import os
+import re
+import sys
+import subprocess
+
+MONTHS = {'jan': 'January', 'feb': 'February', 'mar': 'March',
+    'apr': 'April', 'may': 'May', 'jun': 'June', 'jul': 'July',
+    'aug': 'August', 'sep': 'September', 'oct': 'October',
+    'nov': 'November', 'dec': 'December'}
+BEFORE_ALL, MID_SENTENCE, AFTER_SENTENCE, AFTER_BLOCK = range(4)
+
+##############################################################################
+
+def empty (value) : # {{{1
+    'The equivalent of empty$: True for missing or blank fields.'
+    return value is None or value.strip() == ''
+
+def _braced (text, i) : # {{{1
+    'Returns the index just past the brace group that starts at text[i].'
+    depth = 0
+    for j in range(i, len(text)) :
+        if text[j] == '{' :
+            depth += 1
+        elif text[j] == '}' :
+            depth -= 1
+            if depth == 0 :
+                return j + 1
+    return len(text)
+
+def add_period (text) : # {{{1
+    'The equivalent of add.period$.'
+    stripped = text.rstrip('}')
+    if stripped == '' or stripped[-1] in '.?!' :
+        return text
+    return text + '.'
+
+def text_length (text) : # {{{1
+    'The equivalent of text.length$ (special characters count as one).'
+    text = re.sub(r'\{\\[a-zA-Z]+\s*', '{', text)
+    text = re.sub(r'\{\\[^a-zA-Z]', '{', text)
+    return len(re.sub(r'[{}]', '', text))
+
+def tie_or_space (text) : # {{{1
+    'The equivalent of tie.or.space.prefix: "~" before short words.'
+    return '~' if text_length(text) < 3 else ' '
+
+def change_case (text, how) : # {{{1
+
+    '''The equivalent of change.case$: how is "l" (lower case), "u" (upper
+       case), or "t" (lower case but for the first letter). Text in braces
+       is left alone.'''
+
+    result = []
+    i = 0
+    while i < len(text) :
+        if text[i] == '{' :
+            j = _braced(text, i)
+            result.append(text[i:j])
+            i = j
+            continue
+        if how == 'u' :
+            result.append(text[i].upper())
+        elif how == 'l' or i > 0 :
+            result.append(text[i].lower())
+        else :
+            result.append(text[i])
+        i += 1
+    return ''.join(result)
+
+def purify (text) : # {{{1
+
+    '''The equivalent of purify$: removes everything but letters, digits,
+       and spaces (hyphens and ties become spaces), including the control
+       sequences in accented letters.'''
+
+    text = re.sub(r'\{\\[a-zA-Z]+\s*', '{', text)
+    text = re.sub(r'[-~]', ' ', text)
+    return re.sub(r'[^\w\s]|_', '', text)
+
+def ndashify (pages) : # {{{1
+    'The equivalent of n.dashify: 1-10 -> 1--10.'
+    return re.sub(r'-+', lambda m: '--' if len(m.group()) == 1 \
+        else m.group(), pages)
+
+def emphasize (text) : # {{{1
+    return r'\emph{' + text + '}' if not empty(text) else ''
+
+def bolden (text) : # {{{1
+    return r'\textbf{' + text + '}' if not empty(text) else ''
+
+##############################################################################
+
+def _words (text) : # {{{1
+
+    '''Splits text at white space (and ties) outside braces, returning each
+       word with the separator that followed it ('' after the last).'''
+
+    words = []
+    word = ''
+    i = 0
+    while i < len(text) :
+        c = text[i]
+        if c == '{' :
+            j = _braced(text, i)
+            word += text[i:j]
+            i = j
+            continue
+        if c.isspace() or c == '~' :
+            if word != '' :
+                words.append([word, ' '])
+                word = ''
+        else :
+            word += c
+        i += 1
+    if word != '' :
+        words.append([word, ''])
+    if len(words) > 0 :
+        words[-1][1] = ''
+    return words
+
+def split_names (names) : # {{{1
+    'Splits a BibTeX name list at each "and" outside braces.'
+    result = [[]]
+    for (word, sep) in _words(names) :
+        if word.lower() == 'and' :
+            result.append([])
+        else :
+            result[-1].append(word)
+    return [' '.join(x) for x in result if len(x) > 0]
+
+def _is_lower (token) : # {{{1
+
+    '''True if token starts with a lower-case letter, as BibTeX decides it
+       (brace groups other than accented letters count as upper case).'''
+
+    for (i, c) in enumerate(token) :
+        if c == '{' :
+            if token[i+1:i+2] != '\\' :
+                return False
+            letters = re.match(r'\{\\([a-zA-Z]+|.)\s*\{?\s*([a-zA-Z]?)',
+                token[i:])
+            if letters is None :
+                return False
+            letter = letters.group(2) or letters.group(1)
+            return letter[:1].islower()
+        if c.isalpha() :
+            return c.islower()
+    return False
+
+def _von_last (tokens) : # {{{1
+    'Splits "von Last" tokens into their von and last parts.'
+    von_end = 0
+    for i in range(len(tokens) - 1) :
+        if _is_lower(tokens[i]) :
+            von_end = i + 1
+    return (tokens[:von_end], tokens[von_end:])
+
+def name_parts (name) : # {{{1
+
+    '''Splits a single name into its First, von, Last, and Jr parts (each a
+       list of tokens) following BibTeX's rules for "First von Last", "von
+       Last, First", and "von Last, Jr, First".'''
+
+    pieces = [[]]
+    for (word, sep) in _words(name) :
+        # commas outside braces separate the parts
+        depth = 0
+        start = 0
+        for (i, c) in enumerate(word) :
+            if c == '{' :
+                depth += 1
+            elif c == '}' :
+                depth -= 1
+            elif c == ',' and depth == 0 :
+                if word[start:i] != '' :
+                    pieces[-1].append(word[start:i])
+                pieces.append([])
+                start = i + 1
+        if word[start:] != '' :
+            pieces[-1].append(word[start:])
+    if len(pieces) == 1 :
+        tokens = pieces[0]
+        if len(tokens) == 0 :
+            return ([], [], [], [])
+        von_start = len(tokens) - 1
+        for i in range(len(tokens) - 1) :
+            if _is_lower(tokens[i]) :
+                von_start = i
+                break
+        (von, last) = _von_last(tokens[von_start:])
+        return (tokens[:von_start], von, last, [])
+    (von, last) = _von_last(pieces[0])
+    if len(pieces) == 2 :
+        return (pieces[1], von, last, [])
+    return (pieces[2], von, last, pieces[1])
+
+def _format_part (tokens, abbreviate, post = '') : # {{{1
+
+    '''Formats one part of a name the way format.name$ does for "{ff~}",
+       "{f.~}", "{ll}", etc.: tokens are joined by ties after short words
+       and before the last one, hyphenated names keep their hyphens, and a
+       tie at the end of post becomes a space unless the part is short.'''
+
+    pieces = []
+    for token in tokens :
+        # Jean-Paul is two tokens joined by a hyphen
+        subtokens = re.split(r'-(?![^{]*})', token)
+        for (i, sub) in enumerate(subtokens) :
+            pieces.append([sub, '-' if i < len(subtokens) - 1 else ' '])
+    result = ''
+    for (i, (token, sep)) in enumerate(pieces) :
+        if abbreviate :
+            if token.startswith('{') :
+                token = token[:_braced(token, 0)]
+            else :
+                token = token[:1]
+        result += token
+        if i == len(pieces) - 1 :
+            break
+        if abbreviate :
+            result += '.'
+        if sep == '-' :
+            result += '-'
+        elif i == len(pieces) - 2 or text_length(result) < 3 :
+            result += '~'
+        else :
+            result += ' '
+    if post.endswith('~') :
+        post = post[:-1] + ('~' if text_length(result) < 3 else ' ')
+    return result + post
+
+def format_name (name) : # {{{1
+    'Formats a single name as "{f.~}{vv~}{ll}{, jj}", e.g. "J.~T. Smith".'
+    (first, von, last, jr) = name_parts(name)
+    result = ''
+    if len(first) > 0 :
+        result += _format_part(first, True, '.~')
+    if len(von) > 0 :
+        result += _format_part(von, False, '~')
+    result += _format_part(last, False)
+    if len(jr) > 0 :
+        result += ', ' + _format_part(jr, False)
+    return result
+
+def last_name (name) : # {{{1
+    'Formats a single name as "{ll}".'
+    return _format_part(name_parts(name)[2], False)
+
+##############################################################################
+
+class BibEntry : # {{{1
+
+    'One entry of a .bib file: type and fields are lower case.'
+
+    def __init__ (self, entry_type, key, fields) : # {{{2
+        self.type = entry_type
+        self.key = key
+        self.fields = fields
+
+    def get (self, field) : # {{{2
+        return self.fields.get(field)
+
+    def signature (self) : # {{{2
+        'Everything that affects how the entry is formatted.'
+        return (self.type, self.key, tuple(sorted(self.fields.items())))
+
+    def __repr__ (self) : # {{{2
+        return 'BibEntry(' + repr(self.type) + ', ' + repr(self.key) + ')'
+
+##############################################################################
+
+def parse_bib (text, macros = None) : # {{{1
+
+    '''Parses the text of a .bib file. Returns a dictionary of BibEntry
+       objects keyed by lower-case key (in file order) and a list of the
+       @preamble strings. macros maps @string names to their values; it is
+       updated with the @strings found in text.'''
+
+    macros = dict(MONTHS) if macros is None else macros
+    entries = {}
+    preamble = []
+    i = 0
+    n = len(text)
+
+    def skip_space (i) :
+        while i < n and text[i].isspace() :
+            i += 1
+        return i
+
+    def value (i) :
+        # one value: "..." # {...} # macro # 123
+        parts = []
+        while True :
+            i = skip_space(i)
+            if i >= n :
+                break
+            if text[i] == '{' :
+                j = _braced(text, i)
+                parts.append(text[i+1:j-1])
+            elif text[i] == '"' :
+                j = i + 1
+                depth = 0
+                while j < n and (text[j] != '"' or depth > 0) :
+                    if text[j] == '{' :
+                        depth += 1
+                    elif text[j] == '}' :
+                        depth -= 1
+                    j += 1
+                parts.append(text[i+1:j])
+                j += 1
+            else :
+                m = re.compile(r'[^\s,#=(){}"]+').match(text, i)
+                if m is None :
+                    break
+                word = m.group()
+                j = m.end()
+                if word.isdigit() :
+                    parts.append(word)
+                elif word.lower() in macros :
+                    parts.append(macros[word.lower()])
+                else :
+                    print ('WARNING: undefined BibTeX string', word,
+                        file = sys.stderr)
+            i = skip_space(j)
+            if i < n and text[i] == '#' :
+                i += 1
+            else :
+                break
+        return (re.sub(r'\s+', ' ', ''.join(parts)).strip(), i)
+
+    while True :
+        i = text.find('@', i)
+        if i < 0 :
+            break
+        m = re.compile(r'@\s*([a-zA-Z]+)\s*([{(])').match(text, i)
+        if m is None :
+            i += 1
+            continue
+        entry_type = m.group(1).lower()
+        close = '}' if m.group(2) == '{' else ')'
+        i = m.end()
+        if entry_type == 'comment' :
+            i = _braced(text, m.start(2)) if close == '}' \
+                else text.find(')', i) + 1
+            continue
+        if entry_type == 'preamble' :
+            (string, i) = value(i)
+            preamble.append(string)
+            i = text.find(close, i) + 1
+            continue
+        if entry_type == 'string' :
+            m = re.compile(r'\s*([^\s=]+)\s*=').match(text, i)
+            if m is None :
+                continue
+            (string, i) = value(m.end())
+            macros[m.group(1).lower()] = string
+            i = text.find(close, i) + 1
+            continue
+        m = re.compile(r'\s*([^\s,]*)\s*,?').match(text, i)
+        key = m.group(1).rstrip(close)
+        i = m.end()
+        fields = {}
+        while True :
+            i = skip_space(i)
+            if i >= n or text[i] == close :
+                i += 1
+                break
+            m = re.compile(r'([^\s=,{}]+)\s*=').match(text, i)
+            if m is None :
+                # skip whatever this is to the next comma or the end
+                while i < n and text[i] not in ',' + close :
+                    i += 1
+                if i < n and text[i] == ',' :
+                    i += 1
+                continue
+            (fields[m.group(1).lower()], i) = value(m.end())
+            i = skip_space(i)
+            if i < n and text[i] == ',' :
+                i += 1
+        entries[key.lower()] = BibEntry(entry_type, key, fields)
+    for entry in entries.values() :
+        parent = entries.get((entry.get('crossref') or '').lower())
+        if parent is not None :
+            for (name, string) in parent.fields.items() :
+                entry.fields.setdefault(name, string)
+            del entry.fields['crossref']
+    return (entries, preamble)
+
+_bib_cache = {}
+
+def read_bib (filename, macros = None) : # {{{1
+
+    '''Reads and parses a .bib file (see parse_bib), reusing the result as
+       long as the file is unchanged.'''
+
+    stamp = (filename, os.path.getmtime(filename),
+        tuple(sorted(macros.items())) if macros is not None else None)
+    if stamp not in _bib_cache :
+        with open(filename, 'r') as bibfile :
+            text = bibfile.read()
+        macros = dict(MONTHS, **(macros if macros is not None else {}))
+        _bib_cache[stamp] = parse_bib(text, macros)
+    return _bib_cache[stamp]
+
+def bst_macros (filename) : # {{{1
+    'Reads the MACRO definitions (journal abbreviations etc.) of a .bst file.'
+    with open(filename, 'r') as bstfile :
+        return {name.lower(): string for (name, string) in
+            re.findall(r'^MACRO\s*{([^}]*)}\s*{"([^"]*)"}', bstfile.read(),
+            re.MULTILINE)}
+
+def find_file (name, directory = '.') : # {{{1
+    'Finds a .bib or .bst file where bibtex would, or returns None.'
+    path = os.path.join(directory, name)
+    if os.path.isfile(path) :
+        return path
+    try :
+        proc = subprocess.run(['kpsewhich', name], stdout = subprocess.PIPE)
+        path = proc.stdout.decode().strip('\n')
+        if path != '' and os.path.isfile(path) :
+            return path
+    except FileNotFoundError : # no kpsewhich
+        pass
+    # the styles are distributed alongside the package
+    path = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), name)
+    return path if os.path.isfile(path) else None
+
+##############################################################################
+
+class _Output : # {{{1
+
+    '''The output state machine shared by all of the styles: output.nonnull,
+       new.block, new.sentence, add.blank, and fin.entry.'''
+
+    def __init__ (self) : # {{{2
+        self.lines = []
+        self.buffer = ''
+        self.state = BEFORE_ALL
+        self.pending = ''
+
+    def newline (self) : # {{{2
+        self.lines.append(self.buffer)
+        self.buffer = ''
+
+    def nonnull (self, text) : # {{{2
+        if self.state == MID_SENTENCE :
+            self.buffer += self.pending + ', '
+        else :
+            if self.state == AFTER_BLOCK :
+                self.buffer += add_period(self.pending)
+                self.newline()
+            elif self.state == BEFORE_ALL :
+                self.buffer += self.pending
+            else :
+                self.buffer += add_period(self.pending) + ' '
+            self.state = MID_SENTENCE
+        self.pending = text
+
+    def output (self, text) : # {{{2
+        if not empty(text) :
+            self.nonnull(text)
+
+    # bibtex warns about empty required fields; the entry is the same
+    check = output
+
+    def new_block (self) : # {{{2
+        if self.state != BEFORE_ALL :
+            self.state = AFTER_BLOCK
+
+    def new_sentence (self) : # {{{2
+        if self.state not in (AFTER_BLOCK, BEFORE_ALL) :
+            self.state = AFTER_SENTENCE
+
+    def add_blank (self) : # {{{2
+        self.pending += ' '
+        self.state = BEFORE_ALL
+
+    def fin_entry (self) : # {{{2
+        self.buffer += add_period(self.pending)
+        self.newline()
+
+##############################################################################
+
+class CVStyle : # {{{1
+
+    '''CV.bst, used by the dossier. Each entry type is formatted by the
+       method of the same name; types without one are formatted as misc.'''
+
+    name = 'CV'
+    write_urls = False
+    truncate_after = None # CV-short cuts long author lists to "et al."
+
+    def __init__ (self, cv_author = '') : # {{{2
+        self.cv_author = cv_author
+
+    def render (self, entry) : # {{{2
+        'Returns the lines of the .bbl for entry, starting with \bibitem.'
+        self.entry = entry
+        self.out = _Output()
+        self.out.newline()
+        self.out.buffer = r'\bibitem{' + entry.key + '}'
+        self.out.newline()
+        getattr(self, entry.type, self.misc)()
+        if self.write_urls and not empty(self.field('url')) :
+            self.out.buffer = r'\newline\urlprefix\url{' + \
+                self.field('url') + '}'
+            self.out.newline()
+        (lines, self.entry, self.out) = (self.out.lines, None, None)
+        return lines
+
+    def field (self, name) : # {{{2
+        return self.entry.get(name)
+
+    def text (self, name) : # {{{2
+        'The equivalent of field.or.null.'
+        value = self.entry.get(name)
+        return '' if value is None else value
+
+    def highlight (self, name) : # {{{2
+
+        '''Marks up one formatted name: undergraduates, students, the
+           author of the CV, and corresponding authors.'''
+
+        if name in self.formatted('undergraduate') :
+            name = r'\textsf{\slshape ' + name + '}'
+        if name in self.formatted('student') :
+            name = emphasize(name)
+        if purify(name) == purify(self.cv_author) :
+            name = bolden(name)
+        for corauth in self.formatted('corauth') :
+            if name == corauth or name == bolden(corauth) :
+                name = '*' + name
+                break
+        return name
+
+    def formatted (self, field) : # {{{2
+        value = self.field(field)
+        if empty(value) :
+            return []
+        return [format_name(x) for x in split_names(value)]
+
+    def format_names (self, names) : # {{{2
+        if empty(names) :
+            return '' if names is None else names
+        names = split_names(names)
+        result = ''
+        left = len(names)
+        for (i, name) in enumerate(names) :
+            if left == 0 :
+                break
+            formatted = self.highlight(format_name(name))
+            if i == 0 :
+                result = formatted
+            else :
+                if self.truncate_after is not None and i == 1 and \
+                        len(names) > self.truncate_after :
+                    formatted = 'others'
+                    left = 1
+                if left > 1 :
+                    result += ', ' + formatted
+                else :
+                    if last_name(name) == 'others' :
+                        formatted = 'others'
+                    if len(names) > 2 :
+                        result += ','
+                    if formatted == 'others' :
+                        result += ' ' + emphasize('et~al.')
+                    else :
+                        result += ' and ' + formatted
+            left -= 1
+        return result
+
+    def format_authors (self) : # {{{2
+        return self.format_names(self.field('author'))
+
+    def editor_word (self) : # {{{2
+        return 'editors' if len(split_names(self.text('editor'))) > 1 \
+            else 'editor'
+
+    def format_editors (self) : # {{{2
+        editors = self.format_names(self.field('editor'))
+        if empty(editors) :
+            return editors
+        return editors + ', ' + self.editor_word()
+
+    def format_note (self) : # {{{2
+        note = self.field('note')
+        if empty(note) :
+            return ''
+        if note[0] == '{' :
+            return note
+        return change_case(note[0], 'l' if self.out.state == MID_SENTENCE \
+            else 'u') + note[1:]
+
+    def format_title (self) : # {{{2
+        title = self.text('title')
+        if empty(title) :
+            return title
+        return r'\enquote{' + add_period(title) + '}'
+
+    def format_btitle (self) : # {{{2
+        return emphasize(self.text('title'))
+
+    def format_doi (self) : # {{{2
+        if not empty(self.field('doi')) :
+            self.out.new_block()
+            self.out.check('DOI: ' + self.field('doi'))
+
+    def format_date (self) : # {{{2
+        year = self.text('year')
+        if empty(year) :
+            return ''
+        self.out.state = BEFORE_ALL
+        return ' (' + year + ')'
+
+    def format_bvolume (self) : # {{{2
+        volume = self.text('volume')
+        if empty(volume) :
+            return ''
+        result = 'volume' + tie_or_space(volume) + volume
+        if not empty(self.field('series')) :
+            result += ' of ' + emphasize(self.field('series'))
+        return result
+
+    def format_number_series (self) : # {{{2
+        if not empty(self.field('volume')) :
+            return ''
+        number = self.text('number')
+        series = self.text('series')
+        if empty(number) :
+            return series
+        if empty(series) :
+            return number
+        word = 'number' if self.out.state == MID_SENTENCE else 'Number'
+        return word + tie_or_space(number) + number + ' in ' + series
+
+    def format_edition (self) : # {{{2
+        edition = self.text('edition')
+        if empty(edition) :
+            return edition
+        return change_case(edition, 'l' if self.out.state == MID_SENTENCE \
+            else 't') + ' edition'
+
+    def format_pages (self) : # {{{2
+        pages = self.text('pages')
+        if empty(pages) :
+            return pages
+        if re.search(r'[-,+]', pages) :
+            pages = ndashify(pages)
+            return 'pp.' + tie_or_space(pages) + pages
+        return 'p.' + tie_or_space(pages) + pages
+
+    def format_vol_num_pages (self) : # {{{2
+        result = bolden(self.text('volume'))
+        if not empty(self.field('number')) :
+            result += '~(' + self.field('number') + ')'
+        eid = self.text('eid')
+        if empty(eid) :
+            pages = self.text('pages')
+            if empty(pages) :
+                return result
+            if empty(result) :
+                return self.format_pages()
+            return result + ': ' + ndashify(pages)
+        if empty(result) :
+            return result + eid
+        return result + ': ' + eid
+
+    def format_chapter_pages (self) : # {{{2
+        chapter = self.text('chapter')
+        if empty(chapter) :
+            return self.format_pages()
+        kind = self.text('type')
+        kind = 'chapter' if empty(kind) else change_case(kind, 'l')
+        result = kind + tie_or_space(chapter) + chapter
+        if not empty(self.field('pages')) :
+            result += ', ' + self.format_pages()
+        return result
+
+    def format_in_ed_booktitle (self) : # {{{2
+        booktitle = emphasize(self.text('booktitle'))
+        if empty(booktitle) :
+            return booktitle
+        editors = self.format_names(self.field('editor'))
+        if not empty(editors) :
+            booktitle += ', ' + editors + ', ' + self.editor_word()
+        return 'In ' + booktitle
+
+    def format_thesis_type (self, default) : # {{{2
+        kind = self.text('type')
+        return default if empty(kind) else change_case(kind, 't')
+
+    def format_tr_number (self) : # {{{2
+        number = self.text('number')
+        kind = self.text('type')
+        if empty(kind) :
+            kind = 'Technical Report'
+        if empty(number) :
+            return change_case(kind, 't')
+        return kind + tie_or_space(number) + number
+
+    def format_org_or_pub (self, name) : # {{{2
+        address = self.text('address')
+        if empty(address) and empty(name) :
+            return ''
+        if empty(name) :
+            return address
+        return (address + ': ' if not empty(address) else address) + name
+
+    def format_publisher_address (self) : # {{{2
+        return self.format_org_or_pub(self.text('publisher'))
+
+    def format_organization_address (self) : # {{{2
+        return self.format_org_or_pub(self.text('organization'))
+
+    def authors_or_editors (self) : # {{{2
+        if empty(self.field('author')) :
+            self.out.check(self.format_editors())
+        else :
+            self.out.nonnull(self.format_authors())
+
+    def journal (self) : # {{{2
+        self.out.check(emphasize(self.text('journal')))
+        self.out.add_blank()
+
+    def article (self) : # {{{2
+        out = self.out
+        out.check(self.format_authors())
+        out.new_block()
+        out.check(self.format_title())
+        out.new_block()
+        self.journal()
+        out.output(self.format_vol_num_pages())
+        out.check(self.format_date())
+        out.output(self.format_note())
+        if self.field('pages') is None :
+            self.format_doi()
+        out.fin_entry()
+
+    def book (self) : # {{{2
+        out = self.out
+        self.authors_or_editors()
+        out.new_block()
+        out.check(self.format_btitle())
+        out.output(self.format_bvolume())
+        out.new_block()
+        out.new_sentence()
+        out.output(self.format_number_series())
+        out.output(self.format_publisher_address())
+        out.output(self.format_edition())
+        out.check(self.format_date())
+        out.new_block()
+        out.output(self.format_note())
+        out.fin_entry()
+
+    def booklet (self) : # {{{2
+        out = self.out
+        out.output(self.format_authors())
+        out.new_block()
+        out.check(self.format_title())
+        out.new_block()
+        out.output(self.text('howpublished'))
+        out.output(self.text('address'))
+        out.output(self.format_date())
+        out.new_block()
+        out.output(self.format_note())
+        out.fin_entry()
+
+    def inbook (self) : # {{{2
+        out = self.out
+        self.authors_or_editors()
+        out.new_block()
+        out.check(self.format_title())
+        out.new_block()
+        out.check(self.format_in_ed_booktitle())
+        self.inbook_details()
+
+    def inbook_details (self) : # {{{2
+        out = self.out
+        out.output(self.format_bvolume())
+        out.check(self.format_chapter_pages())
+        out.new_block()
+        out.new_sentence()
+        out.output(self.format_number_series())
+        out.output(self.format_publisher_address())
+        out.output(self.format_edition())
+        out.check(self.format_date())
+        out.new_block()
+        out.output(self.format_note())
+        out.fin_entry()
+
+    def incollection (self) : # {{{2
+        out = self.out
+        out.check(self.format_authors())
+        out.new_block()
+        out.check(self.format_title())
+        out.new_block()
+        out.check(self.format_in_ed_booktitle())
+        out.output(self.format_bvolume())
+        out.output(self.format_chapter_pages())
+        out.new_sentence()
+        out.output(self.format_number_series())
+        out.output(self.format_publisher_address())
+        out.output(self.format_edition())
+        out.check(self.format_date())
+        out.new_block()
+        out.output(self.format_note())
+        out.fin_entry()
+
+    def inproceedings (self) : # {{{2
+        out = self.out
+        out.check(self.format_authors())
+        out.new_block()
+        out.check(self.format_title())
+        out.new_block()
+        out.check(self.format_in_ed_booktitle())
+        out.output(self.format_bvolume())
+        out.output(self.format_pages())
+        out.new_sentence()
+        out.output(self.format_number_series())
+        if empty(self.field('publisher')) :
+            out.output(self.format_organization_address())
+        else :
+            out.output(self.text('organization'))
+            out.output(self.format_publisher_address())
+        out.check(self.format_date())
+        out.new_block()
+        out.output(self.format_note())
+        out.fin_entry()
+
+    conference = inproceedings
+
+    def manual (self) : # {{{2
+        out = self.out
+        if empty(self.field('author')) :
+            if not empty(self.field('organization')) :
+                out.output(self.field('organization'))
+                out.output(self.text('address'))
+        else :
+            out.nonnull(self.format_authors())
+        out.new_block()
+        out.check(self.format_btitle())
+        if empty(self.field('author')) :
+            if empty(self.field('organization')) :
+                if not empty(self.field('address')) :
+                    out.new_block()
+                out.output(self.text('address'))
+        else :
+            if not (empty(self.field('organization')) and \
+                    empty(self.field('address'))) :
+                out.new_block()
+            out.output(self.text('organization'))
+            out.output(self.text('address'))
+        out.output(self.format_edition())
+        out.output(self.format_date())
+        out.new_block()
+        out.output(self.format_note())
+        out.fin_entry()
+
+    def thesis (self, default) : # {{{2
+        out = self.out
+        out.check(self.format_authors())
+        out.new_block()
+        out.check(self.format_btitle())
+        out.new_block()
+        out.nonnull(self.format_thesis_type(default))
+        out.output(self.text('school'))
+        out.output(self.text('address'))
+        out.check(self.format_date())
+        out.new_block()
+        out.output(self.format_note())
+        out.fin_entry()
+
+    def mastersthesis (self) : # {{{2
+        self.thesis('Thesis')
+
+    def phdthesis (self) : # {{{2
+        self.thesis('Dissertation')
+
+    def misc (self) : # {{{2
+        out = self.out
+        out.output(self.format_authors())
+        if not (empty(self.field('title')) and \
+                empty(self.field('howpublished'))) :
+            out.new_block()
+        out.output(self.format_title())
+        if not empty(self.field('howpublished')) :
+            out.new_block()
+        out.output(self.text('howpublished'))
+        out.output(self.format_date())
+        out.new_block()
+        out.output(self.format_note())
+        out.fin_entry()
+
+    def proceedings (self) : # {{{2
+        out = self.out
+        if empty(self.field('editor')) :
+            out.output(self.text('organization'))
+        else :
+            out.nonnull(self.format_editors())
+        out.new_block()
+        out.check(self.format_btitle())
+        out.output(self.format_bvolume())
+        if empty(self.field('editor')) :
+            if not empty(self.field('publisher')) :
+                out.new_sentence()
+                out.output(self.format_number_series())
+                out.output(self.format_publisher_address())
+        elif empty(self.field('publisher')) :
+            out.new_sentence()
+            out.output(self.format_organization_address())
+        else :
+            out.new_sentence()
+            out.output(self.text('organization'))
+            out.output(self.format_publisher_address())
+        out.check(self.format_date())
+        out.new_block()
+        out.output(self.format_note())
+        out.fin_entry()
+
+    def techreport (self) : # {{{2
+        out = self.out
+        out.check(self.format_authors())
+        out.new_block()
+        out.check(self.format_btitle())
+        out.new_block()
+        out.nonnull(self.format_tr_number())
+        out.output(self.text('institution'))
+        out.output(self.text('address'))
+        out.check(self.format_date())
+        out.new_block()
+        out.output(self.format_note())
+        out.fin_entry()
+
+    def unpublished (self) : # {{{2
+        out = self.out
+        out.check(self.format_authors())
+        out.new_block()
+        out.check(self.format_title())
+        if self.field('journal') is not None :
+            out.new_block()
+            self.journal()
+            if self.field('pages') is not None :
+                out.output(self.format_vol_num_pages())
+        out.check(self.format_date())
+        self.unpublished_end()
+
+    def unpublished_end (self) : # {{{2
+        self.out.check(self.format_note())
+        self.format_doi()
+        self.out.fin_entry()
+
+    @classmethod
+    def begin (cls) : # {{{2
+        'The lines begin.bib writes before \begin{thebibliography}.'
+        return [r'\frenchspacing', r"\providecommand{\enquote}[1]{``#1''}",
+            r'\providecommand{\url}[1]{\texttt{#1}}',
+            r'\providecommand{\urlprefix}{URL }']
+
+##############################################################################
+
+class CVShortStyle (CVStyle) : # {{{1
+
+    '''CV-short.bst, used by the short CV: only the CV's author is marked,
+       author lists of more than ten are cut to "First \emph{et~al.}", and
+       URLs are printed (but not for articles).'''
+
+    name = 'CV-short'
+    write_urls = True
+    truncate_after = 10
+
+    def highlight (self, name) : # {{{2
+        return bolden(name) if purify(name) == purify(self.cv_author) \
+            else name
+
+    def render (self, entry) : # {{{2
+        # CV-short.bst does not write the URLs of articles
+        self.write_urls = entry.type != 'article'
+        return super().render(entry)
+
+    def article (self) : # {{{2
+        out = self.out
+        out.check(self.format_authors())
+        out.new_block()
+        out.check(self.format_title())
+        out.new_block()
+        self.journal()
+        out.output(self.format_vol_num_pages())
+        out.check(self.format_date())
+        if empty(self.field('volume')) and not empty(self.field('doi')) :
+            self.format_doi()
+        out.new_block()
+        out.output(self.format_note())
+        out.fin_entry()
+
+    def inbook (self) : # {{{2
+        out = self.out
+        self.authors_or_editors()
+        out.new_block()
+        out.check(self.format_btitle())
+        self.inbook_details()
+
+##############################################################################
+
+class CVWithDOIStyle (CVStyle) : # {{{1
+
+    '''CV-with-doi.bst, used by the biosketch: only the CV's author is
+       marked, and articles and chapters end with \doi{...} and the URL.'''
+
+    name = 'CV-with-doi'
+    write_urls = True
+
+    def highlight (self, name) : # {{{2
+        return bolden(name) if purify(name) == purify(self.cv_author) \
+            else name
+
+    def doi (self) : # {{{2
+        doi = self.text('doi')
+        return r'\doi{' + doi + '}' if not empty(doi) else ''
+
+    def article (self) : # {{{2
+        out = self.out
+        out.check(self.format_authors())
+        out.new_block()
+        out.check(self.format_title())
+        out.new_block()
+        self.journal()
+        out.output(self.format_vol_num_pages())
+        out.check(self.format_date())
+        out.new_block()
+        out.output(self.format_note())
+        out.new_block()
+        out.output(self.doi())
+        out.fin_entry()
+
+    def incollection (self) : # {{{2
+        out = self.out
+        out.check(self.format_authors())
+        out.new_block()
+        out.check(self.format_title())
+        out.new_block()
+        out.check(self.format_in_ed_booktitle())
+        out.output(self.format_bvolume())
+        out.output(self.format_chapter_pages())
+        out.new_sentence()
+        out.output(self.format_number_series())
+        out.output(self.format_publisher_address())
+        out.output(self.format_edition())
+        out.check(self.format_date())
+        out.new_block()
+        out.output(self.format_note())
+        out.new_block()
+        out.output(self.doi())
+        out.fin_entry()
+
+    def unpublished_end (self) : # {{{2
+        self.out.new_block()
+        self.out.check(self.format_note())
+        self.out.fin_entry()
+
+    @classmethod
+    def begin (cls) : # {{{2
+        return CVStyle.begin() + [r'\providecommand{\doi}{DOI }']
+
+##############################################################################
+
+STYLES = {style.name: style for style in (CVStyle, CVShortStyle,
+    CVWithDOIStyle)}
+
+_entry_cache = {}
+
+def render_entry (entry, style = 'CV', cv_author = '') : # {{{1
+
+    '''Returns the .bbl lines for one BibEntry in the named style, formatting
+       it only if it (or the author of the CV) changed since last time.'''
+
+    stamp = (style, cv_author, entry.signature())
+    try :
+        return _entry_cache[stamp]
+    except KeyError :
+        lines = _entry_cache[stamp] = STYLES[style](cv_author).render(entry)
+        return lines
+
+def render_bbl (entries, style = 'CV', preamble = ()) : # {{{1
+
+    '''Returns the text of a .bbl file listing entries (BibEntry objects, in
+       citation order) in the named style, as bibtex would write it.'''
+
+    lines = [x for x in preamble if x != '']
+    lines += STYLES[style].begin()
+    # The label is only used to set the width of the (unprinted) numbers
+    lines.append(r'\begin{thebibliography}{1' + \
+        '0' * (len(str(len(entries))) - 1) + '}')
+    cv_author = ''
+    for entry in entries :
+        if entry.type == 'config' :
+            authors = split_names(entry.get('author') or '')
+            if len(authors) == 0 :
+                print ('WARNING: The CV entry should define the author of',
+                    'your CV', file = sys.stderr)
+            else :
+                cv_author = purify(format_name(authors[0]))
+            lines += [r'\makeatletter', r'\AtEndDocument{\immediate' \
+                r'\write\@auxout{\noexpand\bibcite{' + entry.key + '}{}}}',
+                r'\makeatother']
+    for entry in entries :
+        if entry.type != 'config' :
+            lines += render_entry(entry, style, cv_author)
+    lines += ['', r'\end{thebibliography}']
+    return '\n'.join(lines) + '\n'
+
+##############################################################################
+
+def _strip_comments (text) : # {{{1
+    return re.sub(r'(?<!\\)%.*', '', text)
+
+def _database_names (text) : # {{{1
+    'The .bib files named by \\bibliography commands in text.'
+    names = []
+    for databases in re.findall(r'\\(?:no)?bibliography{([^}]*)}', text) :
+        for database in databases.split(',') :
+            database = database.strip()
+            if database == '' :
+                continue
+            if not database.endswith('.bib') :
+                database += '.bib'
+            names.append(database)
+    return names
+
+def bib_files (filename) : # {{{1
+    'The paths of the .bib files the LaTeX file filename uses (if found).'
+    directory = os.path.dirname(filename) or '.'
+    with open(filename, 'r') as texfile :
+        text = _strip_comments(texfile.read())
+    paths = [find_file(x, directory) for x in _database_names(text)]
+    return [x for x in paths if x is not None]
+
+def _load_bibliography (text, directory) : # {{{1
+
+    '''Reads the style and the .bib files named in the LaTeX source text.
+       Returns (style, entries by lower-case key, @preamble strings), or
+       None if it has no bibliography, more than one style, or a style this
+       module does not know.'''
+
+    styles = set(x.strip() for x in \
+        re.findall(r'\\bibliographystyle{([^}]*)}', text))
+    databases = _database_names(text)
+    if len(styles) != 1 or len(databases) == 0 :
+        return None
+    style = styles.pop()
+    if style not in STYLES :
+        return None
+    macros = {}
+    bstfile = find_file(style + '.bst', directory)
+    if bstfile is not None :
+        macros = bst_macros(bstfile)
+    entries = {}
+    preamble = []
+    for database in databases :
+        path = find_file(database, directory)
+        if path is None :
+            print ('WARNING: unable to find', database, file = sys.stderr)
+            return None
+        (found, strings) = read_bib(path, macros)
+        for (key, entry) in found.items() :
+            entries.setdefault(key, entry)
+        preamble += strings
+    return (style, entries, preamble)
+
+def write_bbl (filename) : # {{{1
+
+    '''Writes the .bbl file for the LaTeX file filename without running
+       bibtex, reading the style, the .bib files, and the citations from
+       the LaTeX source itself. Returns True if it did and False if the
+       document should go through bibtex instead (it has no bibliography,
+       or more than one style, or a style this module does not know).'''
+
+    (stem, extension) = os.path.splitext(filename)
+    directory = os.path.dirname(filename) or '.'
+    with open(filename, 'r') as texfile :
+        text = _strip_comments(texfile.read())
+    bibliography = _load_bibliography(text, directory)
+    if bibliography is None :
+        return False
+    (style, entries, preamble) = bibliography
+    cited = []
+    seen = set()
+    for keys in re.findall(r'\\(?:nocite|cite[a-zA-Z]*|bibentry)\*?' \
+            r'(?:\[[^]]*\])*{([^}]*)}', text) :
+        for key in keys.split(',') :
+            key = key.strip()
+            if key == '*' :
+                for entry in entries.values() :
+                    if entry.key.lower() not in seen :
+                        seen.add(entry.key.lower())
+                        cited.append(entry)
+                continue
+            if key == '' or key.lower() in seen :
+                continue
+            seen.add(key.lower())
+            entry = entries.get(key.lower())
+            if entry is None :
+                print ('WARNING: no database entry for', key,
+                    file = sys.stderr)
+                continue
+            if entry.key != key :
+                # \bibitem uses the key as it was cited
+                entry = BibEntry(entry.type, key, entry.fields)
+            cited.append(entry)
+    with open(stem + '.bbl', 'w') as bblfile :
+        bblfile.write(render_bbl(cited, style, preamble))
+    return True
+
+def bibentry_texts (text, directory = '.') : # {{{1
+
+    '''What \\bibentry prints for each entry in the bibliography of the
+       LaTeX source text: a dictionary from lower-case keys to LaTeX, empty
+       if the document would have to go through bibtex.'''
+
+    text = _strip_comments(text)
+    bibliography = _load_bibliography(text, directory)
+    if bibliography is None :
+        return {}
+    (style, entries, preamble) = bibliography
+    cv_author = ''
+    config = [x for x in entries.values() if x.type == 'config']
+    if len(config) > 0 :
+        authors = split_names(config[0].get('author') or '')
+        if len(authors) > 0 :
+            cv_author = purify(format_name(authors[0]))
+    texts = {}
+    for (key, entry) in entries.items() :
+        if entry.type != 'config' :
+            # drop the \bibitem, the \newblock markers, and (as
+            # bibentry.sty does) the final period
+            lines = [x.strip() for x in render_entry(entry, style,
+                cv_author) if not x.startswith(r'\bibitem')]
+            texts[key] = re.sub(r'\.$', '', re.sub(r'\\newblock\s*', '',
+                ' '.join(x for x in lines if x != '')))
+    return texts
+
+# vim: foldmethod=marker
@@ -0,0 +1,233 @@
+'''A pool of long-lived headless browsers for the scraping code.
+
+Starting Firefox takes several seconds, so rather than launching one per
+paper, the Google Scholar and Web of Science updaters check a browser out of
+a shared pool and hand it back when they are done. Browsers that stop
+responding, or that have loaded constants.BROWSER_MAX_PAGES pages, are shut
+down and replaced the next time one is needed.
+
+The pool does not care what a "browser" is, only that it can be made by
+calling its factory and has get(), quit() and current_url. FakeDriver
+satisfies that without selenium, for exercising the pool offline.'''
+
+import sys
+import atexit
+import queue
+import threading
+import contextlib
+from . import constants
+
+def firefox_driver () : # {{{1
+
+    'Starts a headless Firefox through selenium.'
+
+    import selenium.webdriver
+    options = selenium.webdriver.firefox.options.Options()
+    options.add_argument('-headless')
+    return selenium.webdriver.Firefox(options = options)
+
+##############################################################################
+
+class FakeElement : # {{{1
+
+    'Stands in for a selenium WebElement.'
+
+    def __init__ (self, text = '', **attributes) : # {{{2
+        self.text = text
+        self.attributes = attributes
+
+    def get_attribute (self, name) : # {{{2
+        return self.attributes.get(name)
+
+##############################################################################
+
+class FakeDriver : # {{{1
+
+    '''Stands in for a selenium WebDriver. pages maps a URL to a dictionary
+       mapping a tag or class name to the list of FakeElements found under
+       it; URLs not listed give empty pages.'''
+
+    def __init__ (self, pages = None) : # {{{2
+        self.pages = pages if pages is not None else {}
+        self.history = []
+        self.closed = False
+        self._url = 'about:blank'
+
+    @property
+    def current_url (self) : # {{{2
+        if self.closed :
+            raise RuntimeError('FakeDriver has been closed')
+        return self._url
+
+    def get (self, url) : # {{{2
+        if self.closed :
+            raise RuntimeError('FakeDriver has been closed')
+        self._url = url
+        self.history.append(url)
+
+    def _find (self, name) : # {{{2
+        return list(self.pages.get(self._url, {}).get(name, []))
+
+    def find_elements_by_tag_name (self, name) : # {{{2
+        return self._find(name)
+
+    def find_elements_by_class_name (self, name) : # {{{2
+        return self._find(name)
+
+    def find_elements_by_xpath (self, xpath) : # {{{2
+        return self._find(xpath)
+
+    def quit (self) : # {{{2
+        self.closed = True
+
+    close = quit
+
+##############################################################################
+
+class PooledBrowser : # {{{1
+
+    '''A browser checked out of a BrowserPool. Behaves like the underlying
+       driver, but counts the pages it loads.'''
+
+    def __init__ (self, driver) : # {{{2
+        self.driver = driver
+        self.pages = 0
+
+    def get (self, url) : # {{{2
+        self.pages += 1
+        return self.driver.get(url)
+
+    def close (self) : # {{{2
+        # Browsers belong to the pool; callers that "close" one are done
+        # with it, which is handled by BrowserPool.release.
+        pass
+
+    def __getattr__ (self, name) : # {{{2
+        return getattr(self.driver, name)
+
+##############################################################################
+
+class BrowserPool : # {{{1
+
+    '''Hands out up to size browsers made by factory, reusing each one for
+       at most max_pages page loads.'''
+
+    def __init__ (self, size = None, max_pages = None, factory = None) : # {{{2
+        self.size = constants.BROWSER_POOL_SIZE if size is None else size
+        self.max_pages = constants.BROWSER_MAX_PAGES if max_pages is None \
+            else max_pages
+        self.factory = firefox_driver if factory is None else factory
+        if self.size < 1 :
+            raise ValueError('BrowserPool.size must be at least 1')
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._started = 0
+
+    def checkout (self) : # {{{2
+
+        '''Returns a working browser, starting a new one if none is idle and
+           the pool is not full; otherwise waits for one to be released.'''
+
+        while True :
+            try :
+                browser = self._idle.get_nowait()
+            except queue.Empty :
+                with self._lock :
+                    start = self._started < self.size
+                    if start :
+                        self._started += 1
+                if start :
+                    try :
+                        return PooledBrowser(self.factory())
+                    except :
+                        with self._lock :
+                            self._started -= 1
+                        raise
+                # Wake up now and then in case a browser was retired
+                # rather than returned, freeing a slot for a new one
+                try :
+                    browser = self._idle.get(timeout = 1)
+                except queue.Empty :
+                    continue
+            if self.healthy(browser) :
+                return browser
+            self._retire(browser)
+
+    def release (self, browser) : # {{{2
+
+        'Returns a browser to the pool, or retires it if it is worn out.'
+
+        if browser.pages >= self.max_pages or not self.healthy(browser) :
+            self._retire(browser)
+        else :
+            self._idle.put(browser)
+
+    @contextlib.contextmanager
+    def browser (self) : # {{{2
+
+        'with pool.browser() as browser: ... checks out and releases.'
+
+        browser = self.checkout()
+        try :
+            yield browser
+        finally :
+            self.release(browser)
+
+    def healthy (self, browser) : # {{{2
+
+        'True if the browser still answers.'
+
+        try :
+            browser.driver.current_url
+            return True
+        except Exception :
+            return False
+
+    def _retire (self, browser) : # {{{2
+        try :
+            browser.driver.quit()
+        except Exception as err :
+            print ('WARNING: unable to shut down browser:', err,
+                file = sys.stderr)
+        with self._lock :
+            self._started -= 1
+
+    def close (self) : # {{{2
+
+        'Shuts down every idle browser.'
+
+        while True :
+            try :
+                self._retire(self._idle.get_nowait())
+            except queue.Empty :
+                break
+
+##############################################################################
+
+_pool = None
+
+def shared_pool () : # {{{1
+
+    'Returns the pool shared by all of the scraping code.'
+
+    global _pool
+    if _pool is None :
+        _pool = BrowserPool()
+    return _pool
+
+@atexit.register
+def _close_shared_pool () :
+    if _pool is not None :
+        _pool.close()
+
+def set_browser_pool (pool) : # {{{1
+
+    '''Replaces the shared pool, e.g. with BrowserPool(factory=FakeDriver).
+       The previous pool's idle browsers are shut down.'''
+
+    global _pool
+    if _pool is not None and _pool is not pool :
+        _pool.close()
+    _pool = pool
+
+# vim: foldmethod=marker
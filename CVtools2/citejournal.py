@@ -0,0 +1,206 @@
+'''Append-only journal of citation updates.
+
+When constants.CITATION_JOURNAL names a file, every change that the Scopus,
+Web of Science, or Google Scholar updaters find is appended to it as one line
+of JSON:
+
+    {"time": "2024-01-31T12:00:00", "key": "Smith2019", "doi": "10.1/xyz",
+     "source": "scopus", "old": 10, "new": 12,
+     "years": {"2023": [3, 4], "2024": [0, 1]}}
+
+where "years" maps each year whose count changed to its old and new counts.
+Replaying the journal onto a CV_data object (replay) brings its citation
+counts up to date without editing the input script by hand; replaying the
+same journal twice changes nothing.
+
+The sections of a document that depend on citations are bracketed in the .tex
+file by comment lines naming the method that wrote them, so rerender can
+rewrite just those sections after new entries are journaled.'''
+
+import os
+import sys
+import json
+import inspect
+import datetime
+import functools
+from . import constants
+
+SOURCES = ('scopus', 'wos', 'google')
+BEGIN = '%<<CITATIONS '
+END = '%>>CITATIONS'
+
+def record (pub, source, old_ncites, old_cite_years) : # {{{1
+
+    '''Journals the difference between a publication's current citations
+       from source and the ones it had before (old_ncites and
+       old_cite_years). Does nothing if nothing changed or there is no
+       journal.'''
+
+    if constants.CITATION_JOURNAL is None :
+        return
+    if source not in SOURCES :
+        raise ValueError('unknown citation source ' + str(source))
+    ncites = getattr(pub, 'ncites_' + source)
+    cite_years = getattr(pub, 'cite_years_' + source)
+    years = {}
+    for year in set(old_cite_years) | set(cite_years) :
+        a = old_cite_years.count(year)
+        b = cite_years.count(year)
+        if a != b :
+            years[str(year)] = [a, b]
+    if ncites == old_ncites and len(years) == 0 :
+        return
+    entry = {'time': datetime.datetime.now().isoformat(timespec='seconds'),
+        'key': pub.key, 'doi': pub.doi, 'source': source,
+        'old': old_ncites, 'new': ncites,
+        'years': dict(sorted(years.items()))}
+    with open(constants.CITATION_JOURNAL, 'a') as journal :
+        print (json.dumps(entry), file = journal)
+
+##############################################################################
+
+def entries (journal = None, since = None) : # {{{1
+
+    '''Generator over the entries in the journal, optionally only those
+       journaled at or after the datetime since.'''
+
+    if journal is None :
+        journal = constants.CITATION_JOURNAL
+    if journal is None or not os.path.isfile(journal) :
+        return
+    with open(journal, 'r') as f :
+        for (n, line) in enumerate(f) :
+            if line.strip() == '' :
+                continue
+            try :
+                entry = json.loads(line)
+            except ValueError :
+                print ('WARNING: skipping malformed line', n + 1,
+                    'of citation journal', journal, file = sys.stderr)
+                continue
+            if since is not None and \
+                    datetime.datetime.fromisoformat(entry['time']) < since :
+                continue
+            yield entry
+
+##############################################################################
+
+def replay (data, journal = None) : # {{{1
+
+    '''Applies every journaled update to the publications in data. Returns
+       the publications whose citations changed.'''
+
+    by_key = {}
+    by_doi = {}
+    for pub in data.publication :
+        if pub.key is not None :
+            by_key[pub.key] = pub
+        if pub.doi is not None :
+            by_doi[pub.doi.lower()] = pub
+    state = {} # (publication, source): [ncites, cite_years]
+    for entry in entries(journal) :
+        pub = by_key.get(entry['key'])
+        if pub is None and entry['doi'] is not None :
+            pub = by_doi.get(entry['doi'].lower())
+        if pub is None :
+            continue
+        source = entry['source']
+        record = state.setdefault((pub, source),
+            [None, list(getattr(pub, 'cite_years_' + source))])
+        for (year, (a, b)) in entry['years'].items() :
+            year = int(year)
+            record[1] = [y for y in record[1] if y != year] + b * [year]
+        record[0] = entry['new']
+    # only the last state counts, so replaying twice changes nothing
+    changed = []
+    for ((pub, source), (ncites, new_years)) in state.items() :
+        new_years.sort(reverse=True)
+        cite_years = getattr(pub, 'cite_years_' + source)
+        if getattr(pub, 'ncites_' + source) == ncites and \
+                sorted(cite_years, reverse=True) == new_years :
+            continue
+        setattr(pub, 'ncites_' + source, ncites)
+        setattr(pub, 'cite_years_' + source, new_years)
+        pub.ncites = max(pub.ncites_wos, pub.ncites_scopus, pub.ncites_google)
+        if pub not in changed :
+            changed.append(pub)
+    return changed
+
+##############################################################################
+
+def citation_section (method) : # {{{1
+
+    '''Decorator for methods (of CV_data or of a publication) whose first
+       argument after self is the texfile and whose output depends on
+       citation counts. When there is a journal, the output is bracketed
+       by markers recording the call, so rerender can repeat it.'''
+
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper (self, texfile, *args, **kwargs) :
+        if constants.CITATION_JOURNAL is None :
+            return method(self, texfile, *args, **kwargs)
+        bound = signature.bind(self, texfile, *args, **kwargs)
+        call = {'call': method.__name__,
+            'args': dict(list(bound.arguments.items())[2:])}
+        if hasattr(self, 'cite_years_scopus') :
+            call['id'] = str(self)
+        print (BEGIN + json.dumps(call), file = texfile)
+        result = method(self, texfile, *args, **kwargs)
+        print (END, file = texfile)
+        return result
+
+    return wrapper
+
+##############################################################################
+
+def rerender (data, filename) : # {{{1
+
+    '''If anything has been journaled since filename (a .tex file written
+       by one of the generators) was last written, replays the journal onto
+       data, rewrites the citation-dependent sections of filename, and
+       regenerates the PDF. Sections of a publication data no longer has
+       (or whose name has changed) are kept as they were. The new .tex
+       file replaces the old one only once it is complete. Returns True if
+       it did so and False if filename was already up to date.'''
+
+    from .tex2pdf import generate_pdf
+    from .pub_stats import PubCount
+    since = datetime.datetime.fromtimestamp(int(os.path.getmtime(filename)))
+    if not any(True for entry in entries(since = since)) :
+        return False
+    replay(data)
+    data.count = PubCount() # counts include citations; redo them
+    pubs = {str(pub): pub for pub in data.publication}
+    with open(filename, 'r') as f :
+        lines = f.readlines()
+    temporary = filename + '.tmp'
+    try :
+        with open(temporary, 'w') as texfile :
+            skipping = False
+            for line in lines :
+                if skipping :
+                    skipping = not line.startswith(END)
+                    continue
+                if not line.startswith(BEGIN) :
+                    texfile.write(line)
+                    continue
+                call = json.loads(line[len(BEGIN):])
+                owner = pubs.get(call['id']) if 'id' in call else data
+                if owner is None : # keep the section as recorded
+                    print ('WARNING: no publication', repr(call['id']),
+                        'in the CV; not rewriting its citations',
+                        file = sys.stderr)
+                    texfile.write(line)
+                    continue
+                getattr(owner, call['call'])(texfile, **call['args'])
+                skipping = True
+        os.replace(temporary, filename)
+    finally :
+        if os.path.exists(temporary) :
+            os.remove(temporary)
+    generate_pdf (filename)
+    return True
+
+# vim: foldmethod=marker
@@ -0,0 +1,257 @@
+'''NSF "Collaborators and Other Affiliations" (COA) tables as a spreadsheet.
+
+write_Collaborators_table prints the tables to the screen, to be typed into
+NSF's COA template. write_COA writes them to a CSV file instead, which opens
+in any spreadsheet program, from which the rows can be pasted into the
+template as they are:
+
+    write_COA(CV, 'COA.csv', bibliography = 'group.bib',
+        relatives = ['Jane Q. Public (Some University)'])
+
+Table 1 is the CV author; Table 2 the relatives given (R:); Table 3 graduate
+and postdoctoral advisors (G:) and former graduate students and postdocs
+(T:); and Table 4 everyone who has been a co-author (A:, on publications and
+presentations) or collaborator (C:, on awarded grants and the collaborators
+in the CV) in the last max_age years, default constants.COLLAB_AGE. People
+in Tables 1 to 3 are left out of Table 4, as NSF asks.
+
+People are told apart as in people.NameIndex. All of the rows come from one
+pass over each part of the CV, and Table 4 keeps only one short record per
+name (not per paper), so papers with thousands of authors take no more
+memory than the number of different names on them. Affiliations come from
+grants ("Name (Affiliation)"), declared Collaborator objects, the present
+addresses of former students, and the AffiliationIndex in
+constants.AFFILIATIONS, if there is one (see affiliations.py); the rest are
+left blank for you to fill in.'''
+
+import re
+import csv
+import html
+import datetime
+import functools
+from . import constants
+from .bibrender import split_names, name_parts
+from .bibimport import bib_entries
+from .htmlpreview import Translator
+from .people import NameIndex, given_names, initials
+from .affiliations import AffiliationIndex
+from .degree import DOCTORATES, MASTERS
+from .employee import GraduateStudent, Postdoc
+
+# the columns of each table, as in NSF's template
+HEADINGS = {
+    1: ('Table 1', 'Your Name', 'Your Organizational Affiliation(s), ' +
+        'last 12 months', 'Last Active'),
+    2: ('Table 2', 'R:', 'Name', 'Organizational Affiliation',
+        'Optional (email, Department)'),
+    3: ('Table 3', 'G:/T:', 'Name', 'Organizational Affiliation',
+        'Optional (email, Department)'),
+    4: ('Table 4', 'A:/C:', 'Name', 'Organizational Affiliation',
+        'Optional (email, Department)', 'Last Active')}
+
+@functools.lru_cache(maxsize=None)
+def plain_text (text) : # {{{1
+    'Turns LaTeX like "G\\\'{e}rard~Depardieu" into plain text (Unicode).'
+    text = Translator().translate(text)
+    return ' '.join(html.unescape(re.sub(r'<[^>]*>', '', text)).split())
+
+@functools.lru_cache(maxsize=None)
+def sortable_name (name) : # {{{1
+    'Turns a name into "Last, First Middle" (Jr. at the end) in plain text.'
+    (first, von, last, jr) = name_parts(name.replace('~', ' '))
+    result = ' '.join(von + last)
+    if len(first) > 0 :
+        result += ', ' + ' '.join(first)
+    if len(jr) > 0 :
+        result += ', ' + ' '.join(jr)
+    return plain_text(result)
+
+def _affiliated (person) : # {{{1
+    'Splits "Name (Affiliation)" into (name, affiliation or None).'
+    m = re.match(r'\s*([^(]*?)\s*\((.*)\)\s*$', person)
+    if m is None :
+        return (person.strip(), None)
+    return (m.group(1), m.group(2))
+
+def _known (affiliation) : # {{{1
+    'affiliation, or None if it is missing or a placeholder.'
+    if affiliation is None or re.search('FIXME|UNKNOWN', affiliation) :
+        return None
+    return affiliation
+
+def _list (value) : # {{{1
+    if value is None :
+        return []
+    if isinstance(value, str) :
+        return [value]
+    return list(value)
+
+def _merge (records, key, new) : # {{{1
+    '''Merges new, a [kind, name, affiliation, year] record, into
+       records[key]: A: over C:, and the affiliation of the latest year.'''
+    record = records.get(key)
+    if record is None :
+        records[key] = list(new)
+        return
+    if new[0] == 'A:' :
+        record[0] = 'A:'
+    if new[3] > record[3] :
+        record[3] = new[3]
+        if new[2] is not None :
+            record[2] = new[2]
+    if record[2] is None :
+        record[2] = new[2]
+
+##############################################################################
+
+def _coauthors (data, bibliography, since) : # {{{1
+
+    '''Generator over (kind, name, affiliation or None, year) for each
+       co-author (kind "A:") and collaborator (kind "C:") since the year
+       since.'''
+
+    for person in data.collaborator :
+        if person.year is None or int(person.year) >= since :
+            name = person.first + ' ' + \
+                ('' if person.middle is None else person.middle + ' ') + \
+                person.last
+            yield ('C:', name, _known(person.institution), person.year)
+    portfolio = data.grant_portfolio()
+    for grant in data.grant :
+        span = portfolio.span(grant)
+        if not grant.awarded or span is None or span.finish.year < since :
+            continue
+        for invest in (grant.PI, grant.coPI, grant.coI,
+                grant.senior_personnel) :
+            for person in _list(invest) :
+                (name, affiliation) = _affiliated(person)
+                yield ('C:', name, _known(affiliation), span.finish.year)
+    for talk in data.presentation :
+        if int(talk.year) >= since :
+            for author in _list(talk.author) :
+                yield ('A:', author, None, int(talk.year))
+    # keyed publications without authors get them from the .bib files
+    missing = {}
+    for pub in data.publication :
+        if not isinstance(pub.year, int) or pub.year < since :
+            continue
+        if pub.author is not None :
+            for author in _list(pub.author) :
+                yield ('A:', author, None, pub.year)
+        elif pub.key is not None :
+            missing[pub.key.lower()] = pub.year
+    for (key, entry) in bib_entries(missing, bibliography).items() :
+        for author in split_names(entry.get('author') or '') :
+            yield ('A:', author, None, missing[key])
+
+def coa_rows (data, bibliography = None, max_age = None, # {{{1
+        relatives = ()) :
+
+    '''Generator over the rows of the COA tables for the CV_data object data
+       (see the module docstring): a heading row before each table, then one
+       row per person. relatives is a list of "Name (Affiliation)" strings or
+       Collaborator objects.'''
+
+    if max_age is None :
+        max_age = constants.COLLAB_AGE
+    now = datetime.date.today().year
+    # nobody appears twice: the CV author, then Tables 2 and 3, are excluded
+    # from what follows them
+    names = NameIndex()
+    seen = set(names.find(x, True) for x in \
+        _list(constants.AUTHOR) + _list(constants.INVESTIGATOR))
+    yield HEADINGS[1]
+    yield ('', sortable_name(data.professor.name), data.professor.school,
+        str(now))
+    yield HEADINGS[2]
+    for person in relatives :
+        if isinstance(person, str) :
+            (name, affiliation) = _affiliated(person)
+        else :
+            name = person.first + ' ' + person.last
+            affiliation = person.institution
+        seen.add(names.find(name, True))
+        yield ('', 'R:', sortable_name(name), plain_text(affiliation or ''),
+            '')
+    # Table 3: advisors
+    yield HEADINGS[3]
+    for degree in data.degree :
+        if degree.degree in DOCTORATES or degree.degree == 'Postdoc' \
+                or (degree.degree in MASTERS and degree.advisor is not None) :
+            advisors = _list(degree.advisor)
+            addresses = _list(degree.advisor_address)
+            for (i, advisor) in enumerate(advisors) :
+                key = names.find(advisor, True)
+                if key in seen :
+                    continue
+                seen.add(key)
+                affiliation = addresses[i] if i < len(addresses) else None
+                yield ('', 'G:', sortable_name(advisor),
+                    plain_text(affiliation or degree.school), '')
+    # Table 3: students and postdocs
+    for person in data.employee :
+        if not isinstance(person, (GraduateStudent, Postdoc)) :
+            continue
+        if person.current or (isinstance(person, GraduateStudent) and
+                person.graduation is None) :
+            continue
+        name = person.first + ' ' + \
+            ('' if person.middle is None else person.middle + ' ') + \
+            person.last
+        key = names.find(name, True)
+        if key in seen :
+            continue
+        seen.add(key)
+        yield ('', 'T:', plain_text(str(person)),
+            plain_text(person.present_address or person.school),
+            person.email or '')
+    # Table 4: one record per name, then per person, of the kind (A: if
+    # ever a co-author), the latest year, and its affiliation
+    yield HEADINGS[4]
+    records = {}
+    for (kind, name, affiliation, year) in _coauthors(data, bibliography,
+            now - max_age) :
+        _merge(records, name, [kind, name, affiliation,
+            int(year) if year is not None else 0])
+    # initials last, so that "M. Mouse" is only taken to be someone whose
+    # name is spelled out if there is one such person
+    people = {}
+    for name in sorted(records, key = lambda x: initials(given_names(x))) :
+        key = names.find(name, True)
+        if key is not None and key not in seen :
+            _merge(people, key, records[name])
+    for (key, record) in people.items() :
+        record[1] = names.names[key]
+    if constants.AFFILIATIONS is not None :
+        index = AffiliationIndex()
+        unknown = [x for x in people.values() if x[2] is None]
+        index.prefetch([x[1] for x in unknown])
+        for record in unknown :
+            record[2] = index.resolve(record[1])
+    for (kind, name, affiliation, year) in sorted(people.values(),
+            key = lambda x: sortable_name(x[1]).lower()) :
+        yield ('', kind, sortable_name(name), plain_text(affiliation or ''),
+            '', str(year) if year > 0 else '')
+
+def write_COA (data, filename, bibliography = None, max_age = None, # {{{1
+        relatives = ()) :
+
+    '''Writes the COA tables to filename as CSV (tab-separated values if its
+       name ends in .tsv or .txt), in UTF-8 with a byte-order mark so that
+       spreadsheet programs get accents right, a row at a time. The other
+       arguments are those of coa_rows. Returns the number of people
+       written.'''
+
+    delimiter = '\t' if filename.endswith(('.tsv', '.txt')) else ','
+    headings = set(x[0] for x in HEADINGS.values())
+    n = 0
+    with open(filename, 'w', newline = '', encoding = 'utf-8-sig') as \
+            csvfile :
+        writer = csv.writer(csvfile, delimiter = delimiter)
+        for row in coa_rows(data, bibliography, max_age, relatives) :
+            writer.writerow(row)
+            if row[0] not in headings :
+                n += 1
+    return n
+
+# vim: foldmethod=marker
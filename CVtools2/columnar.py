@@ -0,0 +1,484 @@
+'''The collections of a CV (or of a whole department's) as columns.
+
+Reports outside the PDF writers (department rollups, accreditation tables,
+annual reviews) used to go through CV_data's lists by hand. columns() turns
+each of the collections in SCHEMAS into a Table, one list per column with a
+fixed name and type, so that the same report works on any CV:
+
+    tables = CV.columns()
+    pubs = tables['publication']
+    pubs.where('year', '>=', 2019).group_by('kind').aggregate(
+        papers = ('title', 'count'), citations = ('ncites', 'sum'))
+
+department_tables puts the tables of many CVs together, with the name of
+each professor in the faculty column, and write_columns writes them out, one
+file per collection:
+
+    write_columns([CV1, CV2, ...], 'department')  # department/grant.parquet
+
+With pyarrow installed, a Table is kept as an Arrow table, where, group_by,
+and aggregate run in Arrow's compute functions, and files are written as
+Parquet; without it, the same operations run a column at a time on Python
+lists, and files are written as CSV (or JSON lines, which keep the lists as
+lists). Every table has the columns of COMMON and then those of its
+collection, in the order given, whether or not any entry has a value.'''
+
+import os
+import csv
+import json
+import datetime
+import itertools
+from .milestones import item_date
+
+def _pyarrow () : # {{{1
+    'Returns the pyarrow module, or None if it is not installed.'
+    try :
+        import pyarrow
+        import pyarrow.compute
+        return pyarrow
+    except ModuleNotFoundError :
+        return None
+
+##############################################################################
+
+def _convert (value, kind) : # {{{1
+    'value as the kind of column kind is (see TYPES), or None.'
+    if value is None :
+        return None
+    try :
+        if kind == 'str' :
+            if isinstance(value, (list, tuple)) :
+                return '; '.join(str(x) for x in value)
+            return str(value)
+        if kind == 'int' :
+            return int(str(value).replace(',', '').strip())
+        if kind == 'float' :
+            if isinstance(value, (list, tuple)) : # e.g. effort by year
+                return sum(float(x) for x in value) / len(value) if \
+                    len(value) > 0 else None
+            return float(str(value).replace(',', '').replace('$', ''))
+        if kind == 'bool' :
+            return bool(value)
+        if kind == 'date' :
+            return value if isinstance(value, datetime.date) else None
+        if kind in ('list', 'ints') :
+            if not isinstance(value, (list, tuple)) :
+                value = [value]
+            return [int(x) if kind == 'ints' else str(x) for x in value]
+    except (TypeError, ValueError) :
+        return None
+    raise ValueError('unknown kind of column ' + repr(kind))
+
+def _year (item) : # {{{1
+    when = item_date(item)
+    return None if when is None else when.year
+
+def _level (item) : # {{{1
+    'local, regional, national, or international, from the mixins.'
+    for cls in type(item).__mro__ :
+        if cls.__name__ in ('Local', 'Regional', 'National',
+                'International') :
+            return cls.__name__.lower()
+    return None
+
+def _isa (name) : # {{{1
+    'A getter for whether an entry is an instance of a class named name.'
+    return lambda item: any(x.__name__ == name for x in type(item).__mro__)
+
+def _role (grant) : # {{{1
+    return grant.role()
+
+# the kinds of column (see _arrow_type for their Arrow types)
+TYPES = ('str', 'int', 'float', 'bool', 'date', 'list', 'ints')
+
+# (column, kind, getter): the getter is the name of an attribute (by default
+# the column) or a function of the entry; faculty is filled in by columns()
+COMMON = (('faculty', 'str', lambda x: None),
+    ('kind', 'str', lambda x: type(x).__name__),
+    ('when', 'date', item_date), ('year', 'int', _year),
+    ('recent', 'bool', None), ('post_appointment', 'bool', None),
+    ('post_tenure', 'bool', None))
+
+SCHEMAS = {
+    'publication': (('key', 'str', None), ('title', 'str', None),
+        ('author', 'list', None), ('journal', 'str', None),
+        ('booktitle', 'str', None), ('doi', 'str', None),
+        ('status', 'int', None), ('peer_reviewed', 'bool', None),
+        ('teaching', 'bool', None), ('significant', 'bool', None),
+        ('most_significant', 'bool', None), ('student', 'list', None),
+        ('undergraduate', 'list', None), ('journal_IF', 'float', None),
+        ('journal_immediacy', 'float', None), ('ncites', 'int', None),
+        ('ncites_wos', 'int', None), ('ncites_scopus', 'int', None),
+        ('ncites_google', 'int', None), ('cite_years_wos', 'ints', None),
+        ('cite_years_scopus', 'ints', None),
+        ('cite_years_google', 'ints', None)),
+    'grant': (('title', 'str', None), ('number', 'str', None),
+        ('source', 'str', None), ('role', 'str', _role),
+        ('PI', 'list', None), ('coPI', 'list', None), ('coI', 'list', None),
+        ('start', 'str', None), ('end', 'str', None),
+        ('amount', 'float', None), ('total_amount', 'float', None),
+        ('external_amount', 'float', None),
+        ('shared_credit', 'float', None), ('awarded', 'bool', None),
+        ('rejected', 'bool', None), ('completed', 'bool', None),
+        ('federal', 'bool', None), ('internal', 'bool', None),
+        ('teaching', 'bool', None), ('months_calendar', 'float', None),
+        ('months_academic', 'float', None),
+        ('months_summer', 'float', None),
+        ('students_supported', 'list', None)),
+    'course': (('school', 'str', None), ('number', 'str', None),
+        ('title', 'str', None), ('semester', 'str', None),
+        ('credits', 'float', None), ('students', 'int', None),
+        ('responses', 'int', None), ('dropped', 'int', None),
+        ('developed', 'bool', None), ('guest', 'bool', None),
+        ('effectiveness_score', 'float', None),
+        ('composite_score', 'float', None),
+        ('mean_effectiveness_score', 'float', None),
+        ('mean_composite_score', 'float', None)),
+    'employee': (('first', 'str', None), ('middle', 'str', None),
+        ('last', 'str', None), ('title', 'str', None),
+        ('project', 'str', None), ('funding', 'str', None),
+        ('school', 'str', None), ('start_date', 'str', None),
+        ('end_date', 'str', None), ('graduation', 'str', None),
+        ('current', 'bool', None), ('advisor', 'list', None),
+        ('coadvisor', 'list', None), ('major', 'str', None),
+        ('degree', 'str', None), ('present_address', 'str', None)),
+    'presentation': (('title', 'str', None), ('author', 'list', None),
+        ('presenter', 'str', None), ('event', 'str', None),
+        ('location', 'str', None), ('invited', 'bool', _isa('InvitedTalk')),
+        ('poster', 'bool', _isa('Poster')), ('teaching', 'bool', None),
+        ('student', 'list', None), ('undergraduate', 'list', None)),
+    'service': (('role', 'str', None), ('description', 'str', None),
+        ('level', 'str', _level), ('start', 'str', None),
+        ('end', 'str', None)),
+    'award': (('description', 'str', None), ('agency', 'str', None),
+        ('student', 'list', None), ('teaching', 'bool', None)),
+}
+
+##############################################################################
+
+def _arrow_type (pa, kind) : # {{{1
+    return {'str': pa.string(), 'int': pa.int64(), 'float': pa.float64(),
+        'bool': pa.bool_(), 'date': pa.date32(),
+        'list': pa.list_(pa.string()), 'ints': pa.list_(pa.int64())}[kind]
+
+def _kind (pa, arrow_type) : # {{{1
+    for kind in TYPES :
+        if _arrow_type(pa, kind) == arrow_type :
+            return kind
+    return 'str'
+
+# comparison: (Python test, Arrow compute function)
+OPERATORS = {
+    '==': (lambda a, b: a == b, 'equal'),
+    '!=': (lambda a, b: a != b, 'not_equal'),
+    '<': (lambda a, b: a < b, 'less'),
+    '<=': (lambda a, b: a <= b, 'less_equal'),
+    '>': (lambda a, b: a > b, 'greater'),
+    '>=': (lambda a, b: a >= b, 'greater_equal'),
+    'in': (lambda a, b: a in b, 'is_in'),
+    'contains': (lambda a, b: b in a, 'match_substring'),
+}
+
+# aggregate: function of the non-null values in a group
+AGGREGATES = {
+    'count': len,
+    'sum': lambda x: sum(x) if len(x) > 0 else None,
+    'mean': lambda x: sum(x) / len(x) if len(x) > 0 else None,
+    'min': lambda x: min(x, default = None),
+    'max': lambda x: max(x, default = None),
+    'count_distinct': lambda x: len(set(x)),
+}
+
+class Table : # {{{1
+
+    '''Columns of equal length, each with a name and a kind (see TYPES),
+       kept as an Arrow table if pyarrow is installed and as a dictionary
+       of lists otherwise. Tables are not changed in place: where, select,
+       and sort_by return new ones.'''
+
+    def __init__ (self, columns, kinds) : # {{{2
+        'columns is a dictionary of lists by name; kinds, of their kinds.'
+        self.kinds = dict(kinds)
+        pa = _pyarrow()
+        if pa is None :
+            self._columns = columns
+            self._arrow = None
+        elif isinstance(columns, dict) :
+            self._columns = None
+            self._arrow = pa.table({name: pa.array(values,
+                type = _arrow_type(pa, self.kinds[name])) for \
+                (name, values) in columns.items()})
+        else : # an Arrow table already
+            self._columns = None
+            self._arrow = columns
+
+    @classmethod
+    def from_items (cls, items, schema, faculty = None) : # {{{2
+        '''A table of the entries items, with the columns COMMON + schema
+           (see SCHEMAS) and faculty in the faculty column.'''
+        columns = {}
+        kinds = {}
+        for (name, kind, getter) in COMMON + tuple(schema) :
+            if name == 'faculty' :
+                values = [faculty] * len(items)
+            elif getter is None :
+                values = [getattr(x, name, None) for x in items]
+            else :
+                values = [getter(x) for x in items]
+            columns[name] = [_convert(x, kind) for x in values]
+            kinds[name] = kind
+        return cls(columns, kinds)
+
+    @classmethod
+    def concat (cls, tables) : # {{{2
+        'One table of the rows of tables, which have the same columns.'
+        tables = list(tables)
+        pa = _pyarrow()
+        if pa is not None :
+            return cls(pa.concat_tables([x._arrow for x in tables]),
+                tables[0].kinds)
+        columns = {name: [] for name in tables[0].kinds}
+        for table in tables :
+            for (name, values) in columns.items() :
+                values.extend(table.column(name))
+        return cls(columns, tables[0].kinds)
+
+    def __len__ (self) : # {{{2
+        if self._arrow is not None :
+            return self._arrow.num_rows
+        return len(next(iter(self._columns.values()), []))
+
+    @property
+    def names (self) : # {{{2
+        return list(self.kinds)
+
+    def column (self, name) : # {{{2
+        'The values in the column name, as a list.'
+        if self._arrow is not None :
+            return self._arrow.column(name).to_pylist()
+        return self._columns[name]
+
+    def rows (self) : # {{{2
+        'Generator over the rows, as dictionaries by column.'
+        if self._arrow is not None :
+            yield from self._arrow.to_pylist()
+            return
+        names = self.names
+        for values in zip(*(self._columns[x] for x in names)) :
+            yield dict(zip(names, values))
+
+    def to_arrow (self) : # {{{2
+        'The table as a pyarrow.Table (which needs pyarrow).'
+        if self._arrow is None :
+            raise ModuleNotFoundError('Arrow tables need pyarrow')
+        return self._arrow
+
+##############################################################################
+
+    def where (self, column, operator, value) : # {{{2
+
+        '''The rows for which the value in column compares to value by
+           operator (one of OPERATORS: "in" means the value in column is one
+           of value; "contains" that it has value in it, as a string or a
+           list). Rows with no value in column are left out.'''
+
+        (test, function) = OPERATORS[operator]
+        if self._arrow is not None and not (operator == 'contains' and
+                self.kinds[column] in ('list', 'ints')) :
+            pa = _pyarrow()
+            values = self._arrow.column(column)
+            if operator == 'in' :
+                mask = pa.compute.is_in(values, value_set = pa.array(
+                    list(value), type = values.type))
+            elif operator == 'contains' :
+                mask = pa.compute.match_substring(values, value)
+            else :
+                mask = getattr(pa.compute, function)(values, value)
+            return Table(self._arrow.filter(mask), self.kinds)
+        mask = [x is not None and test(x, value) for x in self.column(column)]
+        if self._arrow is not None :
+            return Table(self._arrow.filter(_pyarrow().array(mask)),
+                self.kinds)
+        return Table({name: list(itertools.compress(values, mask)) for \
+            (name, values) in self._columns.items()}, self.kinds)
+
+    def select (self, *names) : # {{{2
+        'A table of only the columns names.'
+        kinds = {x: self.kinds[x] for x in names}
+        if self._arrow is not None :
+            return Table(self._arrow.select(list(names)), kinds)
+        return Table({x: self._columns[x] for x in names}, kinds)
+
+    def sort_by (self, column, reverse = False) : # {{{2
+        'The rows in order of column (rows with no value in it last).'
+        if self._arrow is not None :
+            return Table(self._arrow.sort_by([(column, 'descending' if
+                reverse else 'ascending')]), self.kinds)
+        values = self._columns[column]
+        order = sorted((i for i in range(len(values)) if values[i] is not
+            None), key = values.__getitem__, reverse = reverse)
+        order += [i for i in range(len(values)) if values[i] is None]
+        return Table({name: [x[i] for i in order] for (name, x) in \
+            self._columns.items()}, self.kinds)
+
+    def group_by (self, *keys) : # {{{2
+        'The rows grouped by the values of the columns keys (see Grouping).'
+        return Grouping(self, keys)
+
+    def aggregate (self, **outputs) : # {{{2
+        'The aggregates outputs (see Grouping.aggregate) of the whole table.'
+        return Grouping(self, ()).aggregate(**outputs)
+
+##############################################################################
+
+    def write (self, filename, format = None) : # {{{2
+
+        '''Writes the table to filename, as format ('parquet', 'feather',
+           'csv', or 'jsonl'; by default, from the extension of filename).
+           In CSV, lists are written as JSON and dates as YYYY-MM-DD.'''
+
+        if format is None :
+            format = os.path.splitext(filename)[1].lstrip('.').lower()
+            format = {'arrow': 'feather', 'json': 'jsonl', 'ndjson': 'jsonl',
+                'tsv': 'csv'}.get(format, format)
+        if format in ('parquet', 'feather') :
+            if _pyarrow() is None :
+                raise ModuleNotFoundError('writing ' + format.capitalize() +
+                    ' files needs pyarrow')
+            if format == 'parquet' :
+                import pyarrow.parquet
+                pyarrow.parquet.write_table(self._arrow, filename)
+            else :
+                import pyarrow.feather
+                pyarrow.feather.write_feather(self._arrow, filename)
+        elif format == 'jsonl' :
+            with open(filename, 'w', encoding = 'utf-8') as jsonfile :
+                for row in self.rows() :
+                    print (json.dumps(row, default = str, ensure_ascii =
+                        False), file = jsonfile)
+        elif format == 'csv' :
+            names = self.names
+            lists = [x for x in names if self.kinds[x] in ('list', 'ints')]
+            with open(filename, 'w', newline = '', encoding = 'utf-8') as \
+                    csvfile :
+                writer = csv.writer(csvfile, delimiter = '\t' if
+                    filename.endswith('.tsv') else ',')
+                writer.writerow(names)
+                for row in self.rows() :
+                    for name in lists :
+                        if row[name] is not None :
+                            row[name] = json.dumps(row[name])
+                    writer.writerow(['' if row[x] is None else row[x] for \
+                        x in names])
+        else :
+            raise ValueError('unknown format ' + repr(format))
+
+##############################################################################
+
+class Grouping : # {{{1
+
+    'The rows of a Table grouped by the values of some of its columns.'
+
+    def __init__ (self, table, keys) : # {{{2
+        self.table = table
+        self.keys = tuple(keys)
+
+    def aggregate (self, **outputs) : # {{{2
+
+        '''A Table with a row per group (in order of their first rows): the
+           keys, and a column for each output name=(column, aggregate), where
+           aggregate is one of AGGREGATES, computed over the values in column
+           that are not None, e.g. aggregate(n = ('title', 'count')).'''
+
+        table = self.table
+        if table._arrow is not None :
+            return self._arrow_aggregate(outputs)
+        groups = {}
+        if len(self.keys) == 0 :
+            groups[()] = range(len(table))
+        else :
+            keys = [table.column(x) for x in self.keys]
+            for (i, key) in enumerate(zip(*keys)) :
+                groups.setdefault(key, []).append(i)
+        columns = {name: [key[n] for key in groups] for (n, name) in \
+            enumerate(self.keys)}
+        kinds = {x: table.kinds[x] for x in self.keys}
+        for (name, (column, function)) in outputs.items() :
+            values = table.column(column)
+            columns[name] = [AGGREGATES[function]([values[i] for i in rows
+                if values[i] is not None]) for rows in groups.values()]
+            kinds[name] = _output_kind(table.kinds[column], function)
+        return Table(columns, kinds)
+
+    def _arrow_aggregate (self, outputs) : # {{{2
+        pa = _pyarrow()
+        arrow = self.table._arrow
+        if len(self.keys) == 0 :
+            columns = {}
+            for (name, (column, function)) in outputs.items() :
+                values = arrow.column(column)
+                if function == 'count' :
+                    columns[name] = [pa.compute.count(values).as_py()]
+                else :
+                    columns[name] = [getattr(pa.compute, function)(
+                        values).as_py()]
+            return Table(columns, {name: _output_kind(self.table.kinds[
+                column], function) for (name, (column, function)) in \
+                outputs.items()})
+        result = arrow.group_by(list(self.keys), use_threads = False
+            ).aggregate([(column, function) for (column, function) in \
+            outputs.values()])
+        # Arrow names the outputs column_function
+        result = result.select(list(self.keys) + [column + '_' + function \
+            for (column, function) in outputs.values()])
+        result = result.rename_columns(list(self.keys) + list(outputs))
+        return Table(result, {name: _kind(pa, result.schema.field(
+            name).type) for name in result.column_names})
+
+def _output_kind (kind, function) : # {{{1
+    if function in ('count', 'count_distinct') :
+        return 'int'
+    if function == 'mean' :
+        return 'float'
+    if kind == 'bool' and function == 'sum' :
+        return 'int'
+    return kind
+
+##############################################################################
+
+def columns (data, faculty = None) : # {{{1
+    '''A dictionary of the collections of SCHEMAS in the CV_data object data,
+       as Tables, with faculty (by default, the professor's name) in the
+       faculty column.'''
+    if faculty is None and data.professor is not None :
+        faculty = data.professor.name
+    return {name: Table.from_items(getattr(data, name), schema, faculty) \
+        for (name, schema) in SCHEMAS.items()}
+
+def department_tables (cvs) : # {{{1
+    '''The tables of each of the CV_data objects cvs (see CV_data.columns),
+       put together, a table per collection.'''
+    tables = [x.columns() for x in cvs]
+    return {name: Table.concat(x[name] for x in tables) for name in SCHEMAS}
+
+def write_columns (data, directory, format = None) : # {{{1
+
+    '''Writes the tables of the CV_data object data, or of the list of them
+       data (see department_tables), to a file per collection in directory
+       (made if need be), e.g. publication.parquet, as format (by default,
+       Parquet if pyarrow is installed and CSV otherwise; see Table.write).
+       Returns the names of the files.'''
+
+    if format is None :
+        format = 'csv' if _pyarrow() is None else 'parquet'
+    tables = department_tables(data) if isinstance(data, (list, tuple)) \
+        else data.columns()
+    os.makedirs(directory, exist_ok = True)
+    filenames = []
+    for (name, table) in tables.items() :
+        filename = os.path.join(directory, name + '.' + format)
+        table.write(filename, format)
+        filenames.append(filename)
+    return filenames
+
+# vim: foldmethod=marker
@@ -1,6 +1,9 @@
 __all__ = ("DEPT_TEACHING_AVERAGE", "COLLAB_AGE",
     "set_AUTHOR", "set_INVESTIGATOR", "set_SCHOOL",
     "set_SCOPUS_API_KEY", "set_WOS_USERNAME", "set_WOS_PASSWORD",
+    "set_CITATION_JOURNAL", "set_FORMAT_CACHE", "set_NATIVE_BIBLIOGRAPHY",
+    "set_FIGURE_CACHE", "set_JOURNAL_METRICS", "set_AFFILIATIONS",
+    "set_METADATA_INDEX",
     'PUBLISHED', 'ACCEPTED', 'INPRESS', 'SUBMITTED', 'UNSUBMITTED')
 
 DEPT_TEACHING_AVERAGE = 4.16 # FIXME
@@ -12,9 +15,17 @@ UNIVTHE = 'The'
 SCOPUS_API_KEY = None
 WOS_USERNAME = None
 WOS_PASSWORD = None
+CITATION_JOURNAL = None # file recording citation updates (see citejournal)
+FORMAT_CACHE = None # directory for precompiled preamble formats
+NATIVE_BIBLIOGRAPHY = False # write .bbl files without bibtex (see bibrender)
+FIGURE_CACHE = None # directory for precompiled plots (see figcache)
+JOURNAL_METRICS = None # SQLite file of journal metrics (see journalmetrics)
+AFFILIATIONS = None # SQLite file of people's affiliations (see affiliations)
+METADATA_INDEX = None # SQLite file of works from dumps (see metadata)
 MAX_LENGTH = 20 # maximum length of a Scopus citation list by default
 MAX_AUTHORS = 20 # maximum length of author list on a presentation for the CV
 MAX_SCOPUS_QUERIES = 25
+MAX_HTTP_THREADS = 4 # simultaneous connections to a citation database
 MAX_CV_PAGES = 25 # set by the Provost's call letter
 PRINT_CITATION_COUNTS = True
 PLOT_WOS_CITATIONS_PER_YEAR = False
@@ -34,6 +45,11 @@ UNSUBMITTED = 3
 WAIT_TIME = 3
 GOOGLE_TIME_BETWEEN = 3
 
+# Headless browsers kept open for scraping, and pages each one loads before
+# it is restarted
+BROWSER_POOL_SIZE = 2
+BROWSER_MAX_PAGES = 50
+
 def set_SCOPUS_API_KEY (key) :
     global SCOPUS_API_KEY
     SCOPUS_API_KEY = key
@@ -46,6 +62,34 @@ def set_WOS_PASSWORD (password) :
     global WOS_PASSWORD
     WOS_PASSWORD = password
 
+def set_CITATION_JOURNAL (filename) :
+    global CITATION_JOURNAL
+    CITATION_JOURNAL = filename
+
+def set_FORMAT_CACHE (directory) :
+    global FORMAT_CACHE
+    FORMAT_CACHE = directory
+
+def set_NATIVE_BIBLIOGRAPHY (native = True) :
+    global NATIVE_BIBLIOGRAPHY
+    NATIVE_BIBLIOGRAPHY = native
+
+def set_FIGURE_CACHE (directory) :
+    global FIGURE_CACHE
+    FIGURE_CACHE = directory
+
+def set_JOURNAL_METRICS (filename) :
+    global JOURNAL_METRICS
+    JOURNAL_METRICS = filename
+
+def set_AFFILIATIONS (filename) :
+    global AFFILIATIONS
+    AFFILIATIONS = filename
+
+def set_METADATA_INDEX (filename) :
+    global METADATA_INDEX
+    METADATA_INDEX = filename
+
 def set_AUTHOR (newauthor) :
     global AUTHOR
     AUTHOR = newauthor
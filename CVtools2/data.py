@@ -6,6 +6,9 @@ import os
 import sys
 from math import ceil
 from . import constants
+from . import browserpool
+from . import citejournal
+from . import figcache
 from .pub_stats import PubCount, PubStats
 from .professor import Professor
 from .degree import Degree
@@ -20,6 +23,37 @@ from .service import SocietyMembership, ReviewPanel, SessionChair, \
     ManuscriptReview, Service
 from .award import Award
 from .pub_stats import OptimumOrdinate
+from .people import PersonIndex
+from .registry import Registry, CollectionIndex, MergeIndex
+from .milestones import Milestones, PERIODS, item_date
+from .grantportfolio import GrantPortfolio
+from . import bibimport
+from .journalmetrics import JournalMetrics
+from .affiliations import AffiliationIndex
+from .metadata import MetadataIndex
+from . import columnar
+from .snapshots import Snapshot, identities
+from .network import CoauthorNetwork
+from .duplicates import find_duplicates, merge_publications, richness, \
+    report_duplicates
+
+# Where CV_data.append puts each kind of entry: the first of these it is an
+# instance of. Other kinds of entries can be registered.
+COLLECTIONS = Registry([(Professor, 'professor'), (Degree, 'degree'),
+    (Job, 'jobhistory'), (Course, 'course'), (Employee, 'employee'),
+    (Collaborator, 'collaborator'), (Grant, 'grant'),
+    (Presentation, 'presentation'), (Publication, 'publication'),
+    (Patent, 'patent'), (NewsCoverage, 'news'),
+    (SocietyMembership, 'society'), (ReviewPanel, 'panel'),
+    (SessionChair, 'session'), (ManuscriptReview, 'journal_review'),
+    (Service, 'service'), (Award, 'award')])
+
+# collections whose duplicates are merged into the first on append (see
+# merge_key and merge in service.py), and those summarized by key instead;
+# review panels are not merged, since one can sit on two panels of the same
+# division in a year
+MERGED = ('service', 'session')
+SUMMARIZED = ('journal_review',)
 
 class CV_data : # {{{1
 
@@ -53,50 +87,54 @@ class CV_data : # {{{1
         self.texfile = None
         self.texfile_name = None
         self.count = PubCount()
+        self._person_index = None
+        self._person_index_size = None
+        self._indexes = {}
+        self._listeners = [self._drop_caches]
+        self._milestones = None
+        self._periods = None
+        self._portfolio = None
+        self._merges = {}
+        self._columns = None
+        self._network = None
 
 ##############################################################################
 
     def append (self, x) : # {{{2
 
-        'Determines to which array the next class should be appended.'
-
-        if isinstance(x, Professor) :
-            self.professor.append (x)
-        elif isinstance(x, Degree) :
-            self.degree.append (x)
-        elif isinstance(x, Job) :
-            self.jobhistory.append (x)
-        elif isinstance(x, Course) :
-            self.course.append (x)
-        elif isinstance(x, Employee) :
-            self.employee.append (x)
-        elif isinstance(x, Collaborator) :
-            self.collaborator.append (x)
-        elif isinstance(x, Grant) :
-            self.grant.append (x)
-        elif isinstance(x, Presentation) :
-            self.presentation.append (x)
-        elif isinstance(x, Publication) :
-            self.publication.append (x)
-        elif isinstance(x, Patent) :
-            self.patent.append (x)
-        elif isinstance(x, NewsCoverage) :
-            self.news.append (x)
-        elif isinstance(x, SocietyMembership) :
-            self.society.append (x)
-        elif isinstance(x, ReviewPanel) :
-            self.panel.append (x)
-        elif isinstance(x, SessionChair) :
-            self.session.append (x)
-        elif isinstance(x, ManuscriptReview) :
-            self.journal_review.append (x)
-        elif isinstance(x, Service) :
-            # FIXME: This should remove/merge services that are duplicates
-            self.service.append (x)
-        elif isinstance(x, Award) :
-            self.award.append (x)
+        '''Adds x to the collection for its kind (see COLLECTIONS). Raises
+           TypeError if there is none. A service or session that duplicates
+           one already there is merged into it instead (see MERGED).'''
+
+        name = COLLECTIONS.collection(x)
+        if name == 'professor' :
+            self.professor = x
         else :
-            raise TypeError
+            items = getattr(self, name)
+            new = self._unmerged (name, items, [x])
+            if len(new) > 0 :
+                items.append (x)
+                self._added (name, items, new)
+
+    def extend (self, entries) : # {{{2
+
+        '''Appends each of entries (any iterable) as append does, a batch
+           at a time: each collection is extended once, and indexes and
+           listeners hear about each batch once.'''
+
+        batches = {}
+        for x in entries :
+            name = COLLECTIONS.collection(x)
+            if name == 'professor' :
+                self.professor = x
+            else :
+                batches.setdefault(name, []).append(x)
+        for (name, batch) in batches.items() :
+            items = getattr(self, name)
+            batch = self._unmerged (name, items, batch)
+            if len(batch) > 0 :
+                items.extend (batch)
+                self._added (name, items, batch)
 
 ##############################################################################
 
@@ -104,40 +142,363 @@ class CV_data : # {{{1
 
         'Inserts a record elsewhere in the appropriate array.'
 
-        if isinstance(x, Professor) :
-            self.professor.insert (i,x)
-        elif isinstance(x, Degree) :
-            self.degree.insert (i,x)
-        elif isinstance(x, Job) :
-            self.jobhistory.insert (i,x)
-        elif isinstance(x, Course) :
-            self.course.insert (i,x)
-        elif isinstance(x, Employee) :
-            self.employee.insert (i,x)
-        elif isinstance(x, Collaborator) :
-            self.collaborator.insert (i,x)
-        elif isinstance(x, Grant) :
-            self.grant.insert (i,x)
-        elif isinstance(x, Presentation) :
-            self.presentation.insert (i,x)
-        elif isinstance(x, Publication) :
-            self.publication.insert (i,x)
-        elif isinstance(x, Patent) :
-            self.patent.insert (i,x)
-        elif isinstance(x, NewsCoverage) :
-            self.news.insert (i,x)
-        elif isinstance(x, SocietyMembership) :
-            self.society.insert (i,x)
-        elif isinstance(x, ReviewPanel) :
-            self.panel.insert (i,x)
-        elif isinstance(x, SessionChair) :
-            self.session.insert (i,x)
-        elif isinstance(x, ManuscriptReview) :
-            self.journal_review.insert (i,x)
-        elif isinstance(x, Service) :
-            self.service.insert (i,x)
-        elif isinstance(x, Award) :
-            self.award.insert (i,x)
+        name = COLLECTIONS.collection(x)
+        if name == 'professor' :
+            self.professor = x
+        else :
+            items = getattr(self, name)
+            if len(self._unmerged (name, items, [x])) > 0 :
+                items.insert (i,x)
+                self._added (name, items, [x], appended = False)
+
+    def _merge_index (self, name) : # {{{2
+        try :
+            return self._merges[name]
+        except KeyError :
+            index = self._merges[name] = MergeIndex(copies = name in \
+                SUMMARIZED)
+            return index
+
+    def _unmerged (self, name, items, entries) : # {{{2
+
+        '''Merges each of entries that duplicates an entry of the collection
+           name (if it is one of MERGED), or an earlier one of entries, into
+           that entry, and returns the rest. Costs one dictionary lookup
+           per entry.'''
+
+        if name not in MERGED :
+            return entries
+        index = self._merge_index(name)
+        new = []
+        batch = {}
+        for x in entries :
+            key = x.merge_key()
+            found = index.find(items, x)
+            if found is None :
+                found = batch.get(key)
+            if found is None :
+                batch[key] = x
+                new.append(x)
+            else :
+                found.merge(x)
+                self._notify (name, [found]) # its dates may have changed
+        return new
+
+    def _added (self, name, items, new, appended = True) : # {{{2
+        # the indexes that can take the new entries do; the rest listen
+        for index in self._indexes.get(name, {}).values() :
+            index.added (items, new, appended)
+        if name in self._merges :
+            self._merges[name].added (items, new, appended)
+        if name == 'publication' and self._network is not None :
+            self._network[1].added (items, new)
+        self._notify (name, new)
+
+    def edited (self, collection, entries = None) : # {{{2
+
+        '''Tells the CV that entries of the named collection (all of them,
+           if entries is None) were changed in place, e.g. DOIs filled in,
+           so that the indexes and caches that depend on them are made
+           again when next needed (see add_listener). Methods of CV_data that
+           edit entries call this themselves.'''
+
+        self._indexes.pop (collection, None)
+        self._merges.pop (collection, None)
+        if collection == 'publication' :
+            self._network = None
+        if entries is None :
+            entries = getattr(self, collection) if collection != 'professor' \
+                else [self.professor]
+        self._notify (collection, entries)
+
+    def _notify (self, name, entries) : # {{{2
+        for listener in self._listeners :
+            listener (name, entries)
+
+    def _drop_caches (self, name, entries) : # {{{2
+        'The listener that drops what depends on the collection name.'
+        if name in ('employee', 'publication', 'presentation', 'grant') :
+            self._person_index = None
+        if name == 'grant' :
+            self._portfolio = None
+        if name == 'jobhistory' :
+            self._milestones = None
+        self._periods = None
+        self._columns = None
+
+##############################################################################
+
+    def import_bib (self, filenames, overrides = None, # {{{2
+            only_author = True) :
+
+        '''Adds the publications in the .bib files filenames, with the
+           arguments in overrides (by key) added to or replacing theirs (see
+           bibimport.py). Returns the number added.'''
+
+        return bibimport.import_bib (self, filenames, overrides, only_author)
+
+    def fill_journal_metrics (self, metrics = None, # {{{2
+            bibliography = None, overwrite = False) :
+
+        '''Fills in journal_IF and journal_immediacy for the publications
+           from metrics (a JournalMetrics object or the name of its SQLite
+           file; by default constants.JOURNAL_METRICS), except where they were
+           given already (unless overwrite is True). Publications with a key
+           take their journal from the .bib files in bibliography. Returns
+           the number of publications filled.'''
+
+        if not isinstance(metrics, JournalMetrics) :
+            metrics = JournalMetrics(metrics)
+        n = metrics.fill(self.publication, overwrite, bibliography)
+        if n > 0 :
+            self.edited ('publication')
+        return n
+
+    def resolve_affiliations (self, index = None, overwrite = False) : # {{{2
+
+        '''Fills in the institution of each collaborator that has none (or
+           "UNKNOWN/FIXME"; any, if overwrite is True) from index (an
+           AffiliationIndex or the name of its SQLite file; by default
+           constants.AFFILIATIONS). Returns the number filled.'''
+
+        if not isinstance(index, AffiliationIndex) :
+            index = AffiliationIndex(index)
+        n = index.fill(self.collaborator, overwrite)
+        if n > 0 :
+            self.edited ('collaborator')
+        return n
+
+    def backfill_metadata (self, index = None, filenames = (), # {{{2
+            source = 'scopus', overwrite = False, bibliography = None) :
+
+        '''Fills in the DOIs, authors, years, and citations of the
+           publications from index (a MetadataIndex or the name of its SQLite
+           file; by default constants.METADATA_INDEX), after reading the
+           Crossref, OpenAlex, or ORCID dump files filenames into it (see
+           metadata). Citations are filled in as those of source.
+           Publications with only a key are looked up by their entries in the
+           .bib files in bibliography. Returns the number of publications
+           changed.'''
+
+        if not isinstance(index, MetadataIndex) :
+            index = MetadataIndex(index)
+        if len(filenames) > 0 :
+            index.load(filenames, self.publication, bibliography)
+        changed = index.fill(self.publication, source, overwrite,
+            bibliography)
+        if len(changed) > 0 :
+            self.count = PubCount() # the counts are redone with them
+            self.edited ('publication', changed)
+        return len(changed)
+
+##############################################################################
+
+    def lookup (self, collection, attribute, value) : # {{{2
+
+        '''Returns the entries in the named collection whose attribute is
+           value, e.g. lookup('publication', 'doi', '10.1063/1.4934247') or
+           lookup('presentation', 'year', 2019). Strings are compared without
+           regard to case (see registry.normalize). The index this builds
+           is kept for later lookups and updated as entries are added; after
+           changing entries in place, call edited.'''
+
+        indexes = self._indexes.setdefault(collection, {})
+        try :
+            index = indexes[attribute]
+        except KeyError :
+            index = indexes[attribute] = CollectionIndex(attribute)
+        return index.lookup (getattr(self, collection), value)
+
+    def review_summary (self) : # {{{2
+
+        '''Returns one ManuscriptReview per journal reviewed for, in the
+           order of the first review for each, with the number of reviews
+           (count), the dates of the earliest and latest, and recent if any
+           of them is. The reviews themselves are left alone.'''
+
+        return self._merge_index('journal_review').merged(self.journal_review)
+
+    def add_listener (self, listener) : # {{{2
+
+        '''Has listener(collection, entries) called whenever entries are
+           added to the named collection through append, extend, or insert,
+           or edited in place (see edited), e.g. to drop a cache that
+           depends on it. The CV's own caches are dropped this way.'''
+
+        self._listeners.append (listener)
+
+    def remove_listener (self, listener) : # {{{2
+        self._listeners.remove (listener)
+
+##############################################################################
+
+    def person_index (self) : # {{{2
+
+        '''Returns a PersonIndex (see people.py) of everyone mentioned in
+           the employees, publications, presentations, and grants. It is
+           built once and rebuilt only if one of those lists changes (is
+           added to, or changes length).'''
+
+        size = (len(self.employee), len(self.publication),
+            len(self.presentation), len(self.grant))
+        if self._person_index is None or self._person_index_size != size :
+            self._person_index = PersonIndex(self)
+            self._person_index_size = size
+        return self._person_index
+
+##############################################################################
+
+    def milestones (self) : # {{{2
+        '''Returns the dates of appointment and tenure, from the job history
+           (see milestones.py).'''
+        state = (id(self.jobhistory), len(self.jobhistory))
+        if self._milestones is None or self._milestones[0] != state :
+            self._milestones = (state, Milestones.from_jobs(self.jobhistory))
+        return self._milestones[1]
+
+    def grant_portfolio (self) : # {{{2
+        '''Returns the grants as a GrantPortfolio, parsed once until the list
+           of grants changes (see grantportfolio.py).'''
+        state = (id(self.grant), len(self.grant))
+        if self._portfolio is None or self._portfolio[0] != state :
+            self._portfolio = (state, GrantPortfolio(self.grant))
+        return self._portfolio[1]
+
+    def columns (self) : # {{{2
+        '''Returns the collections of columnar.SCHEMAS as columnar Tables by
+           name (see columnar.py), with the periods classified first (see
+           classify_periods), made once until a collection or the job
+           history changes.'''
+        self.classify_periods()
+        state = (self._periods[0], self.professor)
+        if self._columns is None or self._columns[0] != state :
+            self._columns = (state, columnar.columns(self))
+        return self._columns[1]
+
+    def coauthor_network (self, bibliography = None) : # {{{2
+        '''Returns the CoauthorNetwork of the publications (see network.py),
+           with the authors of keyed publications from the .bib files in
+           bibliography. It is built once, and publications appended later
+           are added to it as they are.'''
+        state = (bibliography, id(self.employee), len(self.employee))
+        if self._network is None or self._network[0] != state or \
+                self._network[1].state != (id(self.publication),
+                len(self.publication)) :
+            self._network = (state, CoauthorNetwork.from_data(self,
+                bibliography))
+        return self._network[1]
+
+    def classify_periods (self) : # {{{2
+
+        '''Sets post_appointment and post_tenure on every dated entry that
+           was not given them, from its date and the milestones, and returns
+           the entries of each collection in each period (by those flags): a
+           dictionary of collection names to dictionaries of PERIODS to
+           lists. A flag is only worked out if its milestone is in the job
+           history, and never for entries with no date, or given the flag
+           (directly or with set_POST_APPOINTMENT or set_POST_TENURE). The
+           result is kept until a collection or the job history changes.'''
+
+        milestones = self.milestones()
+        names = [x for x in COLLECTIONS.collections() if x != 'professor']
+        state = (milestones, tuple((id(getattr(self, x)),
+            len(getattr(self, x))) for x in names))
+        if self._periods is not None and self._periods[0] == state :
+            return self._periods[1]
+        periods = {}
+        changed = False
+        for name in names :
+            items = [x for x in getattr(self, name) \
+                if hasattr(x, 'post_appointment')]
+            if len(items) == 0 :
+                continue
+            periods[name] = {x: [] for x in PERIODS}
+            for item in items :
+                n = milestones.period(item_date(item)) if milestones else None
+                if n is not None :
+                    given = getattr(item, '_periods_given', ())
+                    flags = (item.post_appointment, item.post_tenure)
+                    if 'post_appointment' not in given and \
+                            milestones.appointment is not None :
+                        item.post_appointment = n >= 1
+                    if 'post_tenure' not in given and \
+                            milestones.tenure is not None :
+                        item.post_tenure = n >= 2
+                    changed |= flags != (item.post_appointment,
+                        item.post_tenure)
+                n = 2 if item.post_tenure else 1 if item.post_appointment \
+                    else 0
+                periods[name][PERIODS[n]].append(item)
+        if changed : # the counts are by period; redo them
+            self.count = PubCount()
+        self._periods = (state, periods)
+        return periods
+
+    def in_period (self, collection, period) : # {{{2
+        '''The entries of the named collection in period (one of PERIODS,
+           e.g. 'post_tenure'), from classify_periods.'''
+        return self.classify_periods().get(collection, {}).get(period, [])
+
+##############################################################################
+
+    def snapshot (self) : # {{{2
+        'Returns a Snapshot of the CV now (see snapshots.py).'
+        return Snapshot.of(self)
+
+    def save_snapshot (self, filename) : # {{{2
+        '''Saves a Snapshot of the CV now to filename, for mark_recent to
+           compare with later (e.g. at the next annual review).'''
+        self.snapshot().save(filename)
+
+    def mark_recent (self, since, changed = True, clear = True) : # {{{2
+
+        '''Marks every entry added since the Snapshot since (or the file it
+           was saved in) as recent, and those changed since if changed is
+           True; if clear is True, every other entry is marked not recent,
+           so that the recent flags given in the script do not matter.
+           Returns the SnapshotDiff.'''
+
+        if not isinstance(since, Snapshot) :
+            since = Snapshot.load(since)
+        diff = since.diff(self.snapshot())
+        for (name, items) in vars(self).items() :
+            if not isinstance(items, list) or name.startswith('_') :
+                continue
+            wanted = diff.new_or_changed(name) if changed else \
+                diff.added.get(name, set())
+            for (item, key) in zip(items, identities(name, items)) :
+                if not hasattr(item, 'recent') :
+                    continue
+                if key in wanted :
+                    item.recent = True
+                elif clear :
+                    item.recent = False
+            self.edited (name) # the summaries and tables copy the flags
+        return diff
+
+##############################################################################
+
+    def replay_citation_journal (self, journal = None) : # {{{2
+
+        '''Brings citation counts up to date from the citation journal
+           (constants.CITATION_JOURNAL unless another file is given). Returns
+           the publications that changed.'''
+
+        changed = citejournal.replay(self, journal)
+        if len(changed) > 0 : # counts include citations; redo them
+            self.count = PubCount()
+            self.edited ('publication', changed)
+        return changed
+
+##############################################################################
+
+    def rerender_citations (self, filename) : # {{{2
+
+        '''Rewrites only the citation-dependent parts of a .tex file made by
+           write_CV or write_Dossier if the citation journal has changed
+           since, then regenerates the PDF. Returns True if it did so.'''
+
+        return citejournal.rerender(self, filename)
 
 ##############################################################################
 
@@ -205,6 +566,8 @@ class CV_data : # {{{1
                                     '(' + str(pub2.ncites_scopus), '-->',
                                     pub['citedby-count'] + ')',
                                     file = sys.stderr)
+                            old_ncites = pub2.ncites_scopus
+                            old_cite_years = list(pub2.cite_years_scopus)
                             pub2.ncites_scopus = ncites_scopus
                             # Find updated year list
                             #print ('URL for updating Scopus years is',
@@ -253,7 +616,10 @@ class CV_data : # {{{1
                             except TypeError :
                                 pass
                             pub2.cite_years_scopus = years
+                            citejournal.record(pub2, 'scopus', old_ncites,
+                                old_cite_years)
                         break
+        self.edited ('publication')
         print ("Done updating Scopus citation information")
 
 ##############################################################################
@@ -381,18 +747,20 @@ src="app.id=PartnerApp,env.id=PartnerAppEnv,partner.email=EmailAddress">
                         '-->', str(cite_count[paper.alt_key]) + ')',
                         file = sys.stderr)
                     paper.wos_update_url = update_url[paper.alt_key]
+                    old_ncites = paper.ncites_wos
+                    old_cite_years = list(paper.cite_years_wos)
                     paper.ncites_wos = cite_count[paper.alt_key]
 
                     # Update the cite_years_wos attribute
                     # New implementation based on selenium
                     # Updated 7/30/2021 for new WoS interface
                     if paper.wos_update_url is None :
+                        citejournal.record(paper, 'wos', old_ncites,
+                            old_cite_years)
                         continue
-                    import selenium.webdriver
-                    options = selenium.webdriver.firefox.options.Options()
-                    options.set_headless()
-                    assert options.headless
-                    browser = selenium.webdriver.Firefox(options=options)
+                    import selenium.webdriver.support.ui
+                    pool = browserpool.shared_pool()
+                    browser = pool.checkout()
                     cite_years = {}
                     try :
                         browser.get(paper.wos_update_url)
@@ -412,7 +780,7 @@ src="app.id=PartnerApp,env.id=PartnerAppEnv,partner.email=EmailAddress">
                                 y = int(names[i].text)
                                 cite_years[y] = int(counts[i].text)
                     finally :
-                        browser.close()
+                        pool.release(browser)
                     needs_update = False
                     years = []
                     for year in cite_years :
@@ -445,7 +813,10 @@ src="app.id=PartnerApp,env.id=PartnerAppEnv,partner.email=EmailAddress">
                             file=sys.stderr)
 
                     paper.cite_years_wos = years
+                    citejournal.record(paper, 'wos', old_ncites,
+                        old_cite_years)
 
+        self.edited ('publication')
         print ("Done updating Web of Science citation information")
 
 ##############################################################################
@@ -523,6 +894,55 @@ src="app.id=PartnerApp,env.id=PartnerAppEnv,partner.email=EmailAddress">
 
         self.collaborator = collab
 
+##############################################################################
+
+    def find_duplicate_publications (self, bibliography = None, # {{{2
+            threshold = None) :
+
+        '''Reports (on stderr) and returns the pairs of publications that are
+           likely the same: with the same DOI or similar titles (see
+           duplicates.py). bibliography names the .bib files that have the
+           titles of publications with only a key.'''
+
+        pairs = find_duplicates(self.publication, bibliography, threshold)
+        report_duplicates(pairs)
+        return pairs
+
+    def purge_duplicate_publications (self, bibliography = None, # {{{2
+            threshold = None) :
+
+        '''Merges each pair of publications find_duplicate_publications finds
+           into the richer of the two (see duplicates.merge_publications) and
+           removes the other. Pairs with only similar titles (see
+           duplicates.corroborated) are reported, not merged. Returns the
+           publications removed.'''
+
+        removed = {}
+        for (first, second, value, reason) in find_duplicates(
+                self.publication, bibliography, threshold) :
+            if reason == 'title only' :
+                report_duplicates([(first, second, value, reason)])
+                continue
+            # follow earlier merges, so that chains end up in one record
+            while id(first) in removed :
+                first = removed[id(first)][1]
+            while id(second) in removed :
+                second = removed[id(second)][1]
+            if first is second :
+                continue
+            if richness(second) > richness(first) :
+                (first, second) = (second, first)
+            print ('WARNING: merging publication', repr(str(second)),
+                'into', repr(str(first)), file = sys.stderr)
+            merge_publications(first, second)
+            removed[id(second)] = (second, first)
+        if len(removed) > 0 :
+            self.publication = [x for x in self.publication \
+                if id(x) not in removed]
+            self.count = PubCount() # the counts are redone without them
+            self.edited ('publication')
+        return [x for (x, kept) in removed.values()]
+
 ##############################################################################
 
     def update_collaborators (self, bibliography=None) : # {{{2
@@ -647,9 +1067,12 @@ src="app.id=PartnerApp,env.id=PartnerAppEnv,partner.email=EmailAddress">
                         year = year
                     ))
         self.purge_duplicate_collaborators()
+        if constants.AFFILIATIONS is not None :
+            self.resolve_affiliations()
 
 ##############################################################################
 
+    @citejournal.citation_section
     def print_statistics_summary (self, texfile,
             show_pubs_since_appt = False) :
         '''Prints a summary of peer-reviewed publications, including
@@ -695,6 +1118,7 @@ src="app.id=PartnerApp,env.id=PartnerAppEnv,partner.email=EmailAddress">
 
 ##############################################################################
 
+    @citejournal.citation_section
     def print_condensed_statistics_summary (self, texfile) : # {{{2
 
         '''A shortened statistics summary, intended for the CV rather than
@@ -718,6 +1142,7 @@ src="app.id=PartnerApp,env.id=PartnerAppEnv,partner.email=EmailAddress">
 
 ##############################################################################
 
+    @figcache.cached_figure(r'\small')
     def plot_publications_vs_time (data, texfile) : # {{{2
 
         '''Plots peer-reviewed publications over time.'''
@@ -810,6 +1235,8 @@ src="app.id=PartnerApp,env.id=PartnerAppEnv,partner.email=EmailAddress">
 
 ##############################################################################
 
+    @citejournal.citation_section
+    @figcache.cached_figure(r'\small')
     def plot_citations_vs_time (data, texfile, show_wos = None,
             show_google = None) :
         '''Plots your citations from Scopus (and Google and/or Web of Science,
@@ -1020,6 +1447,7 @@ src="app.id=PartnerApp,env.id=PartnerAppEnv,partner.email=EmailAddress">
 
 ##############################################################################
 
+    @figcache.cached_figure(r'\small')
     def plot_reviews_over_time (self, texfile, startyear = None) : # {{{2
 
         'Like its publication-related cousin, but with peer reviews.'
@@ -0,0 +1,271 @@
+'''Finding publications entered more than once.
+
+A conference paper entered both with a BibTeX key and by hand, or a preprint
+and its journal version, is counted twice by PubCount and PubStats. The
+duplicates are found from
+
+  - the DOI, when both have the same one (after normalize_doi); and
+  - the title (from the .bib file, for publications that have only a key),
+    with LaTeX markup, case, and punctuation taken out (normalize_title), by
+    the Jaccard similarity of the sets of four-letter pieces ("shingles")
+    of the two titles: at least threshold (DUPLICATE_THRESHOLD by default).
+
+Comparing every title to every other one takes time proportional to the
+square of the number of publications, so the titles are first put in buckets
+by MinHash signatures (one-permutation hashing, SIGNATURE numbers per title)
+split into BANDS bands; only titles that share a bucket in some band are
+compared. That takes time about proportional to the number of publications,
+and finds nearly every pair with a similarity of 0.8 or more.
+
+    CV.find_duplicate_publications('group.bib')   # reports them
+    CV.purge_duplicate_publications('group.bib')  # merges them
+
+Similar titles are not enough to merge two publications: "... Part I" and
+"... Part II", or "Erratum: X" and "X", are alike but different papers. A
+pair found by its titles is only merged if the two are also from years no
+more than one apart, share an author (see people.same_person), and have the
+same part numbers and erratum (and the like) markers; otherwise it is
+reported as 'title only', to be looked at by hand.
+
+merge_publications keeps the richer of the two records (the one with more
+citation data; see richness) and copies into it what only the other has.'''
+
+import re
+import sys
+import zlib
+import functools
+from . import constants
+from .bibimport import bib_entries
+from .bibrender import split_names
+from .people import normalize_name, given_names, same_person
+from .publication import Book
+from .utilities import strip_latex
+
+DUPLICATE_THRESHOLD = 0.8
+SHINGLE = 4     # letters per shingle
+SIGNATURE = 64  # MinHash values per title
+BANDS = 16      # of SIGNATURE // BANDS values each
+
+_MIX = 0x9E3779B97F4A7C15
+_MASK = (1 << 64) - 1
+_BIN = 64 - (SIGNATURE - 1).bit_length() # bits of a hash under its bin
+
+# the citation data of each source
+SOURCES = ('wos', 'scopus', 'google')
+
+# what sets apart papers whose titles are otherwise alike
+PART = re.compile(r'\b(?:part|paper|vol|volume|no|number)\s+([0-9]+|[ivxl]+)\b'
+    r'|\b([0-9]+|[ivxl]+)$')
+MARKER = re.compile(r'\b(?:errat(?:um|a)|corrigend(?:um|a)|correction|'
+    r'retraction|addendum|reply|response|comment)\b')
+
+@functools.lru_cache(maxsize=None)
+def normalize_title (title) : # {{{1
+    '''title in lower case, without LaTeX markup or punctuation, e.g.
+       "\\emph{Ab initio} {DNA} Repair" -> "ab initio dna repair".'''
+    text = strip_latex(title.replace('~', ' '))
+    text = re.sub(r'\\[a-zA-Z]+\s*|\\.|[{}]', '', text)
+    return ' '.join(re.sub(r'[\W_]+', ' ', text.lower()).split())
+
+def normalize_doi (doi) : # {{{1
+    'doi in lower case, without "https://doi.org/" or "doi:" in front.'
+    doi = doi.strip().lower()
+    return re.sub(r'^(https?://(dx\.)?doi\.org/|doi:\s*)', '', doi)
+
+def shingles (title) : # {{{1
+    'The set of hashes of the SHINGLE-letter pieces of a normalized title.'
+    if len(title) <= SHINGLE :
+        return {zlib.crc32(title.encode())}
+    data = title.encode()
+    return set(zlib.crc32(data[i:i+SHINGLE]) for i in \
+        range(len(data) - SHINGLE + 1))
+
+def signature (hashes) : # {{{1
+
+    '''The MinHash signature of a set of shingle hashes, by one-permutation
+       hashing: each hash is scrambled once and falls in one of SIGNATURE
+       bins by its top bits, and each bin keeps its smallest. Empty bins
+       borrow from the next bin that is not (densification), so that similar
+       sets still agree there.'''
+
+    bins = [None] * SIGNATURE
+    for h in hashes :
+        h = (h * _MIX) & _MASK
+        (i, value) = (h >> _BIN, h & ((1 << _BIN) - 1))
+        if bins[i] is None or value < bins[i] :
+            bins[i] = value
+    if None in bins :
+        for i in range(SIGNATURE) :
+            if bins[i] is None :
+                j = 1
+                while bins[(i + j) % SIGNATURE] is None :
+                    j += 1
+                bins[i] = (j << _BIN) | bins[(i + j) % SIGNATURE]
+    return bins
+
+def similarity (a, b) : # {{{1
+    'The Jaccard similarity of two sets.'
+    if len(a) == 0 and len(b) == 0 :
+        return 1.0
+    return len(a & b) / len(a | b)
+
+def richness (pub) : # {{{1
+    '''How much there is to keep in pub, to choose which of two duplicates
+       to keep: its citation data first, then whether it is published and
+       keyed, then how many of its fields are filled in.'''
+    cites = sum(len(getattr(pub, 'cite_years_' + x)) + \
+        len(getattr(pub, 'citing_dois_' + x)) for x in SOURCES)
+    return (pub.ncites, cites, pub.status == constants.PUBLISHED,
+        pub.key is not None, sum(x is not None for x in vars(pub).values()))
+
+##############################################################################
+
+def _described (publications, bibliography) : # {{{1
+
+    '''Returns dictionaries of the titles (not normalized) and the author
+       lists of publications by position, from the publications themselves
+       or else, for keyed ones, from the .bib files in bibliography (a
+       comma-separated string of names, as for write_CV).'''
+
+    titles = {}
+    authors = {}
+    missing = {}
+    for (i, pub) in enumerate(publications) :
+        title = pub.title
+        if title is None and isinstance(pub, Book) :
+            title = pub.booktitle
+        if title is not None :
+            titles[i] = title
+        if pub.author is not None :
+            authors[i] = [pub.author] if isinstance(pub.author, str) \
+                else list(pub.author)
+        if pub.key is not None and (title is None or pub.author is None) :
+            missing.setdefault(pub.key.lower(), []).append(i)
+    for (key, entry) in bib_entries(missing, bibliography).items() :
+        title = entry.get('title') or entry.get('booktitle')
+        for i in missing[key] :
+            if title is not None :
+                titles.setdefault(i, title)
+            authors.setdefault(i, split_names(entry.get('author') or ''))
+    return (titles, authors)
+
+def _same_authors (names, others) : # {{{1
+    'True if some name in names is some name in others (see same_person).'
+    blocks = {}
+    for name in others :
+        blocks.setdefault(normalize_name(name), []).append(given_names(name))
+    return any(same_person(given_names(x), y) for x in names for y in \
+        blocks.get(normalize_name(x), ()))
+
+def corroborated (first, second, titles, authors) : # {{{1
+
+    '''True if the publications first and second (Publication objects),
+       with titles and author lists titles and authors (pairs), are alike
+       in more than their titles: no more than a year apart, with an author
+       in common, and with the same part numbers and erratum markers (see
+       PART and MARKER) in their titles.'''
+
+    if not isinstance(first.year, int) or not isinstance(second.year, int) \
+            or abs(first.year - second.year) > 1 :
+        return False
+    if not _same_authors(authors[0], authors[1]) :
+        return False
+    (a, b) = (normalize_title(titles[0]), normalize_title(titles[1]))
+    return PART.findall(a) == PART.findall(b) and \
+        MARKER.findall(a) == MARKER.findall(b)
+
+def find_duplicates (publications, bibliography = None, # {{{1
+        threshold = None) :
+
+    '''Returns the pairs of publications (in the list publications) that are
+       likely the same (see the module docstring), as (first, second,
+       similarity, reason) tuples, where first comes before second in the
+       list and reason is 'doi', 'title', or 'title only' (alike titles
+       that nothing else bears out). Pairs with the same DOI have
+       similarity 1.0.'''
+
+    if threshold is None :
+        threshold = DUPLICATE_THRESHOLD
+    found = {}
+    # by DOI
+    dois = {}
+    for (i, pub) in enumerate(publications) :
+        if pub.doi is not None and pub.doi.strip() != '' :
+            dois.setdefault(normalize_doi(pub.doi), []).append(i)
+    for same in dois.values() :
+        for (n, i) in enumerate(same) :
+            for j in same[n+1:] :
+                found[(i, j)] = (1.0, 'doi')
+    # by title, through the LSH buckets
+    sets = {}
+    buckets = {}
+    rows = SIGNATURE // BANDS
+    (titles, authors) = _described(publications, bibliography)
+    for (i, title) in titles.items() :
+        title = normalize_title(title)
+        if title == '' :
+            continue
+        sets[i] = shingles(title)
+        bins = signature(sets[i])
+        for band in range(BANDS) :
+            buckets.setdefault((band,) + tuple(bins[band*rows:(band+1)*rows]),
+                []).append(i)
+    compared = set()
+    for bucket in buckets.values() :
+        for (n, i) in enumerate(bucket) :
+            for j in bucket[n+1:] :
+                # titles from .bib files come after the others, so a bucket
+                # is not in list order
+                pair = (min(i, j), max(i, j))
+                if pair in found or pair in compared :
+                    continue
+                compared.add(pair)
+                value = similarity(sets[i], sets[j])
+                if value < threshold :
+                    continue
+                (a, b) = pair
+                if corroborated(publications[a], publications[b],
+                        (titles[a], titles[b]),
+                        (authors.get(a, ()), authors.get(b, ()))) :
+                    found[pair] = (value, 'title')
+                else :
+                    found[pair] = (value, 'title only')
+    return [(publications[i], publications[j], value, reason) for \
+        ((i, j), (value, reason)) in sorted(found.items())]
+
+def merge_publications (keep, other) : # {{{1
+
+    '''Copies into the publication keep what only its duplicate other has:
+       for each source of citations, the larger count and the longer lists
+       of years and citing DOIs; any other field keep lacks; and the flags
+       (significant and the like) either one has.'''
+
+    for source in SOURCES :
+        name = 'ncites_' + source
+        setattr(keep, name, max(getattr(keep, name), getattr(other, name)))
+        for name in ('cite_years_' + source, 'citing_dois_' + source) :
+            if len(getattr(other, name)) > len(getattr(keep, name)) :
+                setattr(keep, name, list(getattr(other, name)))
+    for name in ('most_significant', 'significant', 'primary') :
+        setattr(keep, name, getattr(keep, name) or getattr(other, name))
+    for (name, value) in vars(other).items() :
+        if value is not None and getattr(keep, name, None) is None :
+            setattr(keep, name, value)
+    keep.ncites = max(keep.ncites_wos, keep.ncites_scopus, keep.ncites_google)
+
+def report_duplicates (pairs, file = None) : # {{{1
+    '''Prints a warning for each pair found by find_duplicates to file (by
+       default standard error).'''
+    if file is None :
+        file = sys.stderr
+    for (first, second, value, reason) in pairs :
+        if reason == 'doi' :
+            print ('WARNING: publications', repr(str(first)), 'and',
+                repr(str(second)), 'have the same DOI', file = file)
+        else :
+            print ('WARNING: publications', repr(str(first)), 'and',
+                repr(str(second)), 'have similar titles',
+                '({:.0%} alike)'.format(value) + ('' if reason == 'title'
+                else ', but may be different papers'), file = file)
+
+# vim: foldmethod=marker
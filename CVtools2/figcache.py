@@ -0,0 +1,130 @@
+'''A content-addressed cache of the TikZ plots as standalone PDF figures.
+
+The publication, citation, review and funding plots are drawn in TikZ, which
+pdflatex would otherwise typeset bar by bar on every pass of every document
+that shows them. When constants.FIGURE_CACHE names a directory, each plot is
+instead compiled once to a PDF in that directory, named by a hash of
+everything that determines how it looks (the TikZ code, which encodes the
+data and geometry, and the preamble of the document it appears in, which sets
+the typeface and colors). The document includes the figure with
+\includegraphics, falling back to the TikZ code itself if the PDF is missing.
+
+Figures are compiled in the background, in parallel, as soon as they are
+written; generate_pdf waits for them before running pdflatex. A plot whose
+data have not changed is already in the cache and costs nothing.'''
+
+import io
+import os
+import re
+import sys
+import inspect
+import hashlib
+import functools
+import subprocess
+import concurrent.futures
+from . import constants
+
+# Crop each figure to its tikzpicture
+PREVIEW = r'''\usepackage[active,tightpage]{preview}
+\PreviewEnvironment{tikzpicture}
+\setlength\PreviewBorder{0pt}
+'''
+
+_executor = None
+_pending = {}
+
+def _compile (name) : # {{{1
+    'Runs pdflatex on name.tex in the cache. Returns True if it worked.'
+    pdf = os.path.join(constants.FIGURE_CACHE, name + '.pdf')
+    code = subprocess.Popen(['pdflatex', '-interaction=batchmode',
+        '-output-directory=' + constants.FIGURE_CACHE,
+        os.path.join(constants.FIGURE_CACHE, name + '.tex')],
+        stdout = subprocess.DEVNULL).wait()
+    if code != 0 or not os.path.isfile(pdf) :
+        print ('WARNING: unable to compile figure', name + '; it will be',
+            'drawn in the document instead. See',
+            os.path.join(constants.FIGURE_CACHE, name + '.log'),
+            file = sys.stderr)
+        if os.path.isfile(pdf) :
+            os.remove(pdf)
+        return False
+    return True
+
+##############################################################################
+
+def figure (code, preamble, size = '') : # {{{1
+
+    '''Returns the LaTeX that includes the tikzpicture code as a cached
+       figure, starting its compilation if it is not in the cache yet.
+       preamble is that of the document it goes in and size a font size
+       command (e.g. \small) in effect where it goes.'''
+
+    source = preamble + PREVIEW + '\\begin{document}\n' + size + '\n' + \
+        code.strip() + '\n\\end{document}\n'
+    name = 'fig-' + hashlib.sha1(source.encode()).hexdigest()[:16]
+    pdf = os.path.join(constants.FIGURE_CACHE, name + '.pdf').replace(
+        os.sep, '/')
+    if not os.path.isfile(pdf) and name not in _pending :
+        global _executor
+        os.makedirs(constants.FIGURE_CACHE, exist_ok = True)
+        with open(os.path.join(constants.FIGURE_CACHE, name + '.tex'),
+                'w') as figfile :
+            figfile.write(source)
+        if _executor is None :
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers = os.cpu_count() or 1)
+        _pending[name] = _executor.submit(_compile, name)
+    return r'\IfFileExists{' + pdf + r'}{\includegraphics{' + pdf + \
+        '}}{%\n' + code.strip() + '}'
+
+def wait_for_figures () : # {{{1
+
+    '''Waits for every figure being compiled. Returns the number that could
+       not be compiled (those are drawn in the document instead).'''
+
+    failed = 0
+    while len(_pending) > 0 :
+        (name, future) = _pending.popitem()
+        if not future.result() :
+            failed += 1
+    return failed
+
+##############################################################################
+
+def cached_figure (size = '') : # {{{1
+
+    '''Decorator for functions that draw a plot in TikZ on their argument
+       texfile. When there is a figure cache, the tikzpicture environments
+       they write are replaced by cached figures (see figure); everything
+       else they write goes to texfile as before. size is the font size the
+       plot is drawn at in the document.'''
+
+    def decorator (method) :
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper (*args, **kwargs) :
+            if constants.FIGURE_CACHE is None :
+                return method(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            texfile = bound.arguments['texfile']
+            preamble = None
+            if isinstance(getattr(texfile, 'name', None), str) :
+                from .tex2pdf import read_preamble
+                texfile.flush()
+                preamble = read_preamble(texfile.name)
+            if preamble is None : # not writing the body of a .tex file
+                return method(*args, **kwargs)
+            bound.arguments['texfile'] = buffer = io.StringIO()
+            result = method(*bound.args, **bound.kwargs)
+            texfile.write(re.sub(
+                r'\\begin{tikzpicture}.*?\\end{tikzpicture}',
+                lambda m: figure(m.group(), preamble, size),
+                buffer.getvalue(), flags = re.DOTALL))
+            return result
+
+        return wrapper
+
+    return decorator
+
+# vim: foldmethod=marker
@@ -220,6 +220,20 @@ class Grant (Recent) : # {{{1
 
         self.end_recent(texfile)
 
+##############################################################################
+
+    def role (self) : # {{{2
+        '''The role of constants.INVESTIGATOR on the grant: 'PI', 'Co-PI',
+           'Co-I', or 'senior personnel'.'''
+        for (invest, role) in (('PI','PI'), ('coPI','Co-PI'), ('coI','Co-I')) :
+            value = getattr(self, invest)
+            if constants.INVESTIGATOR == value :
+                return role
+            if isinstance(value, (list,tuple)) \
+                    and constants.INVESTIGATOR in value :
+                return role
+        return 'senior personnel'
+
 ##############################################################################
 
     def write_condensed (self, texfile) : # {{{2
@@ -229,24 +243,8 @@ class Grant (Recent) : # {{{1
         print (r'\emph{' + self.title + r'}', end='', file = texfile)
         if self.number is not None :
             print (' (' + str(self.number) + r')', end='', file = texfile)
-        if constants.INVESTIGATOR == self.PI :
-            print (r'; role: PI;', self.source + ', ', end='', file=texfile)
-        elif isinstance(self.PI, (list,tuple)) \
-                and constants.INVESTIGATOR in self.PI :
-            print (r'; role: PI;', self.source + ', ', end='', file=texfile)
-        elif constants.INVESTIGATOR == self.coPI :
-            print (r'; role: Co-PI;', self.source + ', ', end='', file=texfile)
-        elif isinstance(self.coPI,(list,tuple)) \
-                and constants.INVESTIGATOR in self.coPI :
-            print (r'; role: Co-PI;', self.source + ', ', end='', file=texfile)
-        elif constants.INVESTIGATOR == self.coI :
-            print (r'; role: Co-I;', self.source + ', ', end='', file=texfile)
-        elif isinstance(self.coI, (list,tuple)) \
-                and constants.INVESTIGATOR in self.coI :
-            print (r'; role: Co-I;', self.source + ', ', end='', file=texfile)
-        else :
-            print (r'; role: senior personnel;', self.source + ', ', end='',
-                file=texfile)
+        print ('; role: ' + self.role() + ';', self.source + ', ', end='',
+            file=texfile)
         #
         try :
             if self.CPU_hours is None :
@@ -0,0 +1,309 @@
+'''The grants of a CV as intervals of time.
+
+Each section of the dossier that reports on grants used to go through
+data.grant again and parse each grant's start and end again. A GrantPortfolio
+parses them once, into an IntervalTree, and then answers questions about
+time from the tree:
+
+    portfolio = CV.grant_portfolio()
+    portfolio.active(datetime.date(2021, 3, 1))   # awarded and running then
+    portfolio.pending()                           # proposals not decided yet
+    portfolio.overlapping(start, end)             # commitments in a period
+    portfolio.effort(2021)                        # person-months that year
+    portfolio.support(2021)                       # $ by source, fiscal 2021
+
+Each of these takes time proportional to the logarithm of the number of
+grants (plus the number of grants it finds). Dates may be given as
+"5/15/2019", "5/2019", or "2019"; a grant that ends in "5/2022" runs through
+the end of May 2022. Fiscal years start in FISCAL_YEAR_START (fiscal 2021 is
+July 2020 through June 2021).'''
+
+import sys
+import datetime
+
+FISCAL_YEAR_START = 7 # July
+
+def parse_date (value) : # {{{1
+
+    '''Parses a grant date. Returns (first, last): the first and last days
+       it could mean (the same day for a full date, the whole month or year
+       otherwise). Raises ValueError.'''
+
+    if isinstance(value, datetime.datetime) :
+        value = value.date()
+    if isinstance(value, datetime.date) :
+        return (value, value)
+    if isinstance(value, int) :
+        value = str(value)
+    for (form, last) in (('%m/%d/%Y', None), ('%m/%Y', 'month'),
+            ('%Y', 'year')) :
+        try :
+            first = datetime.datetime.strptime(value.strip(), form).date()
+        except ValueError :
+            continue
+        if last is None :
+            return (first, first)
+        if last == 'year' or first.month == 12 :
+            return (first, datetime.date(first.year, 12, 31))
+        return (first, first.replace(month = first.month + 1) - \
+            datetime.timedelta(days = 1))
+    raise ValueError('cannot read the date ' + repr(value))
+
+def fiscal_year (when) : # {{{1
+    'The fiscal year date when falls in (see FISCAL_YEAR_START).'
+    if FISCAL_YEAR_START > 1 and when.month >= FISCAL_YEAR_START :
+        return when.year + 1
+    return when.year
+
+def fiscal_year_dates (year) : # {{{1
+    'The first and last days of fiscal year year.'
+    if FISCAL_YEAR_START == 1 :
+        return (datetime.date(year, 1, 1), datetime.date(year, 12, 31))
+    return (datetime.date(year - 1, FISCAL_YEAR_START, 1),
+        datetime.date(year, FISCAL_YEAR_START, 1) - \
+            datetime.timedelta(days = 1))
+
+def _amount (value) : # {{{1
+    'Reads an amount of money, which might be a string like "100,000".'
+    if value is None :
+        return 0.0
+    return float(str(value).replace(',', '').replace('$', ''))
+
+def _share (grant) : # {{{1
+    'The fraction of grant credited to the CV author.'
+    if grant.shared_credit is None :
+        return 1.0
+    elif grant.shared_credit > 1.0 :
+        return grant.shared_credit / 100.0
+    return grant.shared_credit
+
+##############################################################################
+
+class IntervalTree : # {{{1
+
+    '''A static interval tree: a balanced binary search tree of intervals
+       (first, last, item) by their first point, in which each subtree
+       also knows the latest last point in it. Finding the intervals that
+       overlap a query takes O(log n + k) time for k intervals found.'''
+
+    def __init__ (self, intervals) : # {{{2
+        self.intervals = sorted(intervals, key = lambda x: (x[0], x[1]))
+        # the tree is implicit: the root of intervals[lo:hi] is at the
+        # middle, and latest[i] is the latest end in the subtree rooted at i
+        self.latest = [None] * len(self.intervals)
+        self._build(0, len(self.intervals))
+
+    def _build (self, lo, hi) : # {{{2
+        if lo >= hi :
+            return None
+        mid = (lo + hi) // 2
+        latest = self.intervals[mid][1]
+        for end in (self._build(lo, mid), self._build(mid + 1, hi)) :
+            if end is not None and end > latest :
+                latest = end
+        self.latest[mid] = latest
+        return latest
+
+    def __len__ (self) : # {{{2
+        return len(self.intervals)
+
+    def overlapping (self, first, last) : # {{{2
+        '''The items whose intervals overlap [first, last], in order of the
+           start of their intervals.'''
+        found = []
+        self._visit(0, len(self.intervals), first, last, found)
+        return found
+
+    def _visit (self, lo, hi, first, last, found) : # {{{2
+        if lo >= hi :
+            return
+        mid = (lo + hi) // 2
+        if self.latest[mid] < first :
+            return
+        self._visit(lo, mid, first, last, found)
+        (start, end, item) = self.intervals[mid]
+        if start > last :
+            return # and so does everything to the right
+        if end >= first :
+            found.append(item)
+        self._visit(mid + 1, hi, first, last, found)
+
+    def at (self, when) : # {{{2
+        'The items whose intervals contain the point when.'
+        return self.overlapping(when, when)
+
+##############################################################################
+
+class GrantSpan : # {{{1
+
+    '''A grant and its parsed dates: start and end are the first days of
+       its start and end dates as given, and finish is the last day it runs
+       (the end of the month or year for a date without a day).'''
+
+    def __init__ (self, grant) : # {{{2
+        self.grant = grant
+        self.start = parse_date(grant.start)[0]
+        (self.end, self.finish) = parse_date(grant.start if grant.end is None
+            else grant.end)
+        if self.finish < self.start :
+            raise ValueError('grant ends before it starts')
+
+    def months (self, year) : # {{{2
+
+        '''The effort on the grant in calendar year year, as a dictionary of
+           person-months by 'calendar', 'academic', and 'summer'. Effort
+           given as a list is by year of the project.'''
+
+        effort = {}
+        for kind in ('calendar', 'academic', 'summer') :
+            value = getattr(self.grant, 'months_' + kind) or 0
+            if isinstance(value, (list, tuple)) :
+                if len(value) == 0 :
+                    value = 0
+                else :
+                    value = value[min(max(year - self.start.year, 0),
+                        len(value) - 1)]
+            effort[kind] = value
+        return effort
+
+##############################################################################
+
+class GrantPortfolio : # {{{1
+
+    '''The grants in the list grants, with their dates parsed once, in an
+       IntervalTree of awarded grants and one of pending proposals (those
+       neither awarded nor rejected). Grants whose dates cannot be read are
+       left out, with a warning, and listed in undated.'''
+
+    def __init__ (self, grants) : # {{{2
+        self.grants = list(grants)
+        self.spans = []
+        self.undated = []
+        for grant in self.grants :
+            try :
+                self.spans.append(GrantSpan(grant))
+            except (TypeError, ValueError, AttributeError) :
+                print ('WARNING: cannot read the dates of grant',
+                    repr(grant.title) + '; left out of the portfolio',
+                    file = sys.stderr)
+                self.undated.append(grant)
+        self._span = {id(x.grant): x for x in self.spans}
+        self.awarded = IntervalTree([(x.start, x.finish, x) for x in \
+            self.spans if x.grant.awarded])
+        self.proposed = IntervalTree([(x.start, x.finish, x) for x in \
+            self.spans if not x.grant.awarded and not x.grant.rejected])
+
+    def span (self, grant) : # {{{2
+        'The GrantSpan of grant (None if it is not in the portfolio).'
+        return self._span.get(id(grant))
+
+    def active (self, when = None) : # {{{2
+        'The awarded grants running on the date when (by default, today).'
+        if when is None :
+            when = datetime.date.today()
+        return [x.grant for x in self.awarded.at(when)]
+
+    def current (self, when = None) : # {{{2
+        '''The awarded grants that have not ended by the date when (by
+           default, today), including those that have yet to start.'''
+        if when is None :
+            when = datetime.date.today()
+        return [x.grant for x in self.awarded.overlapping(when,
+            datetime.date.max)]
+
+    def pending (self, when = None) : # {{{2
+        '''The proposals still pending whose proposed periods have not ended
+           by the date when (by default, today).'''
+        if when is None :
+            when = datetime.date.today()
+        return [x.grant for x in self.proposed.overlapping(when,
+            datetime.date.max)]
+
+    def overlapping (self, first, last, pending = False) : # {{{2
+        '''The awarded grants (and, if pending is True, pending proposals)
+           that run for any of the period from first to last (dates).'''
+        found = self.awarded.overlapping(first, last)
+        if pending :
+            found += self.proposed.overlapping(first, last)
+        return [x.grant for x in found]
+
+    def effort (self, year, pending = False) : # {{{2
+
+        '''The total person-months committed in calendar year year on the
+           awarded grants running then (and pending proposals, if pending is
+           True), as a dictionary by 'calendar', 'academic', and 'summer'.'''
+
+        (first, last) = parse_date(year)
+        total = {'calendar': 0, 'academic': 0, 'summer': 0}
+        spans = self.awarded.overlapping(first, last)
+        if pending :
+            spans += self.proposed.overlapping(first, last)
+        for span in spans :
+            for (kind, months) in span.months(year).items() :
+                total[kind] += months
+        return total
+
+    def support (self, year, pending = False) : # {{{2
+
+        '''The support credited to the CV author (see shared_credit) in
+           fiscal year year from each source, as a dictionary of sources to
+           dollars, assuming each grant spends its amount evenly over its
+           duration.'''
+
+        (first, last) = fiscal_year_dates(year)
+        spans = self.awarded.overlapping(first, last)
+        if pending :
+            spans += self.proposed.overlapping(first, last)
+        total = {}
+        for span in spans :
+            days = (span.finish - span.start).days + 1
+            overlap = (min(span.finish, last) - \
+                max(span.start, first)).days + 1
+            total[span.grant.source] = total.get(span.grant.source, 0.0) + \
+                _amount(span.grant.amount) * _share(span.grant) * \
+                overlap / days
+        return total
+
+    def funding_per_year (self) : # {{{2
+
+        '''The external and internal funding of the awarded grants in each
+           calendar year, spread evenly by month over their durations and
+           credited as shared_credit says, for the funding graphic. Returns
+           (firstyear, lastyear, external, internal), where external and
+           internal are lists with one total per year.'''
+
+        awarded = [x for (start, finish, x) in self.awarded.intervals]
+        firstyear = min([x.start.year for x in awarded] +
+            [datetime.date.today().year])
+        lastyear = max([x.end.year for x in awarded] + [1000])
+        external = [0] * (lastyear - firstyear + 1)
+        internal = [0] * (lastyear - firstyear + 1)
+        for span in awarded :
+            grant = span.grant
+            # months in contract
+            duration = (span.end - span.start).days / 365.25 * 12
+            if duration < 1 :
+                duration = 1.0
+            shared_credit = _share(grant)
+            for year in range(span.start.year, span.end.year + 1) :
+                if year == span.start.year :
+                    months = 12.0 - span.start.month + 1
+                elif year == span.end.year :
+                    months = float(span.end.month)
+                else :
+                    months = 12.0
+                if months < 1 :
+                    months = 1.0
+                if grant.external_amount is None :
+                    external[year - firstyear] += float(grant.amount) * \
+                        shared_credit * (months / duration)
+                else :
+                    external[year - firstyear] += \
+                        float(grant.external_amount) * shared_credit * \
+                        (months / duration)
+                    internal[year - firstyear] += (float(grant.amount) -
+                        float(grant.external_amount)) * shared_credit * \
+                        (months / duration)
+        return (firstyear, lastyear, external, internal)
+
+# vim: foldmethod=marker
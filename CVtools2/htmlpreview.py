@@ -0,0 +1,487 @@
+'''An HTML output backend, for previewing a CV or dossier without LaTeX.
+
+The writers (write_CV, write_Dossier, and the write methods of the entries
+they list) print LaTeX to a file. When the file they are given has a name
+ending in .html, tex2pdf.open_document gives them an HTMLDocument instead: it
+collects what they print and, when closed, translates it to a single HTML
+page. The same section writers thus produce both outputs, and there is no
+pdflatex or bibtex run; references are typeset by bibrender, from the same
+.bib files and in the same style the PDF would use. For example,
+
+    preview(CV, 'cv.html')
+    preview(CV, 'dossier.html', 'Dossier', bibliography = 'pubs')
+
+The translation knows the markup the writers and MU-dossier.cls use (lists,
+sections, emphasis, tables, accents, the highlighting of recent entries) and
+drops what only matters on paper (spacing, page breaks, counters). Plots are
+shown as their cached PDF figures if there are any (see figcache), or else
+as placeholders.'''
+
+import io
+import os
+import re
+import html
+import unicodedata
+from .bibrender import bibentry_texts
+
+STYLE = '''body { font-family: Georgia, serif; max-width: 50em;
+  margin: 2em auto; padding: 0 1em; line-height: 1.35; }
+h1, h2, h3, h4, h5 { font-family: Helvetica, Arial, sans-serif; }
+h2 { border-bottom: 1px solid #999; }
+li { margin-bottom: 0.3em; }
+.label { font-weight: bold; margin-right: 0.5em; }
+.recent { color: #7a0f1c; }
+.sc { font-variant: small-caps; }
+.sf { font-family: Helvetica, Arial, sans-serif; }
+.small { font-size: 90%; }
+.large { font-size: 120%; }
+.figure { border: 1px dashed #999; padding: 1em; text-align: center;
+  color: #666; }
+table { border-collapse: collapse; }
+td { padding: 0.1em 0.5em; vertical-align: top; }
+'''
+
+# combining characters for accents (\'{e} etc.)
+ACCENTS = {"'": '\u0301', '`': '\u0300', '^': '\u0302', '"': '\u0308',
+    '~': '\u0303', '=': '\u0304', '.': '\u0307', 'c': '\u0327',
+    'v': '\u030c', 'u': '\u0306', 'H': '\u030b', 'k': '\u0328',
+    'r': '\u030a'}
+
+SYMBOLS = {'&': '&amp;', '%': '%', '$': '$', '#': '#', '_': '_', '{': '{',
+    '}': '}', ',': '\u2009', ' ': ' ', '-': '', '/': '', '@': '',
+    'space': ' ', 'quad': '\u2003', 'qquad': '\u2003\u2003',
+    'ldots': '\u2026', 'dots': '\u2026', 'dagger': '\u2020',
+    'ddagger': '\u2021', 'S': '\u00a7', 'P': '\u00b6', 'textendash': '\u2013',
+    'textemdash': '\u2014', 'copyright': '\u00a9', 'textregistered': '\u00ae',
+    'ss': '\u00df', 'o': '\u00f8', 'O': '\u00d8', 'ae': '\u00e6',
+    'AE': '\u00c6', 'aa': '\u00e5', 'AA': '\u00c5', 'l': '\u0142',
+    'L': '\u0141', 'i': '\u0131', 'j': '\u0237', 'LaTeX': 'LaTeX',
+    'TeX': 'TeX', 'times': '\u00d7', 'pm': '\u00b1', 'ast': '*',
+    'star': '*', 'textasteriskcentered': '*', 'textasciitilde': '~',
+    'textbar': '|', 'textbackslash': '\\', 'textless': '&lt;',
+    'textgreater': '&gt;', 'newline': '<br>', 'linebreak': '<br>',
+    'par': '\n<p>', 'alpha': '\u03b1', 'beta': '\u03b2', 'gamma': '\u03b3',
+    'delta': '\u03b4', 'mu': '\u03bc', 'pi': '\u03c0', 'sigma': '\u03c3',
+    'leq': '\u2264', 'geq': '\u2265', 'deg': '\u00b0', 'textdegree': '\u00b0',
+    'circ': '\u00b0', 'prime': '\u2032'}
+
+# command: (opening tag, closing tag) around its argument
+TAGS = {'textbf': ('<b>', '</b>'), 'emph': ('<i>', '</i>'),
+    'textit': ('<i>', '</i>'), 'textsl': ('<i>', '</i>'),
+    'textsc': ('<span class="sc">', '</span>'),
+    'texttt': ('<code>', '</code>'), 'textsf': ('<span class="sf">',
+    '</span>'), 'underline': ('<u>', '</u>'), 'enquote': ('\u201c',
+    '\u201d'), 'textsuperscript': ('<sup>', '</sup>'), 'mbox': ('', ''),
+    'hbox': ('', ''), 'textup': ('', ''), 'textnormal': ('', ''),
+    'textrm': ('', ''), 'textmd': ('', ''), 'nolinkurl': ('<code>',
+    '</code>')}
+
+# declarations, which last until the end of the group or environment
+DECLARATIONS = {'bfseries': ('<b>', '</b>'), 'itshape': ('<i>', '</i>'),
+    'em': ('<i>', '</i>'), 'slshape': ('<i>', '</i>'),
+    'scshape': ('<span class="sc">', '</span>'),
+    'ttfamily': ('<code>', '</code>'), 'sffamily': ('<span class="sf">',
+    '</span>'), 'small': ('<span class="small">', '</span>'),
+    'footnotesize': ('<span class="small">', '</span>'),
+    'scriptsize': ('<span class="small">', '</span>'),
+    'large': ('<span class="large">', '</span>'),
+    'Large': ('<span class="large">', '</span>')}
+
+SECTIONS = {'chapter': 'h1', 'section': 'h2', 'subsection': 'h3',
+    'subsubsection': 'h4', 'paragraph': 'h5'}
+
+LISTS = {'itemize': 'ul', 'CVitemize': 'ul', 'grantlist': 'ul',
+    'courselist': 'ul', 'experience': 'ul', 'education': 'ul',
+    'description': 'ul', 'role': 'ul', 'enumerate': 'ol',
+    'CVenumerate': 'ol', 'CVrevnumerate': 'ol reversed',
+    'thebibliography': 'ol'}
+
+TABLES = ('tabular', 'tabularx', 'longtable', 'tabular*')
+
+BLOCKS = {'center': '<div style="text-align: center">', 'flushleft': '<div>',
+    'quote': '<blockquote>', 'small': '<div class="small">',
+    'footnotesize': '<div class="small">', 'em': '<div><i>'}
+
+# commands shown as nothing, with how many (mandatory) arguments they take
+DROP = {'vspace': 1, 'vspace*': 1, 'hspace': 1, 'hspace*': 1,
+    'setlength': 2, 'addtolength': 2, 'setcounter': 2, 'addtocounter': 2,
+    'stepcounter': 1, 'nocite': 1, 'bibliographystyle': 1,
+    'nobibliography': 1, 'bibliography': 1, 'label': 1, 'pagestyle': 1,
+    'thispagestyle': 1, 'colorlet': 2, 'definecolor': 3,
+    'definecolorseries': 5, 'needspace': 1, 'cellcolor': 1,
+    'rowcolor': 1, 'pageref': 1, 'ref': 1, 'input': 1, 'include': 1,
+    'usepackage': 1, 'usetikzlibrary': 1, 'arrayrulecolor': 1,
+    'specialrule': 3, 'cline': 1, 'newcolumntype': 2, 'lhead': 1,
+    'chead': 1, 'rhead': 1, 'lfoot': 1, 'cfoot': 1, 'rfoot': 1,
+    'title': 1, 'author': 1, 'date': 1, 'hyphenation': 1,
+    'enlargethispage': 1, 'enlargethispage*': 1, 'bibitem': 1}
+
+_special = re.compile(r"[\\{}%$~&<>`'\n^_-]")
+_command = re.compile(r'\\([a-zA-Z@]+\*?|.)')
+
+def _skip_space (text, i) : # {{{1
+    while i < len(text) and text[i] in ' \t\n' :
+        i += 1
+    return i
+
+def _group_end (text, i, opening = '{', closing = '}') : # {{{1
+    'The index just past the group that starts (with opening) at text[i].'
+    depth = 0
+    while i < len(text) :
+        c = text[i]
+        if c == '\\' :
+            i += 2
+            continue
+        if c == opening :
+            depth += 1
+        elif c == closing :
+            depth -= 1
+            if depth == 0 :
+                return i + 1
+        i += 1
+    return len(text)
+
+def _argument (text, i) : # {{{1
+    '''Reads the argument of a command that ends at text[i]: a group, a
+       command, or a character. Returns (argument, index past it).'''
+    i = _skip_space(text, i)
+    if i >= len(text) :
+        return ('', i)
+    if text[i] == '{' :
+        j = _group_end(text, i)
+        return (text[i+1:j-1], j)
+    if text[i] == '\\' :
+        m = _command.match(text, i)
+        return (m.group(), m.end())
+    return (text[i], i + 1)
+
+def _optional (text, i) : # {{{1
+    'Reads an optional [argument]; returns (argument or None, index).'
+    j = _skip_space(text, i)
+    if j < len(text) and text[j] == '[' :
+        k = _group_end(text, j, '[', ']')
+        return (text[j+1:k-1], k)
+    return (None, i)
+
+def _environment_end (text, i, name) : # {{{1
+    '''Finds the \\end{name} matching a \\begin{name} that ended at text[i].
+       Returns (start of the \\end, index past it).'''
+    depth = 1
+    pattern = re.compile(r'\\(begin|end)\s*{' + re.escape(name) + '}')
+    for m in pattern.finditer(text, i) :
+        depth += 1 if m.group(1) == 'begin' else -1
+        if depth == 0 :
+            return (m.start(), m.end())
+    return (len(text), len(text))
+
+##############################################################################
+
+class Translator : # {{{1
+
+    '''Translates the body of a LaTeX document into HTML. bibentries maps
+       lower-case keys to the LaTeX \\bibentry would print for them (see
+       bibrender.bibentry_texts).'''
+
+    def __init__ (self, bibentries = None) : # {{{2
+        self.bibentries = bibentries or {}
+
+    def translate (self, text, math = False) : # {{{2
+        'Returns the HTML for text, closing any declarations it makes.'
+        out = []
+        closing = []
+        i = 0
+        while i < len(text) :
+            m = _special.search(text, i)
+            if m is None :
+                out.append(html.escape(text[i:], quote = False))
+                break
+            if m.start() > i :
+                out.append(html.escape(text[i:m.start()], quote = False))
+            i = m.start()
+            c = text[i]
+            if c == '\\' :
+                i = self.command(text, i, out, closing, math)
+            elif c == '{' :
+                j = _group_end(text, i)
+                out.append(self.translate(text[i+1:j-1], math))
+                i = j
+            elif c == '}' :
+                i += 1
+            elif c == '%' :
+                j = text.find('\n', i)
+                i = len(text) if j < 0 else _skip_space(text, j + 1)
+            elif c == '$' :
+                j = text.find('$', i + 1)
+                j = len(text) if j < 0 else j
+                out.append(self.translate(text[i+1:j], math = True))
+                i = j + 1
+            elif c == '~' :
+                out.append('\u00a0')
+                i += 1
+            elif c == '&' :
+                out.append('&amp;')
+                i += 1
+            elif c in '<>' :
+                out.append(html.escape(c))
+                i += 1
+            elif c == '-' :
+                if text.startswith('---', i) :
+                    (dash, i) = ('\u2014', i + 3)
+                elif text.startswith('--', i) :
+                    (dash, i) = ('\u2013', i + 2)
+                else :
+                    (dash, i) = ('-', i + 1)
+                out.append(dash)
+            elif c == '`' :
+                if text.startswith('``', i) :
+                    (quote, i) = ('\u201c', i + 2)
+                else :
+                    (quote, i) = ('\u2018', i + 1)
+                out.append(quote)
+            elif c == "'" :
+                if text.startswith("''", i) :
+                    (quote, i) = ('\u201d', i + 2)
+                else :
+                    (quote, i) = ('\u2019', i + 1)
+                out.append(quote)
+            elif c == '\n' :
+                j = _skip_space(text, i)
+                out.append('\n<p>\n' if text.count('\n', i, j) > 1 else '\n')
+                i = j
+            elif c in '^_' and math :
+                (argument, i) = _argument(text, i + 1)
+                tag = 'sup' if c == '^' else 'sub'
+                out.append('<' + tag + '>' + self.translate(argument, math)
+                    + '</' + tag + '>')
+            else :
+                out.append(c)
+                i += 1
+        out.extend(reversed(closing))
+        return ''.join(out)
+
+    def command (self, text, i, out, closing, math) : # {{{2
+
+        '''Translates the command at text[i], appending to out (and to
+           closing, for declarations). Returns the index past the command
+           and its arguments.'''
+
+        m = _command.match(text, i)
+        if m is None :
+            return i + 1
+        name = m.group(1)
+        i = m.end()
+        if name[0].isalpha() :
+            # spaces after a command name are not printed
+            while i < len(text) and text[i] in ' \t' :
+                i += 1
+        if name in ACCENTS :
+            (argument, i) = _argument(text, i)
+            letter = self.translate(argument, math)
+            out.append(unicodedata.normalize('NFC', letter[:1] +
+                ACCENTS[name] + letter[1:]))
+        elif name in SYMBOLS :
+            out.append(SYMBOLS[name])
+        elif name == '\\' :
+            (skip, i) = _optional(text, i)
+            out.append('<br>')
+        elif name in TAGS :
+            (argument, i) = _argument(text, i)
+            (start, end) = TAGS[name]
+            out.append(start + self.translate(argument, math) + end)
+        elif name in DECLARATIONS :
+            (start, end) = DECLARATIONS[name]
+            out.append(start)
+            closing.append(end)
+        elif name.rstrip('*') in SECTIONS :
+            (skip, i) = _optional(text, i)
+            (argument, i) = _argument(text, i)
+            tag = SECTIONS[name.rstrip('*')]
+            out.append('\n<' + tag + '>' + self.translate(argument) + '</' +
+                tag + '>\n')
+        elif name == 'item' :
+            (label, i) = _optional(text, i)
+            out.append('\n<li>')
+            if label is not None :
+                out.append('<span class="label">' + self.translate(label) +
+                    '</span>')
+        elif name == 'begin' :
+            i = self.environment(text, i, out)
+        elif name == 'end' :
+            (skip, i) = _argument(text, i)
+        elif name in ('url', 'href', 'doi') :
+            (url, i) = _argument(text, i)
+            url = url.strip()
+            label = html.escape(url)
+            if name == 'href' :
+                (label, i) = _argument(text, i)
+                label = self.translate(label)
+            elif name == 'doi' :
+                label = 'doi:' + label
+                url = 'https://doi.org/' + url
+            out.append('<a href="' + html.escape(url) + '">' + label + '</a>')
+        elif name == 'bibentry' :
+            (key, i) = _argument(text, i)
+            entry = self.bibentries.get(key.strip().lower())
+            if entry is None :
+                out.append('[' + html.escape(key) + ']')
+            else :
+                out.append(self.translate(entry))
+        elif name in ('textcolor', 'colorbox') :
+            (color, i) = _argument(text, i)
+            (argument, i) = _argument(text, i)
+            out.append('<span class="' + html.escape(color) + '">' +
+                self.translate(argument, math) + '</span>')
+        elif name == 'color' :
+            (color, i) = _argument(text, i)
+            # \begingroup\color{recent} highlights recent entries
+            if len(out) > 0 and out[-1] == '<span>' :
+                out[-1] = '<span class="' + html.escape(color) + '">'
+        elif name in ('begingroup', 'bgroup') :
+            out.append('<span>')
+        elif name in ('endgroup', 'egroup') :
+            out.append('</span>')
+        elif name == 'IfFileExists' :
+            (filename, i) = _argument(text, i)
+            (yes, i) = _argument(text, i)
+            (no, i) = _argument(text, i)
+            out.append(self.translate(yes if os.path.isfile(filename) \
+                else no))
+        elif name in ('includegraphics', 'includepdf') :
+            (skip, i) = _optional(text, i)
+            (filename, i) = _argument(text, i)
+            filename = html.escape(filename.strip())
+            if name == 'includepdf' :
+                out.append('\n<p><a href="' + filename + '">' + filename +
+                    '</a></p>\n')
+            else :
+                out.append('<object data="' + filename + '"' +
+                    ' type="application/pdf"></object>')
+        elif name in ('newcommand', 'renewcommand', 'providecommand',
+                'newcommand*', 'renewcommand*', 'providecommand*') :
+            (skip, i) = _argument(text, i)
+            (skip, i) = _optional(text, i)
+            (skip, i) = _optional(text, i)
+            (skip, i) = _argument(text, i)
+        elif name in ('let', 'write') :
+            (skip, i) = _argument(text, i)
+            (skip, i) = _argument(text, i)
+        elif name in DROP :
+            (skip, i) = _optional(text, i)
+            for n in range(DROP[name]) :
+                (skip, i) = _argument(text, i)
+        elif name == 'multicolumn' :
+            (skip, i) = _argument(text, i)
+            (skip, i) = _argument(text, i)
+            (argument, i) = _argument(text, i)
+            out.append(self.translate(argument, math))
+        # anything else (\relax, \noindent, \clearpage, ...) shows nothing
+        return i
+
+    def environment (self, text, i, out) : # {{{2
+
+        '''Translates the environment whose \\begin ended at text[i].
+           Returns the index past its \\end.'''
+
+        (name, i) = _argument(text, i)
+        name = name.strip()
+        i = self.environment_arguments(text, i, name)
+        (stop, end) = _environment_end(text, i, name)
+        body = text[i:stop]
+        if name in LISTS :
+            tag = LISTS[name]
+            out.append('\n<' + tag + '>' + self.translate(body) + '\n</' +
+                tag.split()[0] + '>\n')
+        elif name in TABLES :
+            out.append(self.table(body))
+        elif name == 'tikzpicture' :
+            out.append('<div class="figure">[figure]</div>')
+        elif name in BLOCKS :
+            tags = re.findall(r'<(\w+)', BLOCKS[name])
+            out.append(BLOCKS[name] + self.translate(body) + ''.join(
+                '</' + x + '>' for x in reversed(tags)))
+        else :
+            out.append(self.translate(body))
+        return end
+
+    def environment_arguments (self, text, i, name) : # {{{2
+        'Skips the arguments of the environment name that starts at text[i].'
+        if name in TABLES :
+            (skip, i) = _optional(text, i)
+            if name in ('tabularx', 'tabular*') :
+                (skip, i) = _argument(text, i)
+            (skip, i) = _argument(text, i)
+        elif name == 'thebibliography' :
+            (skip, i) = _argument(text, i)
+        return i
+
+    def table (self, body) : # {{{2
+        'Translates the body of a tabular (or the like) into a table.'
+        body = re.sub(r'\\(hline|toprule|midrule|bottomrule|endhead|' \
+            r'endfirsthead|endfoot|endlastfoot)\b', '', body)
+        rows = []
+        for row in re.split(r'\\\\(?:\s*\[[^]]*\])?', body) :
+            if row.strip() == '' :
+                continue
+            cells = re.split(r'(?<!\\)&', row)
+            rows.append('<tr>' + ''.join('<td>' + self.translate(x.strip())
+                + '</td>' for x in cells) + '</tr>')
+        return '\n<table>\n' + '\n'.join(rows) + '\n</table>\n'
+
+##############################################################################
+
+def to_html (text, directory = '.', title = None) : # {{{1
+
+    '''Translates the LaTeX document text (whose .bib files are found from
+       directory) into an HTML page.'''
+
+    begin = re.search(r'\\begin\s*{document}', text)
+    body = text if begin is None else text[begin.end():]
+    end = re.search(r'\\end\s*{document}', body)
+    if end is not None :
+        body = body[:end.start()]
+    if title is None :
+        m = re.search(r'\\title{([^}]*)}', text)
+        title = m.group(1) if m is not None else ''
+    translator = Translator(bibentry_texts(text, directory))
+    return '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n' + \
+        '<title>' + html.escape(title) + '</title>\n<style>\n' + STYLE + \
+        '</style>\n</head>\n<body>\n' + translator.translate(body) + \
+        '\n</body>\n</html>\n'
+
+class HTMLDocument (io.StringIO) : # {{{1
+
+    '''A file the writers print LaTeX to, which is written as HTML (see
+       to_html) to the file filename when it is closed.'''
+
+    def __init__ (self, filename) : # {{{2
+        super().__init__()
+        self.filename = filename
+
+    def close (self) : # {{{2
+        if not self.closed :
+            with open(self.filename, 'w', encoding = 'utf-8') as htmlfile :
+                htmlfile.write(to_html(self.getvalue(),
+                    os.path.dirname(self.filename) or '.'))
+        super().close()
+
+##############################################################################
+
+def preview (data, filename = 'preview.html', document = 'CV', **args) : # {{{1
+
+    '''Writes the CV (or, if document is "Dossier", the dossier) for the
+       CV_data object data as one HTML page, filename. Any other arguments
+       go to write_CV or write_Dossier. Nothing is compiled, so this takes
+       a fraction of a second; use it while editing and build the PDF when
+       done.'''
+
+    from .makeCV import write_CV
+    from .makeDossier import write_Dossier
+    writers = {'CV': write_CV, 'Dossier': write_Dossier}
+    if document not in writers :
+        raise ValueError('unknown document ' + repr(document))
+    if not filename.lower().endswith(('.html', '.htm')) :
+        raise ValueError('the preview must be an .html file')
+    writers[document](data, filename, **args)
+    return filename
+
+# vim: foldmethod=marker
@@ -6,7 +6,8 @@ class Job : # {{{1
 
     def __init__ (self, start_date, title, employer, location, # {{{2
             end_date = None, unit = None, supervisor = None,
-            stitle = "Supervisor", academic = True, onCV = True, note = None) :
+            stitle = "Supervisor", academic = True, onCV = True, note = None,
+            milestone = None) :
         self.start_date = start_date
         self.end_date = end_date
         self.title = title
@@ -22,6 +23,8 @@ class Job : # {{{1
         if not isinstance(onCV, bool) :
             raise TypeError ('Job.onCV must be True or False')
         self.note = note
+        # 'appointment' or 'tenure' if this job began one (see milestones.py)
+        self.milestone = milestone
 
 ##############################################################################
 
@@ -0,0 +1,250 @@
+'''Journal impact factors and immediacy indexes from Journal Citation Reports.
+
+write_journal_stats prints each publication's journal_IF and
+journal_immediacy, which used to have to be typed in for every entry. A
+JournalMetrics store holds them for every journal and year instead, in a
+SQLite file, loaded from the CSV files JCR exports:
+
+    metrics = JournalMetrics('jcr.sqlite')
+    metrics.load_csv('JCR2019.csv')   # the year is taken from the name
+    metrics.load_csv('JCR2020.csv')   # (or give year = 2020)
+    CV.fill_journal_metrics(metrics, 'group.bib')
+
+or set_JOURNAL_METRICS('jcr.sqlite') to have write_Dossier do the last step.
+Publications with a key take their journal from the .bib files given (for
+write_Dossier, its bibliography).
+Loading is only done once per CSV file (until it changes), and the database
+is only opened when first needed.
+
+Journals are looked up by their full name, their JCR abbreviation, or their
+ISSN, all normalized (case, punctuation, "&" for "and", LaTeX markup) so that
+"J. Nucl. Mater.", "JOURNAL OF NUCLEAR MATERIALS", and "0022-3115" are the
+same journal. A publication gets the metrics for its year, or for the latest
+year before it if that year has not been published yet.'''
+
+import os
+import re
+import csv
+import sys
+import sqlite3
+import functools
+from . import constants
+from .bibimport import bib_entries
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS metric (name TEXT, year INTEGER, impact REAL,
+    immediacy REAL, PRIMARY KEY (name, year)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS alias (alias TEXT PRIMARY KEY, name TEXT)
+    WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS source (filename TEXT PRIMARY KEY, mtime REAL,
+    size INTEGER);
+'''
+
+# column: what it holds, for the headings JCR has used over the years
+COLUMNS = {'full journal title': 'title', 'journal name': 'title',
+    'journal title': 'title', 'title': 'title',
+    'jcr abbreviated title': 'abbreviation',
+    'jcr abbreviation': 'abbreviation',
+    'abbreviated journal': 'abbreviation', 'issn': 'issn', 'eissn': 'issn',
+    'journal impact factor': 'impact', 'impact factor': 'impact',
+    'jif': 'impact', 'immediacy index': 'immediacy', 'year': 'year',
+    'jcr year': 'year'}
+
+@functools.lru_cache(maxsize=None)
+def normalize_journal (name) : # {{{1
+
+    '''Reduces a journal name, abbreviation, or ISSN to the form the store
+       indexes, e.g. "J.\\ Nucl.\\ Mater." -> "j nucl mater".'''
+
+    name = name.strip()
+    if re.fullmatch(r'[0-9]{4}-?[0-9]{3}[0-9Xx]', name) : # an ISSN
+        return name.replace('-', '').upper()
+    name = re.sub(r'\\&|&', ' and ', name)
+    name = re.sub(r'\\[a-zA-Z]+\s*|\\.', ' ', name) # \emph, \' and so on
+    name = re.sub(r'[^\w\s]|_', ' ', name.lower())
+    name = re.sub(r'^the\s+', '', name.strip())
+    return ' '.join(name.split())
+
+def _heading (column) : # {{{1
+    'What a CSV column holds (see COLUMNS), or None.'
+    column = re.sub(r'\s+', ' ', column.strip().lower())
+    column = re.sub(r'^[0-9]{4} ', '', column) # "2019 JIF"
+    column = re.sub(r'^(5-year|five year) .*', '', column)
+    return COLUMNS.get(column)
+
+def _number (value) : # {{{1
+    'Reads a metric, which might be "1,234.5" or "Not Available".'
+    try :
+        return float(value.replace(',', ''))
+    except (AttributeError, ValueError) :
+        return None
+
+##############################################################################
+
+class JournalMetrics : # {{{1
+
+    '''A store of journal metrics by (normalized) journal name and year, kept
+       in the SQLite file filename (":memory:" for none).'''
+
+    def __init__ (self, filename = None) : # {{{2
+        if filename is None :
+            filename = constants.JOURNAL_METRICS or ':memory:'
+        self.filename = filename
+        self._connection = None
+
+    @property
+    def connection (self) : # {{{2
+        if self._connection is None :
+            self._connection = sqlite3.connect(self.filename)
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def close (self) : # {{{2
+        if self._connection is not None :
+            self._connection.close()
+            self._connection = None
+
+    def load_csv (self, filename, year = None, batch = 5000) : # {{{2
+
+        '''Loads the metrics in a JCR CSV export, for the year given (by
+           default, a Year column or the year in the file name). Does
+           nothing if the file has been loaded before and has not changed
+           since. A file with rows of no known year is not marked loaded, so
+           that it can be loaded again with the year. Returns the number of
+           journals loaded.'''
+
+        stat = os.stat(filename)
+        db = self.connection
+        known = db.execute('SELECT mtime, size FROM source WHERE filename = ?',
+            (os.path.abspath(filename),)).fetchone()
+        if known == (stat.st_mtime, stat.st_size) :
+            return 0
+        if year is None :
+            m = re.search(r'(?<![0-9])((?:19|20)[0-9]{2})(?![0-9])',
+                os.path.basename(filename))
+            year = int(m.group(1)) if m is not None else None
+        n = 0
+        undated = 0
+        with open(filename, 'r', newline = '', errors = 'replace') as \
+                csvfile :
+            rows = csv.reader(csvfile)
+            columns = None
+            # JCR puts a line or two of title above the headings
+            for row in rows :
+                kinds = [_heading(x) for x in row]
+                if 'title' in kinds and 'impact' in kinds :
+                    columns = kinds
+                    break
+            if columns is None :
+                print ('WARNING:', filename, 'does not look like a JCR',
+                    'export; nothing loaded', file = sys.stderr)
+                return 0
+            metrics = []
+            aliases = []
+            for row in rows :
+                record = {}
+                issns = []
+                for (kind, value) in zip(columns, row) :
+                    if kind == 'issn' :
+                        issns.append(value)
+                    elif kind is not None and kind not in record :
+                        record[kind] = value
+                title = record.get('title', '').strip()
+                when = int(record['year']) if re.fullmatch(r'[0-9]{4}',
+                    record.get('year', '').strip()) else year
+                if title == '' :
+                    continue # e.g. the copyright notice at the end
+                if when is None :
+                    undated += 1
+                    continue
+                name = normalize_journal(title)
+                metrics.append((name, when, _number(record.get('impact')),
+                    _number(record.get('immediacy'))))
+                for alias in [record.get('abbreviation')] + issns :
+                    if alias is not None and alias.strip() not in ('',
+                            'N/A') :
+                        aliases.append((normalize_journal(alias), name))
+                if len(metrics) >= batch :
+                    n += self._store(metrics, aliases)
+                    (metrics, aliases) = ([], [])
+            n += self._store(metrics, aliases)
+        if undated > 0 :
+            print ('WARNING:', undated, 'journals in', filename, 'have no',
+                'year; give load_csv the year', file = sys.stderr)
+        else :
+            db.execute('INSERT OR REPLACE INTO source VALUES (?, ?, ?)',
+                (os.path.abspath(filename), stat.st_mtime, stat.st_size))
+        db.commit()
+        self.resolve.cache_clear()
+        return n
+
+    def _store (self, metrics, aliases) : # {{{2
+        db = self.connection
+        db.executemany('INSERT OR REPLACE INTO metric VALUES (?, ?, ?, ?)',
+            metrics)
+        db.executemany('INSERT OR REPLACE INTO alias VALUES (?, ?)', aliases)
+        return len(metrics)
+
+    @functools.lru_cache(maxsize=None)
+    def resolve (self, journal) : # {{{2
+        'The name the store knows journal (name, abbreviation, ISSN) by.'
+        name = normalize_journal(journal)
+        row = self.connection.execute('SELECT name FROM alias WHERE ' +
+            'alias = ?', (name,)).fetchone()
+        return name if row is None else row[0]
+
+    def get (self, journal, year) : # {{{2
+        '''The (impact factor, immediacy index) of journal in year (or the
+           latest year before it), or (None, None).'''
+        row = self.connection.execute('SELECT impact, immediacy FROM metric '
+            'WHERE name = ? AND year <= ? ORDER BY year DESC LIMIT 1',
+            (self.resolve(journal), year)).fetchone()
+        return (None, None) if row is None else row
+
+    def fill (self, publications, overwrite = False, # {{{2
+            bibliography = None) :
+
+        '''Sets journal_IF and journal_immediacy on each of publications
+           that has a journal and a year (and does not have them already,
+           unless overwrite is True), looking all of them up at once.
+           Publications with a key and no journal take it from the .bib files
+           in bibliography (a comma-separated string), if given. Returns the
+           number of publications filled.'''
+
+        todo = [x for x in publications if isinstance(x.year, int) and
+            hasattr(x, 'journal') and (overwrite or x.journal_IF is None or
+            x.journal_immediacy is None)]
+        keys = set(x.key.lower() for x in todo if x.journal is None and
+            x.key is not None)
+        journals = bib_entries(keys, bibliography)
+        wanted = {}
+        for pub in todo :
+            journal = pub.journal
+            if journal is None and pub.key is not None :
+                journal = journals.get(pub.key.lower(), {}).get('journal')
+            if journal is None :
+                continue
+            wanted.setdefault((self.resolve(journal), pub.year),
+                []).append(pub)
+        if len(wanted) == 0 :
+            return 0
+        db = self.connection
+        db.execute('CREATE TEMP TABLE IF NOT EXISTS wanted (name TEXT, ' +
+            'year INTEGER)')
+        db.execute('DELETE FROM wanted')
+        db.executemany('INSERT INTO wanted VALUES (?, ?)', list(wanted))
+        found = db.execute('''SELECT w.name, w.year, m.impact, m.immediacy
+            FROM wanted w JOIN metric m ON m.name = w.name AND m.year =
+            (SELECT max(year) FROM metric WHERE name = w.name AND
+            year <= w.year)''').fetchall()
+        n = 0
+        for (name, year, impact, immediacy) in found :
+            for pub in wanted[(name, year)] :
+                if overwrite or pub.journal_IF is None :
+                    pub.journal_IF = impact
+                if overwrite or pub.journal_immediacy is None :
+                    pub.journal_immediacy = immediacy
+                n += 1
+        return n
+
+# vim: foldmethod=marker
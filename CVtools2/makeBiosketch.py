@@ -1,4 +1,5 @@
-from .tex2pdf import generate_pdf, write_preamble, set_typeface
+from .tex2pdf import generate_pdf, write_preamble, set_typeface, \
+    open_document
 from .recent import set_SHOW_RECENT
 from .utilities import datestring2year
 
@@ -9,7 +10,7 @@ def write_NSF_Biosketch (data, filename, # {{{1
        the new requirements (updated 05/01/2020).'''
 
     set_SHOW_RECENT (False)
-    texfile = open (filename, 'w')
+    texfile = open_document (filename)
     data.texfile = texfile
     data.texfile_name = filename
     # LaTeX preamble {{{2
@@ -133,7 +134,7 @@ def write_old_Biosketch (data, filename, bibliography = None, # {{{1
        If show_collaborators is True, include a list of collaborators, suitable
        for a DOE grant or other proposal.'''
 
-    texfile = open (filename, 'w')
+    texfile = open_document (filename)
     data.texfile = texfile
     data.texfile_name = filename
     # LaTeX document preamble {{{2
@@ -1,5 +1,6 @@
 import datetime
-from .tex2pdf import generate_pdf, write_preamble, set_typeface
+from .tex2pdf import generate_pdf, write_preamble, set_typeface, \
+    open_document
 from .constants import DEPT_TEACHING_AVERAGE, PUBLISHED, ACCEPTED, INPRESS, \
     SUBMITTED, UNSUBMITTED
 from . import constants
@@ -23,8 +24,10 @@ def write_CV (data, filename, bibliography = None, typeface = None,
        two.'''
 
     constants.IDENTIFY_MINIONS = False
+    data.replay_citation_journal()
+    data.classify_periods()
 
-    texfile = open (filename, 'w')
+    texfile = open_document (filename)
     data.texfile = texfile
     data.texfile_name = filename
     # LateX Preamble # {{{2
@@ -390,18 +393,7 @@ def write_CV (data, filename, bibliography = None, typeface = None,
 
     # Manuscript Review {{{3
     if len(data.journal_review) > 0 :
-        reviews = remove_duplicates(data.journal_review)
-        for review in reviews :
-            review.count = 0
-        for jreview in data.journal_review :
-            for review in reviews :
-                if review.journal == jreview.journal :
-                    review.recent = review.recent or jreview.recent
-                    review.count += 1
-                    if jreview.earliest < review.earliest :
-                        review.earliest = jreview.earliest
-                    if jreview.latest > review.latest :
-                        review.latest = jreview.latest
+        reviews = data.review_summary()
         #reviews = sorted(reviews, key=lambda x: x.latest)
         print (r'\subsection{Manuscript Review}', file = texfile)
         #print (r'\begin{CVitemize}', file = texfile)
@@ -0,0 +1,128 @@
+import datetime
+from .tex2pdf import generate_pdf, write_preamble, set_typeface, \
+    open_document
+from .recent import set_SHOW_RECENT
+from .grantportfolio import parse_date
+
+def _effort (span, years) : # {{{1
+    'The person-months committed to a grant in each of years, as text.'
+    lines = []
+    for year in years :
+        months = span.months(year)
+        parts = [str(months[x]) + ' ' + x for x in \
+            ('calendar', 'academic', 'summer') if months[x]]
+        lines.append(str(year) + ': ' + (', '.join(parts) or 'none'))
+    return r' \newline '.join(lines)
+
+def _write_project (grant, span, status, texfile) : # {{{1
+    'Writes the table describing one grant or proposal.'
+    print (r'\begin{tabularx}{\linewidth}{@{}>{\bfseries}p{1.9in}X@{}}',
+        file = texfile)
+    print (r'  \toprule', file = texfile)
+    if grant.number is None :
+        print ('Project/Proposal Title &', grant.title, r'\\', file = texfile)
+    else :
+        print ('Project/Proposal Title &', grant.title,
+            '(' + str(grant.number) + r') \\', file = texfile)
+    print ('Status of Support &', status, r'\\', file = texfile)
+    print ('Role &', grant.role(), r'\\', file = texfile)
+    print ('Source of Support &', grant.source, r'\\', file = texfile)
+    print ('Primary Place of Performance &', grant.location, r'\\',
+        file = texfile)
+    print ('Project/Proposal Start and End Date &', grant.start, '--',
+        grant.end if grant.end is not None else grant.start, r'\\',
+        file = texfile)
+    amount = grant.total_amount if grant.total_amount is not None \
+        else grant.amount
+    print (r'Total Award Amount & \$' + format(int(str(amount).replace(',',
+        '')), ',d'), end = '', file = texfile)
+    if grant.CPU_hours is not None :
+        print (' + ' + format(int(str(grant.CPU_hours).replace(',','')),
+            ',d'), 'CPU-hours', end = '', file = texfile)
+    if grant.node_hours is not None :
+        print (' + ' + format(int(str(grant.node_hours).replace(',','')),
+            ',d'), 'node-hours', end = '', file = texfile)
+    print (r' \\', file = texfile)
+    print ('Person-Months per Year Committed &', _effort(span,
+        range(span.start.year, span.finish.year + 1)), r'\\', file = texfile)
+    print (r'  \bottomrule', file = texfile)
+    print (r'\end{tabularx}\par\medskip', file = texfile)
+
+##############################################################################
+
+def write_Current_and_Pending (data, filename, # {{{1
+        typeface = 'Times', when = None, show_pending = True) :
+
+    '''Generates a statement of current and pending support, e.g. for an NSF
+       or DOE proposal, as of the date when (by default, today): every
+       awarded grant that has not ended, every proposal still pending (if
+       show_pending is True), and the total effort committed in each year.'''
+
+    if when is None :
+        when = datetime.date.today()
+    else :
+        when = parse_date(when)[0]
+    portfolio = data.grant_portfolio()
+    current = portfolio.current(when)
+    pending = portfolio.pending(when) if show_pending else []
+    set_SHOW_RECENT (False)
+    texfile = open_document (filename)
+    data.texfile = texfile
+    data.texfile_name = filename
+    # LaTeX preamble {{{2
+    print (r'\documentclass[11pt,shortform,numbers]{MU-dossier}',
+        file = texfile)
+    write_preamble (texfile)
+    set_typeface (texfile, typeface)
+    print (r'\usepackage{lastpage}', file = texfile)
+    print (r'\usepackage{booktabs}', file = texfile)
+    print (r'\pagestyle{plain}', file = texfile)
+    print (r'\lhead{}\rhead{}\chead{}', file=texfile)
+    print (r'\cfoot{}\lfoot{CP-\thepage\ of \pageref{LastPage}}', file=texfile)
+    print (r'\author{' + data.professor.name + '}', file = texfile)
+    print (r'\title{Current and Pending Support}', file = texfile)
+    print (r'\usepackage[hidelinks,bookmarksnumbered,pdfusetitle]{hyperref}',
+        file = texfile)
+    print (r'\setcounter{secnumdepth}{0}', file = texfile)
+    print (r'\begin{document}', file = texfile)
+    print (r'\pdfbookmark{CURRENT AND PENDING SUPPORT}{}%', file = texfile)
+    # 2}}}
+    print (r'\begin{center}\bfseries CURRENT AND PENDING (OTHER) SUPPORT',
+        r'\end{center}', file = texfile)
+    print (r'\noindent\textbf{Investigator:}', data.professor.name,
+        r'\hfill\textbf{As of:}', when.strftime('%B'), str(when.day) + ',',
+        when.year, r'\par\medskip', file = texfile)
+    # Projects {{{2
+    for (heading, status, grants) in (('Current Support', 'Current',
+            current), ('Pending Support', 'Pending', pending)) :
+        if heading == 'Pending Support' and not show_pending :
+            continue
+        print (r'\section{' + heading + '}', file = texfile)
+        if len(grants) == 0 :
+            print ('None.', file = texfile)
+        for grant in grants :
+            _write_project (grant, portfolio.span(grant), status, texfile)
+    # Effort {{{2
+    last = max([portfolio.span(x).finish.year for x in current + pending],
+        default = None)
+    if last is not None :
+        print (r'\section{Total Effort Committed}', file = texfile)
+        print (r'\begin{tabular}{@{}lrrrr@{}}', file = texfile)
+        print (r'  \toprule', file = texfile)
+        print (r'Year & Calendar & Academic & Summer & Pending \\',
+            file = texfile)
+        print (r'  \midrule', file = texfile)
+        for year in range(when.year, last + 1) :
+            effort = portfolio.effort(year)
+            both = portfolio.effort(year, pending = show_pending)
+            print (year, '&', effort['calendar'], '&', effort['academic'],
+                '&', effort['summer'], '&', sum(both.values()) - \
+                sum(effort.values()), r'\\', file = texfile)
+        print (r'  \bottomrule', file = texfile)
+        print (r'\end{tabular}', file = texfile)
+    # 2}}}
+    print (r'\end{document}', file = texfile)
+    texfile.close()
+    generate_pdf (filename)
+
+# vim: foldmethod=marker
@@ -1,3 +1,4 @@
+import copy
 import datetime
 import re
 import os
@@ -13,21 +14,60 @@ from .publication import JournalArticle, Book, BookChapter, \
 from .service import LocalService, NonLocalService, DepartmentService, \
     CollegeService, UniversityService, UniversitySystemService, Regional, \
     National, International
-from .tex2pdf import write_preamble, set_typeface, generate_pdf
+from .tex2pdf import write_preamble, set_typeface, generate_pdf, \
+    run_pdflatex, preamble_format, open_document, is_latex
+from .pub_stats import PubCount
 from .utilities import remove_duplicates, tocardinal
 from . import constants
+from . import figcache
+from .attachments import PDFAssembly
+
+def CV_numpages (filename) : # {{{1
+
+    ''' Finds the length of the CV portion of the dossier, in pages, based
+        on code I inserted into the dossier.'''
+
+    # If we got a tex file, find its aux file
+    if filename[-3:] == 'tex' :
+        filename = filename[:-3] + 'aux'
+    with open(filename,'r') as auxfile :
+        for line in auxfile :
+            if re.search('CV-last-page',line) :
+                page = int(line.split('{')[-1].split('}')[0])
+                return page
+    raise KeyError('Token "CV-last-page" not found in file' + filename)
+
+##############################################################################
 
 def write_Dossier (data, filename, bibliography = None, typeface = None,
         numbers = True, show_interviews = True, CV_only = False,
         separate_posters = False, show_rejected = True, show_news = True,
-        hide_pre_tenure = False, hide_pre_appointment = False) :
+        hide_pre_tenure = False, hide_pre_appointment = False,
+        show_posters = True, short_presentations = False,
+        presentations_since = None, draft = False, attachments = None) :
 
     '''Generates a CV intended for a promotion and tenure dossier. This is the
        "long" form. It contains EVERYTHING, differentiates former from
        previous students, shows interviews (as invited talks), publications,
-       and presentations.'''
+       and presentations.
+
+       The last four arguments trim the CV portion only (see fit_Dossier):
+       show_posters, short_presentations (truncate author lists at
+       constants.MAX_AUTHORS), and presentations_since (a year; earlier
+       presentations are summarized in one line). If draft is True, a single
+       draft-mode pass is made instead of a full build and the length of the
+       CV portion in pages is returned.
+
+       attachments says which external PDFs (letters, reviews, teaching
+       samples) go where: an AttachmentManifest, the name of a JSON file
+       holding one, or None for the conventionally named files (see the
+       attachments module). They are merged into the finished PDF.'''
 
     constants.IDENTIFY_MINIONS = True
+    data.replay_citation_journal()
+    data.classify_periods()
+    if constants.JOURNAL_METRICS is not None :
+        data.fill_journal_metrics(bibliography = bibliography)
 
     if not isinstance(numbers, bool) :
         raise TypeError('numbers must be True or False')
@@ -41,6 +81,29 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
         raise TypeError('show_rejected must be True or False')
     if not isinstance(show_news, bool) :
         raise TypeError('show_news must be True or False')
+    if not isinstance(show_posters, bool) :
+        raise TypeError('show_posters must be True or False')
+    if not isinstance(short_presentations, bool) :
+        raise TypeError('short_presentations must be True or False')
+
+    assembly = PDFAssembly(attachments)
+
+    # The CV portion is written from a trimmed copy of data, if need be
+    full_data = data
+    collapsed = []
+    if not show_posters or presentations_since is not None :
+        data = copy.copy(full_data)
+        data.presentation = []
+        for pres in full_data.presentation :
+            if not show_posters and isinstance(pres, Poster) \
+                    and not pres.teaching :
+                continue
+            if presentations_since is not None and not pres.teaching \
+                    and pres.year < presentations_since :
+                collapsed.append(pres)
+                continue
+            data.presentation.append(pres)
+        data.count = PubCount()
 
 ##############################################################################
     # Student advising {{{2
@@ -803,6 +866,7 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
 ##############################################################################
 
     # Funding per year graphic {{{2
+    @figcache.cached_figure()
     def generate_funding_graphic (texfile, right=2.75, top=2.20, spacing=3) :
         "Creates a graphic of the CV author's funding each year."
         try :
@@ -817,85 +881,10 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
         print (r'    \node at (', right/2, 'in,', top + 0.12,
             r'in) {\small (assumes uniform budget over contract duration)};',
                 file = texfile)
-        lastyear = 1000
-        firstyear = datetime.date.today().year
-        for grant in data.grant :
-            if grant.awarded :
-                try :
-                    startdate = datetime.datetime.strptime(grant.start,'%m/%d/%Y')
-                except ValueError :
-                    try :
-                        startdate = datetime.datetime.strptime(grant.start,'%m/%Y')
-                    except ValueError :
-                        startdate = datetime.datetime.strptime(grant.start,'%Y')
-                try :
-                    enddate = datetime.datetime.strptime(grant.end,'%m/%d/%Y')
-                except ValueError :
-                    try :
-                        enddate = datetime.datetime.strptime(grant.end,'%m/%Y')
-                    except ValueError :
-                        enddate = datetime.datetime.strptime(grant.end,'%Y')
-                startyear = startdate.year
-                endyear = enddate.year
-                if startyear < firstyear :
-                    firstyear = startyear
-                if endyear > lastyear :
-                    lastyear = endyear
+        (firstyear, lastyear, external_fundinginyear,
+            internal_fundinginyear) = data.grant_portfolio().funding_per_year()
         width = (72.0 * right - (lastyear - firstyear + 2) * spacing) \
                     / (lastyear - firstyear + 1)
-        external_fundinginyear = [0]*(lastyear - firstyear + 1)
-        internal_fundinginyear = [0]*(lastyear - firstyear + 1)
-        for grant in data.grant :
-            if grant.awarded :
-                try :
-                    startdate = datetime.datetime.strptime( \
-                        grant.start,'%m/%d/%Y')
-                except ValueError :
-                    try :
-                        startdate = datetime.datetime.strptime(grant.start,'%m/%Y')
-                    except ValueError :
-                        startdate = datetime.datetime.strptime(grant.start,'%Y')
-                try :
-                    enddate = datetime.datetime.strptime(grant.end,'%m/%d/%Y')
-                except ValueError :
-                    try :
-                        enddate = datetime.datetime.strptime(grant.end,'%m/%Y')
-                    except ValueError :
-                        enddate = datetime.datetime.strptime(grant.end,'%Y')
-                startyear = startdate.year
-                startmonth = startdate.month
-                endyear = enddate.year
-                endmonth = enddate.month
-                duration = (enddate - startdate).days/365.25*12 # months in contract
-                if duration < 1 :
-                    duration = 1.0
-                for year in range(startyear,endyear+1) :
-                    if grant.shared_credit is None :
-                        shared_credit = 1.0
-                    elif grant.shared_credit > 1.0 :
-                        shared_credit = grant.shared_credit / 100.0
-                    else :
-                        shared_credit = grant.shared_credit
-                    if year == startyear :
-                        months = 12.0 - startmonth + 1
-                    elif year == endyear :
-                        months = float(endmonth)
-                    else :
-                        months = 12.0
-                    if months < 1 :
-                        months = 1.0
-                    if grant.external_amount is None :
-                        external_fundinginyear[ year - firstyear ] += \
-                            float(grant.amount) * shared_credit * \
-                                (months / duration)
-                    else :
-                        external_fundinginyear[ year - firstyear ] += \
-                            float(grant.external_amount) * shared_credit * \
-                                (months / duration)
-                        internal_fundinginyear[ year - firstyear ] += \
-                            (float(grant.amount) - \
-                             float(grant.external_amount)) \
-                               * shared_credit * (months / duration)
         total_fundinginyear = []
 #        print ("EXTERNAL FUNDING:", external_fundinginyear)
 #        print ("INTERNAL FUNDING:", internal_fundinginyear)
@@ -960,28 +949,12 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
 
 ##############################################################################
 
-    def CV_numpages (filename) : # {{{2
-
-        ''' Finds the length of the CV portion of the dossier, in pages, based
-            on code I inserted into the dossier.'''
-
-        # If we got a tex file, find its aux file
-        if filename[-3:] == 'tex' :
-            filename = filename[:-3] + 'aux'
-        auxfile = open(filename,'r')
-        for line in auxfile :
-            if re.search('CV-last-page',line) :
-                page = int(line.split('{')[-1].split('}')[0])
-                return page
-        else :
-            raise KeyError('Token "CV-last-page" not found in file' + filename)
-
 ##############################################################################
 ## MAIN SUBROUTINE ##
 ##############################################################################
 
     ## LaTeX document preamble {{{2
-    texfile = open (filename, 'w')
+    texfile = open_document (filename)
     data.texfile = texfile
     data.texfile_name = filename
     if numbers :
@@ -1023,6 +996,7 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
     # MU Gold
     #print (r'\definecolor{recent}{cmyk}{0,0.25,0.90,0.05}', file = texfile)
     print (r'\colorlet{recent@employee}{recent!15}', file = texfile)
+    assembly.write_preamble (texfile)
     #print (r'\definecolor{recent}{cmyk}{0.42,0.05,0.98,0.29}', file = texfile)
     #print (r'\colorlet{recent}{DarkRed}', file = texfile)
     #print (r'\colorlet{recent}{Green}', file = texfile)
@@ -1038,11 +1012,11 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
         print (r'\tableofcontents', file = texfile)
     ## Appointment Letters {{{2
         print (r'\chapter{Appointment Letters}', file = texfile)
-        if os.path.isfile('offer-letter.pdf') :
+        for letter in assembly.get('offer-letter') :
             #print (r'\section{Offer Letter}', file = texfile)
             print (r'\section{Initial Appointment Letter}', file = texfile)
             print (r'\cleardoublepage', file = texfile)
-            print (r'\includepdf[pages=-]{offer-letter.pdf}', file = texfile)
+            assembly.include (texfile, letter)
             print (r'\cleardoublepage', file = texfile)
         #if os.path.isfile('appointment-extension-1.pdf') :
         #    print (r'\section{Appointment Extension Letter (first year)}',
@@ -1058,13 +1032,12 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
         #    print (r'\includepdf[pages=-]{appointment-extension-2.pdf}',
         #        file = texfile)
         #    print (r'\cleardoublepage', file = texfile)
-        if os.path.isfile('appointment-extension-3.pdf') :
+        for letter in assembly.get('mid-probationary-review') :
             #print (r'\section{Appointment Extension Letter (third year)}',
             print (r'\section{Mid-Probationary Review}',
                 file = texfile)
             print (r'\cleardoublepage', file = texfile)
-            print (r'\includepdf[pages=-]{appointment-extension-3.pdf}',
-                file = texfile)
+            assembly.include (texfile, letter)
             print (r'\cleardoublepage', file = texfile)
 #        if os.path.isfile('core-appointment-1.pdf') :
 #            print (r'\section{Appointments as Core Faculty in Other Programs}',
@@ -1080,24 +1053,20 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
 #            print (r'\includepdf[pages=-]{courtesy-appointment-1.pdf}',
 #                file = texfile)
 #            print (r'\cleardoublepage', file = texfile)
-        if os.path.isfile('probationary-extension.pdf') :
+        for letter in assembly.get('probationary-extension') :
             print (r'\section{Letter Extending the Probationary Period}',
                 file = texfile)
             print (r'\cleardoublepage', file = texfile)
-            print (r'\includepdf[pages=-]{probationary-extension.pdf}',
-                file = texfile)
+            assembly.include (texfile, letter)
             print (r'\cleardoublepage', file = texfile)
-        if os.path.isfile('post-tenure-review-1.pdf') :
+        reviews = assembly.get('post-tenure-review')
+        if len(reviews) > 0 :
             print (r'\section{Post-Tenure Reviews}',
                 file = texfile)
             print (r'\cleardoublepage', file = texfile)
-            print (r'\includepdf[pages=-]{post-tenure-review-1.pdf}',
-                file = texfile)
+            for review in reviews :
+                assembly.include (texfile, review)
             print (r'\cleardoublepage', file = texfile)
-            for n in range(2,6) :
-                if os.path.isfile('post-tenure-review-' + str(n) + '.pdf') :
-                    print (r'\includepdf[pages=-]{post-tenure-review-' \
-                        + str(n) + '.pdf}', file = texfile)
 
     # Department letters {{{2
         print (r'\chapter{Department Recommendation Letters and Procedures}',
@@ -1886,7 +1855,7 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
                 if hide_pre_appointment and not pres.post_appointment :
                     continue
                 if not isinstance(pres,Poster) :
-                    pres.write (texfile)
+                    pres.write (texfile, short = short_presentations)
             print (r'\end{CVrevnumerate}', file = texfile)
         # Posters
         something_to_print = False
@@ -1920,7 +1889,8 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
                 if hide_pre_appointment and not pres.post_appointment :
                     continue
                 if isinstance(pres,Poster) :
-                    pres.write (texfile, poster_note = '')
+                    pres.write (texfile, poster_note = '',
+                        short = short_presentations)
             print (r'\end{CVrevnumerate}', file = texfile)
     else : # don't separate posters
         something_to_print = False
@@ -1943,9 +1913,15 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
             print (r'\begin{CVrevnumerate}', file = texfile)
             for pres in reversed(data.presentation) :
                 if not pres.teaching :
-                    pres.write (texfile)
+                    pres.write (texfile, short = short_presentations)
             print (r'\end{CVrevnumerate}', file = texfile)
 
+    if len(collapsed) > 0 :
+        print (r'\par\noindent\emph{', len(collapsed),
+            ' earlier presentations (', min(x.year for x in collapsed),
+            '--', max(x.year for x in collapsed), r') are not listed.}\par',
+            sep = '', file = texfile)
+
     # Popular Press Coverage {{{4
     if show_news and len(data.news) > 0 :
         print (r'\subsubsection{Press Coverage}', file = texfile)
@@ -2001,18 +1977,7 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
         print (r'\end{CVitemize}', file = texfile)
     # Manuscript Review {{{5
     if len(data.journal_review) > 0 :
-        reviews = remove_duplicates(data.journal_review)
-        for review in reviews :
-            review.count = 0
-        for jreview in data.journal_review :
-            for review in reviews :
-                if review.journal == jreview.journal :
-                    review.recent = review.recent or jreview.recent
-                    review.count += 1
-                    if jreview.earliest < review.earliest :
-                        review.earliest = jreview.earliest
-                    if jreview.latest > review.latest :
-                        review.latest = jreview.latest
+        reviews = data.review_summary()
         #reviews.reverse()
         #reviews = sorted(reviews, key=lambda x: x.latest, reverse = True)
         print (r'\subsubsection{Manuscript Review}', file = texfile)
@@ -2052,6 +2017,13 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
         r'}\makeatother',
         sep = '', file = texfile)
 
+    # The rest of the dossier is never trimmed
+    if data is not full_data :
+        data = full_data
+        data.texfile = texfile
+        data.texfile_name = filename
+        data.count.setup_counts (data)
+
     if not CV_only :
 
     ## TAB V: TEACHING {{{2
@@ -2069,9 +2041,10 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
             print (r'\subsection{Statement on Teaching}', file = texfile)
             print (r'\addtolength{\parindent}{1em}\noindent', file = texfile)
             print (r'\input{teaching-statement}', file = texfile)
-        elif os.path.isfile ('teaching-statement.pdf') :
-            print (r'\includepdf{teaching-statement.pdf}',
-                file = texfile)
+        else :
+            for statement in assembly.get('teaching-statement') :
+                print (r'\clearpage', file = texfile)
+                assembly.include (texfile, statement)
         print (r'\ifnum\value{teachingstatement}<\value{page}', file=texfile)
         print (r'''  \ClassWarningNoLine{MU-Dossier}{Teaching statement\space
             is more than one page long.}''', file = texfile)
@@ -2106,9 +2079,11 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
             #print (r'\begin{em}%', file = texfile)
             print (r'\input{teaching-eval-interpretation.tex}', file = texfile)
             #print (r'\end{em}', file = texfile)
-        elif os.path.isfile ('teaching-eval-interpretation.pdf') :
-            print (r'\includepdf[pages=-]{teaching-eval-interpretation.pdf}',
-                file = texfile)
+        else :
+            for interpretation in assembly.get(
+                    'teaching-eval-interpretation') :
+                print (r'\clearpage', file = texfile)
+                assembly.include (texfile, interpretation)
 
         # Student Advising {{{3
         print (r'\cleardoublepage', file = texfile)
@@ -2232,25 +2207,12 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
         print (r'\cleardoublepage', file = texfile)
         print (r'\section{Peer Teaching Reviews}', file = texfile)
         print (r'\cleardoublepage', file = texfile)
-        if os.path.isfile ('peer-teaching-review-1.pdf') :
-            print (r'\includepdf[pages=-]{peer-teaching-review-1}',
-                file = texfile)
-            print (r'\cleardoublepage', file = texfile)
-        else :
-            print (r'\cleardoublepage', file = texfile)
-            print (r'\addtocounter{page}{2}', file = texfile)
-        if os.path.isfile ('peer-teaching-review-2.pdf') :
-            print (r'\includepdf[pages=-]{peer-teaching-review-2}',
-                file = texfile)
-            print (r'\cleardoublepage', file = texfile)
-        else : # "Fake it" by inserting an extra two pages
-            print (r'\cleardoublepage', file = texfile)
-            print (r'\addtocounter{page}{2}', file = texfile)
-        if os.path.isfile ('peer-teaching-review-3.pdf') :
-            print (r'\includepdf[pages=-]{peer-teaching-review-3}',
-                file = texfile)
+        reviews = assembly.get('peer-teaching-review')
+        for review in reviews :
+            assembly.include (texfile, review)
             print (r'\cleardoublepage', file = texfile)
-        else : # "Fake it" by inserting an extra two pages
+        for n in range(len(reviews), 3) :
+            # "Fake it" by inserting an extra two pages
             print (r'\cleardoublepage', file = texfile)
             print (r'\addtocounter{page}{2}', file = texfile)
 
@@ -2259,12 +2221,9 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
         # extension_activities (data, texfile) # {{{3 TODO
 
         # Sample teaching publications {{{3
-        if os.path.isfile('teaching-sample-1.pdf') :
-            print (r'\includepdf[pages=-]{teaching-sample-1.pdf',
-                file = texfile)
-        if os.path.isfile('teaching-sample-2.pdf') :
-            print (r'\includepdf[pages=-]{teaching-sample-2.pdf',
-                file = texfile)
+        for sample in assembly.get('teaching-sample') :
+            print (r'\clearpage', file = texfile)
+            assembly.include (texfile, sample)
 
     ## TAB VI: RESEARCH {{{2
         print (r'\chapter{Research and Scholarship}', file = texfile)
@@ -2937,8 +2896,9 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
         services_and_sessions = [x for x in data.service \
             if isinstance(x, NonLocalService)]
         for service in services_and_sessions :
-            service.year = service.start if type(service.start) is int else \
-                int(service.start[-4:])
+            start = service.start[0] if isinstance(service.start,
+                (list,tuple)) else service.start
+            service.year = start if type(start) is int else int(start[-4:])
         services_and_sessions.extend(data.session)
         services_and_sessions.sort(key=lambda x: x.year)
         # Regional Service {{{3
@@ -3000,18 +2960,7 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
             print (r'\end{CVitemize}', file = texfile)
         # Manuscript Review {{{3
         if len(data.journal_review) > 0 :
-            reviews = remove_duplicates(data.journal_review)
-            for review in reviews :
-                review.count = 0
-            for jreview in data.journal_review :
-                for review in reviews :
-                    if review.journal == jreview.journal :
-                        review.recent = review.recent or jreview.recent
-                        review.count += 1
-                        if jreview.earliest < review.earliest :
-                            review.earliest = jreview.earliest
-                        if jreview.latest > review.latest :
-                            review.latest = jreview.latest
+            reviews = data.review_summary()
             reviews = sorted(reviews, key=lambda x: x.latest,
                 reverse=True)
             print (r'\section{Manuscript Review}', file = texfile)
@@ -3028,11 +2977,86 @@ def write_Dossier (data, filename, bibliography = None, typeface = None,
 
     print (r'\end{document}', file = texfile)
     texfile.close()
-    generate_pdf (filename)
+    if not is_latex (filename) : # a preview
+        return
+    if draft :
+        (stem, extension) = os.path.splitext (filename)
+        if not os.path.isfile(stem + '.bbl') :
+            generate_pdf (filename, run_once_only = True)
+        run_pdflatex (filename, 'draft', preamble_format (filename),
+            draft = True)
+        return CV_numpages(filename)
+    # an up-to-date PDF already has its attachments
+    if generate_pdf (filename, depends = assembly.filenames()) :
+        assembly.assemble (os.path.splitext(filename)[0] + '.pdf')
 
     CV_pages = CV_numpages(filename)
     if CV_pages > constants.MAX_CV_PAGES :
         print ("WARNING: CV is", CV_pages, "pages, which is longer than the",
             "limit of", constants.MAX_CV_PAGES, file=sys.stderr)
 
+##############################################################################
+
+def fit_Dossier (data, filename, max_pages = None, **args) : # {{{1
+
+    '''Writes the dossier (as write_Dossier, which gets any other arguments)
+       with the CV portion trimmed just enough to fit in max_pages (by
+       default constants.MAX_CV_PAGES). The trimming steps, from gentlest to
+       harshest, are: truncating presentation author lists at fewer and
+       fewer authors, dropping posters, and summarizing ever more recent
+       presentations in one line. The steps are tried by bisection, each
+       measured with a single draft-mode pdflatex pass; only the chosen one
+       gets a full build. Returns the arguments that were used.'''
+
+    if max_pages is None :
+        max_pages = constants.MAX_CV_PAGES
+    max_authors = constants.MAX_AUTHORS
+    this_year = datetime.date.today().year
+    first_year = min([x.year for x in data.presentation], default=this_year)
+    # cumulative trimming steps: (MAX_AUTHORS, write_Dossier arguments)
+    steps = [(max_authors, {})]
+    for n in (15, 10, 6, 3, 1) :
+        if n < max_authors :
+            steps.append((n, {'short_presentations': True}))
+    trim = dict(steps[-1][1], show_posters = False)
+    steps.append((steps[-1][0], trim))
+    for age in (20, 15, 10, 7, 5, 3) :
+        if this_year - age > first_year :
+            steps.append((steps[-1][0],
+                dict(trim, presentations_since = this_year - age)))
+
+    pages = {}
+    def measure (i) :
+        if i not in pages :
+            constants.MAX_AUTHORS = steps[i][0]
+            pages[i] = write_Dossier(data, filename, draft = True,
+                **steps[i][1], **args)
+        return pages[i]
+
+    try :
+        if measure(0) <= max_pages :
+            best = 0
+        elif measure(len(steps) - 1) > max_pages :
+            print ('WARNING: CV is', pages[len(steps) - 1], 'pages even',
+                'after trimming everything available; the limit is',
+                max_pages, file = sys.stderr)
+            best = len(steps) - 1
+        else : # steps[lo] is too long, steps[hi] fits
+            lo = 0
+            hi = len(steps) - 1
+            while hi - lo > 1 :
+                mid = (lo + hi) // 2
+                if measure(mid) <= max_pages :
+                    hi = mid
+                else :
+                    lo = mid
+            best = hi
+        constants.MAX_AUTHORS = steps[best][0]
+        write_Dossier(data, filename, **steps[best][1], **args)
+    finally :
+        constants.MAX_AUTHORS = max_authors
+    if steps[best][1].get('short_presentations') :
+        return dict(steps[best][1], max_authors = steps[best][0])
+    return dict(steps[best][1])
+
 # vim: foldmethod=marker
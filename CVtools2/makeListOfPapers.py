@@ -1,4 +1,5 @@
-from .tex2pdf import write_preamble, set_typeface, generate_pdf
+from .tex2pdf import write_preamble, set_typeface, generate_pdf, \
+    open_document
 from . import constants
 
 def write_List_of_Papers (data, filename, bibliography = None, 
@@ -6,7 +7,7 @@ def write_List_of_Papers (data, filename, bibliography = None,
 
     'Generates a list of papers written by the author.'
 
-    texfile = open(filename, 'w')
+    texfile = open_document (filename)
     data.texfile = texfile
     data.texfile_name = filename
     # Preamble
@@ -0,0 +1,122 @@
+import csv
+import sys
+import json
+from . import constants
+from .milestones import to_date
+from .employee import UndergraduateStudent, MastersStudent, DoctoralStudent, \
+    Postdoc
+
+ADVISEES = (DoctoralStudent, MastersStudent, UndergraduateStudent, Postdoc)
+COLUMNS = ('advisor', 'name', 'level', 'degree', 'major', 'current',
+    'start_date', 'completion_date', 'years_to_degree', 'papers',
+    'peer_reviewed_papers', 'first_author_papers', 'citations', 'talks',
+    'funding')
+
+def student_productivity (data) : # {{{1
+
+    '''Generator over one row (a dictionary keyed by COLUMNS) per student or
+       postdoc advised in data, which can be a CV_data object or a list of
+       them (e.g., every faculty member in a department). Each CV is indexed
+       once and then each advisee is a handful of dictionary lookups, so
+       this scales to thousands of students.'''
+
+    if not isinstance(data, (list, tuple)) :
+        data = [data]
+    for cv in data :
+        index = cv.person_index()
+        if cv.professor is not None :
+            advisor = cv.professor.name
+        elif isinstance(constants.AUTHOR, (list, tuple)) :
+            advisor = constants.AUTHOR[0]
+        else :
+            advisor = constants.AUTHOR
+        for employee in cv.employee :
+            if not isinstance(employee, ADVISEES) :
+                continue
+            person = index.get(str(employee))
+            if person is None : # not mentioned anywhere else
+                papers = talks = funding = []
+                first_author = 0
+            else :
+                papers = [x for x in person.publication if x.status in \
+                    (constants.PUBLISHED, constants.ACCEPTED)]
+                talks = person.presentation
+                funding = person.funding
+                first_author = 0
+                for pub in papers :
+                    author = pub.author
+                    if isinstance(author, (list, tuple)) and len(author) > 0 :
+                        author = author[0]
+                    if isinstance(author, str) and \
+                            index.get(author) is person :
+                        first_author += 1
+            completion = employee.graduation
+            if completion is None :
+                completion = employee.defense
+            if completion is None and not employee.current :
+                completion = employee.end_date
+            start = to_date(employee.start_date)
+            end = to_date(completion)
+            if start is not None and end is not None \
+                    and not isinstance(employee, Postdoc) :
+                years_to_degree = round((end - start).days / 365.25, 1)
+            else :
+                years_to_degree = None
+            yield {'advisor': advisor,
+                'name': str(employee),
+                'level': employee.__class__.__name__,
+                'degree': getattr(employee, 'degree', None),
+                'major': getattr(employee, 'major', None),
+                'current': employee.current,
+                'start_date': employee.start_date,
+                'completion_date': completion,
+                'years_to_degree': years_to_degree,
+                'papers': len(papers),
+                'peer_reviewed_papers': sum(x.peer_reviewed for x in papers),
+                'first_author_papers': first_author,
+                'citations': sum(x.ncites for x in papers),
+                'talks': len(talks),
+                'funding': '; '.join(funding)}
+
+##############################################################################
+
+def write_Student_Report (data, filename = None, output_format = None) : # {{{1
+
+    '''Writes a student-productivity report (see student_productivity) for
+       one or many CV_data objects, for graduate program reviews and the
+       like. output_format is "csv", "json" (a single array), or "jsonl"
+       (one object per line); by default it is taken from the extension of
+       filename. Rows are written as they are produced, never all held in
+       memory. If filename is None, the report goes to standard output.'''
+
+    if output_format is None :
+        if filename is not None and '.' in filename :
+            output_format = filename.rsplit('.', 1)[1].lower()
+        else :
+            output_format = 'csv'
+    if output_format not in ('csv', 'json', 'jsonl') :
+        raise ValueError('unknown report format ' + repr(output_format))
+    outfile = sys.stdout if filename is None \
+        else open(filename, 'w', newline = '')
+    try :
+        rows = student_productivity(data)
+        if output_format == 'csv' :
+            writer = csv.DictWriter(outfile, fieldnames = COLUMNS)
+            writer.writeheader()
+            for row in rows :
+                writer.writerow(row)
+        elif output_format == 'jsonl' :
+            for row in rows :
+                print (json.dumps(row), file = outfile)
+        else :
+            print ('[', file = outfile, end = '')
+            separator = '\n'
+            for row in rows :
+                print (separator + json.dumps(row), file = outfile, end = '')
+                separator = ',\n'
+            print ('\n]', file = outfile)
+    finally :
+        if filename is not None :
+            outfile.close()
+
+# vim: foldmethod=marker
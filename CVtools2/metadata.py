@@ -0,0 +1,459 @@
+'''Publication metadata and citations from offline Crossref, OpenAlex, and
+ORCID dumps.
+
+DOIs, author lists, and the years of citations otherwise come from the
+citation databases on line (update_Scopus, update_WoS, update_Google), which
+are slow, limit how often they may be asked, and cannot be reached from a
+machine without a network. A MetadataIndex reads them from dump files on
+disk instead:
+
+    index = MetadataIndex('metadata.sqlite')
+    index.load(glob.glob('openalex/works/*/*.gz'), CV.publication)
+    CV.backfill_metadata(index)
+
+or, in one step, CV.backfill_metadata(index, filenames = [...]). The files
+may be gzipped, and may hold
+
+  - one JSON record per line (OpenAlex works, or Crossref or ORCID records
+    exported that way), or
+  - one JSON document per file, such as the files of the Crossref public
+    data file ({"items": [...]}, on one line or many).
+
+Keyed publications with neither a DOI nor a title in the input script are
+looked for by those of their .bib entries, if the .bib files are given.
+
+Dumps run to many gigabytes, so they are read a line at a time, and only
+what the CV needs is kept, in the SQLite file: the works that are among the
+publications (by DOI, or by title and year for those without one) and the
+citations of them (works whose references include one of their DOIs). A line
+is only parsed as JSON if a DOI, OpenAlex ID, or title in it is one of those
+wanted, which is most of the time it takes. Each file is read once, and
+again only if it changes or there are publications to look for that there
+were not when it was read. A file in which nothing read has a DOI is not in
+any form this knows; it is reported, and read again next time.
+
+OpenAlex gives the works a work cites by their OpenAlex IDs, which are only
+known once the cited work has been read; load the files with your works
+first (or load everything twice) to count the citations that come before
+them. OpenAlex also gives the number of citations in each recent year, which
+are used when there are no citing works to count.'''
+
+import os
+import re
+import sys
+import gzip
+import json
+import sqlite3
+import hashlib
+import itertools
+from . import constants
+from . import citejournal
+from .citejournal import SOURCES
+from .bibimport import bib_entries
+from .bibrender import format_name
+from .duplicates import normalize_title, normalize_doi
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS work (doi TEXT PRIMARY KEY, title TEXT,
+    year INTEGER, authors TEXT, cited_by INTEGER, counts TEXT, openalex TEXT)
+    WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS work_title ON work (title);
+CREATE TABLE IF NOT EXISTS citation (cited TEXT, citing TEXT, year INTEGER,
+    PRIMARY KEY (cited, citing)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS source (filename TEXT PRIMARY KEY, mtime REAL,
+    size INTEGER, wanted TEXT);
+'''
+
+DOI = re.compile(r'10\.[0-9]{4,9}/[^"\s]+')
+OPENALEX = re.compile(r'openalex\.org/(W[0-9]+)')
+TITLE = re.compile(r'"(?:title|display_name)"\s*:\s*\[?\s*"((?:[^"\\]|\\.)*)"')
+TAGS = re.compile(r'<[^>]+>') # Crossref titles have <i> and MathML in them
+
+def _title (title) : # {{{1
+    'A title from a dump, normalized as duplicates.normalize_title does.'
+    return normalize_title(TAGS.sub('', title))
+
+def _unescape (text) : # {{{1
+    'A JSON string (without its quotes) as text.'
+    try :
+        return json.loads('"' + text + '"')
+    except ValueError :
+        return text
+
+def _doi (value) : # {{{1
+    if not isinstance(value, str) or value.strip() == '' :
+        return None
+    return normalize_doi(value)
+
+def _openalex (value) : # {{{1
+    'The OpenAlex ID (W and a number) in value, a URL, or None.'
+    found = OPENALEX.search(value or '')
+    return None if found is None else found.group(1)
+
+def _first (value) : # {{{1
+    'value, or its first element if it is a list (Crossref titles are).'
+    if isinstance(value, list) :
+        return value[0] if len(value) > 0 else None
+    return value
+
+def _crossref_year (record) : # {{{1
+    for field in ('issued', 'published', 'published-print',
+            'published-online', 'created') :
+        try :
+            year = record[field]['date-parts'][0][0]
+        except (KeyError, IndexError, TypeError) :
+            continue
+        if year is not None :
+            return int(year)
+    return None
+
+def _items (document) : # {{{1
+    '''The records in a JSON document from a dump: the items of a Crossref
+       {"items": [...]} or {"message": {"items": [...]}}, the elements of a
+       list, or else the document itself.'''
+    if isinstance(document, list) :
+        return document
+    if isinstance(document, dict) :
+        items = document.get('items')
+        if items is None and isinstance(document.get('message'), dict) :
+            items = document['message'].get('items')
+        if isinstance(items, list) :
+            return items
+    return [document]
+
+def _identified (publications, bibliography) : # {{{1
+    '''Generator over (publication, DOI, title) for each of publications;
+       those with a key and neither a DOI nor a title get those of their
+       entry in the .bib files in bibliography.'''
+    unknown = lambda pub : pub.doi is None and pub.title is None and \
+        pub.key is not None
+    found = bib_entries(set(x.key.lower() for x in publications if
+        unknown(x)), bibliography)
+    for pub in publications :
+        (doi, title) = (pub.doi, pub.title)
+        entry = found.get(pub.key.lower()) if unknown(pub) else None
+        if entry is not None :
+            doi = entry.get('doi')
+            title = entry.get('title') or entry.get('booktitle')
+        yield (pub, doi, title)
+
+def works (record) : # {{{1
+
+    '''Generator over the works in a record from a dump, each a dictionary
+       with doi, title, year, authors (a list of names), cited_by, counts
+       (citations by year, a dictionary), openalex (the ID), references
+       (DOIs), and referenced (OpenAlex IDs), as far as the record says.'''
+
+    if 'activities-summary' in record or 'group' in record : # ORCID
+        groups = record.get('activities-summary', record)
+        groups = (groups.get('works') or groups).get('group') or []
+        for group in groups :
+            for summary in group.get('work-summary') or [] :
+                doi = None
+                ids = (summary.get('external-ids') or {}).get(
+                    'external-id') or []
+                for x in ids :
+                    if x.get('external-id-type') == 'doi' :
+                        doi = _doi(x.get('external-id-value'))
+                try :
+                    title = summary['title']['title']['value']
+                except (KeyError, TypeError) :
+                    title = None
+                try :
+                    year = int(summary['publication-date']['year']['value'])
+                except (KeyError, TypeError, ValueError) :
+                    year = None
+                yield {'doi': doi, 'title': title, 'year': year}
+        return
+    if 'authorships' in record or 'publication_year' in record : # OpenAlex
+        doi = _doi(record.get('doi') or (record.get('ids') or {}).get('doi'))
+        yield {'doi': doi,
+            'title': record.get('title') or record.get('display_name'),
+            'year': record.get('publication_year'),
+            'authors': [(x.get('author') or {}).get('display_name') for x \
+                in record.get('authorships') or []],
+            'cited_by': record.get('cited_by_count'),
+            'counts': {x['year']: x.get('cited_by_count', 0) for x in \
+                record.get('counts_by_year') or [] if 'year' in x},
+            'openalex': _openalex(record.get('id')),
+            'referenced': [x for x in map(_openalex,
+                record.get('referenced_works') or []) if x is not None]}
+        return
+    authors = []
+    for author in record.get('author') or [] : # Crossref
+        name = author.get('name') or ' '.join(x for x in (author.get('given'),
+            author.get('family')) if x)
+        if name :
+            authors.append(name)
+    yield {'doi': _doi(record.get('DOI') or record.get('doi')),
+        'title': _first(record.get('title')), 'year': _crossref_year(record),
+        'authors': authors, 'cited_by': record.get('is-referenced-by-count'),
+        'references': [_doi(x.get('DOI')) for x in \
+            record.get('reference') or [] if _doi(x.get('DOI'))]}
+
+def _records (filename) : # {{{1
+
+    '''Generator over (line, parse) for each record in a dump, where parse()
+       returns the list of records in it; see the module docstring. Lines
+       are handed out unparsed, so that they can be skipped.'''
+
+    opener = gzip.open if filename.endswith('.gz') else open
+    with opener(filename, 'rt', encoding = 'utf-8', errors = 'replace') as \
+            dump :
+        start = [] # the lines read to see which it is
+        for line in dump :
+            start.append(line)
+            line = line.strip().rstrip(',')
+            if line not in ('', '[') :
+                break
+        try :
+            json.loads(line or '{}')
+        except ValueError : # one document, not a record per line
+            document = json.loads(''.join(start) + dump.read())
+            for item in _items(document) :
+                yield (json.dumps(item), lambda item = item: [item])
+            return
+        # a line may be a whole document, e.g. {"items": [...]} on one line
+        for line in itertools.chain(start, dump) :
+            line = line.strip().rstrip(',')
+            if line not in ('', '[', ']') :
+                yield (line, lambda line = line: _items(json.loads(line)))
+
+##############################################################################
+
+class MetadataIndex : # {{{1
+
+    '''The works of a CV found in dump files, and the works that cite them,
+       kept in the SQLite file filename (by default constants.METADATA_INDEX,
+       or ":memory:" for none).'''
+
+    def __init__ (self, filename = None) : # {{{2
+        if filename is None :
+            filename = constants.METADATA_INDEX or ':memory:'
+        self.filename = filename
+        self._connection = None
+
+    @property
+    def connection (self) : # {{{2
+        if self._connection is None :
+            self._connection = sqlite3.connect(self.filename)
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def close (self) : # {{{2
+        if self._connection is not None :
+            self._connection.close()
+            self._connection = None
+
+    def load (self, filenames, publications, bibliography = None, # {{{2
+            batch = 1000) :
+
+        '''Reads the dump files filenames (a name or a list), keeping the
+           works among publications and the citations of them (see the
+           module docstring); keyed publications may be looked for by their
+           entries in the .bib files in bibliography. Returns the number of
+           works and citations stored.'''
+
+        if isinstance(filenames, str) :
+            filenames = [filenames]
+        dois = set()
+        titles = {}
+        for (pub, doi, title) in _identified(publications, bibliography) :
+            doi = _doi(doi)
+            if doi is not None :
+                dois.add(doi)
+            elif title is not None :
+                titles.setdefault(_title(title), []).append(pub.year)
+        titles.pop('', None)
+        wanted = hashlib.sha1(json.dumps([sorted(dois),
+            sorted(titles)]).encode()).hexdigest()
+        # the OpenAlex IDs of works already found
+        aliases = {x: y for (x, y) in self.connection.execute(
+            'SELECT openalex, doi FROM work WHERE openalex IS NOT NULL')}
+        n = 0
+        for filename in filenames :
+            stat = os.stat(filename)
+            known = self.connection.execute('SELECT mtime, size, wanted ' +
+                'FROM source WHERE filename = ?',
+                (os.path.abspath(filename),)).fetchone()
+            if known == (stat.st_mtime, stat.st_size, wanted) :
+                continue
+            (stored, parsed, known) = self._load(filename, dois, titles,
+                aliases, batch)
+            n += stored
+            if parsed > 0 and known == 0 :
+                print ('WARNING: nothing in', filename, 'has a DOI; it is',
+                    'not a Crossref, OpenAlex, or ORCID dump this can read',
+                    file = sys.stderr)
+                continue
+            self.connection.execute('INSERT OR REPLACE INTO source VALUES ' +
+                '(?, ?, ?, ?)', (os.path.abspath(filename), stat.st_mtime,
+                stat.st_size, wanted))
+            self.connection.commit()
+        return n
+
+    def _load (self, filename, dois, titles, aliases, batch) : # {{{2
+        '''Reads one dump file. Returns the number of works and citations
+           stored, the number of records parsed, and the number of works
+           among them with a DOI.'''
+        found = []
+        citations = []
+        n = 0
+        parsed = 0
+        known = 0
+        for (line, parse) in _records(filename) :
+            # skip (without parsing) what mentions nothing wanted
+            if not any(normalize_doi(x.rstrip('.,;')) in dois for x in \
+                    DOI.findall(line)) and not any(x in aliases for x in \
+                    OPENALEX.findall(line)) and not (len(titles) > 0 and
+                    any(_title(_unescape(x)) in titles for x in \
+                    TITLE.findall(line))) :
+                continue
+            try :
+                records = parse()
+            except ValueError :
+                print ('WARNING: skipping a record of', filename, 'that is',
+                    'not JSON', file = sys.stderr)
+                continue
+            for record in records :
+                if not isinstance(record, dict) :
+                    continue
+                parsed += 1
+                for work in works(record) :
+                    if work.get('doi') is not None :
+                        known += 1
+                    self._match(work, dois, titles, aliases, found,
+                        citations)
+            if len(found) + len(citations) >= batch :
+                n += self._store(found, citations)
+                (found, citations) = ([], [])
+        return (n + self._store(found, citations), parsed, known)
+
+    def _match (self, work, dois, titles, aliases, found, # {{{2
+            citations) :
+        doi = work.get('doi')
+        if doi is None :
+            return
+        year = work.get('year')
+        title = _title(work['title']) if work.get('title') else ''
+        if doi in dois or any(x is None or year is None or not
+                isinstance(x, int) or abs(x - year) <= 1 for x in \
+                titles.get(title, ())) :
+            found.append((doi, title, year, json.dumps(work.get('authors')
+                or None), work.get('cited_by'), json.dumps(work.get('counts')
+                or None), work.get('openalex')))
+            dois.add(doi) # so its citations are found from now on
+            if work.get('openalex') is not None :
+                aliases[work['openalex']] = doi
+        for cited in set(work.get('references') or []) | set(aliases[x] \
+                for x in work.get('referenced') or [] if x in aliases) :
+            if cited in dois and cited != doi :
+                citations.append((cited, doi, year))
+
+    def _store (self, found, citations) : # {{{2
+        db = self.connection
+        db.executemany('''INSERT INTO work VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (doi) DO UPDATE SET
+            title = coalesce(excluded.title, title),
+            year = coalesce(excluded.year, year),
+            authors = coalesce(excluded.authors, authors),
+            cited_by = max(coalesce(excluded.cited_by, 0),
+                coalesce(cited_by, 0)),
+            counts = coalesce(excluded.counts, counts),
+            openalex = coalesce(excluded.openalex, openalex)''',
+            [tuple(None if x == 'null' else x for x in row) for row in found])
+        db.executemany('INSERT OR REPLACE INTO citation VALUES (?, ?, ?)',
+            citations)
+        return len(found) + len(citations)
+
+##############################################################################
+
+    def find (self, pub, doi = None, title = None) : # {{{2
+        '''The row (doi, title, year, authors, cited_by, counts) of the work
+           that is the publication pub, by its DOI or else its title and
+           year (doi and title, if given, instead of pub's), or None.'''
+        doi = _doi(doi or pub.doi)
+        if doi is not None :
+            return self.connection.execute('SELECT doi, title, year, ' +
+                'authors, cited_by, counts FROM work WHERE doi = ?',
+                (doi,)).fetchone()
+        title = title or pub.title
+        if title is None :
+            return None
+        for row in self.connection.execute('SELECT doi, title, year, ' +
+                'authors, cited_by, counts FROM work WHERE title = ?',
+                (_title(title),)) :
+            if not isinstance(pub.year, int) or row[2] is None or \
+                    abs(row[2] - pub.year) <= 1 :
+                return row
+        return None
+
+    def citations (self, doi) : # {{{2
+        '''The (citing DOI, year) of each work citing the work doi, latest
+           first.'''
+        return self.connection.execute('SELECT citing, year FROM citation ' +
+            'WHERE cited = ? ORDER BY year DESC, citing', (doi,)).fetchall()
+
+    def fill (self, publications, source = 'scopus', # {{{2
+            overwrite = False, bibliography = None) :
+
+        '''Fills in the doi, author, and year of each of publications that
+           lacks them (any, if overwrite is True; the year only if it is not
+           a number) from the works found, and its citations (ncites,
+           cite_years, and citing_dois) from the works citing it, as those of
+           source (see SOURCES; Crossref and OpenAlex counts are closest to
+           Scopus's) unless it has citations from source already. Without
+           citing works in the dumps read, the citations by year (or the
+           count) the dump gives are used. Keyed publications may be looked
+           up by their entries in the .bib files in bibliography. Returns the
+           publications changed.'''
+
+        if source not in SOURCES :
+            raise ValueError('unknown citation source ' + repr(source))
+        changed = []
+        for (pub, doi, title) in _identified(publications, bibliography) :
+            row = self.find(pub, doi, title)
+            if row is None :
+                continue
+            (doi, title, year, authors, cited_by, counts) = row
+            before = (pub.doi, pub.author, pub.year)
+            if pub.doi is None or overwrite :
+                pub.doi = doi
+            if authors is not None and (pub.author is None or overwrite) :
+                pub.author = [format_name(x) for x in json.loads(authors) \
+                    if x]
+            if year is not None and (overwrite or
+                    not isinstance(pub.year, int)) :
+                pub.year = year
+            cited = self._fill_citations(pub, source, doi, cited_by, counts,
+                overwrite)
+            if cited or before != (pub.doi, pub.author, pub.year) :
+                changed.append(pub)
+        return changed
+
+    def _fill_citations (self, pub, source, doi, cited_by, counts, # {{{2
+            overwrite) :
+        old_ncites = getattr(pub, 'ncites_' + source)
+        old_years = getattr(pub, 'cite_years_' + source)
+        if (old_ncites > 0 or len(old_years) > 0) and not overwrite :
+            return False
+        citing = self.citations(doi)
+        if len(citing) > 0 :
+            years = [x[1] for x in citing if x[1] is not None]
+            setattr(pub, 'citing_dois_' + source, [x[0] for x in citing])
+        else :
+            years = []
+            for (year, n) in json.loads(counts or '{}').items() :
+                years += [int(year)] * n
+        years.sort(reverse = True)
+        ncites = len(years) if len(years) > 0 else cited_by or 0
+        if ncites == old_ncites and years == sorted(old_years,
+                reverse = True) :
+            return False
+        setattr(pub, 'cite_years_' + source, years)
+        setattr(pub, 'ncites_' + source, ncites)
+        pub.ncites = max(pub.ncites_wos, pub.ncites_scopus, pub.ncites_google)
+        citejournal.record(pub, source, old_ncites, old_years)
+        return True
+
+# vim: foldmethod=marker
@@ -0,0 +1,158 @@
+'''Career milestones (appointment and tenure) and which period things fall in.
+
+The dossier counts and lists things separately from before appointment, from
+appointment to tenure, and since tenure. Each entry used to be stamped with
+post_appointment and post_tenure from the set_POST_APPOINTMENT and
+set_POST_TENURE flags in force when it was made, so input scripts had to be
+in order. Milestones instead takes the dates of appointment and tenure from
+the job history and puts every dated entry in its period by bisecting its
+date, whatever order the script gave them in. Entries given post_appointment
+or post_tenure explicitly, or made after set_POST_APPOINTMENT or
+set_POST_TENURE, keep them, and neither flag is worked out without its
+milestone.
+
+The appointment is the start of the earliest professorial job at
+constants.SCHOOL (or anywhere, if there is none), and tenure is the start of
+the earliest such job as an associate or full professor. Give a Job
+milestone = 'appointment' or 'tenure' to say otherwise.
+
+Entries with only a year are taken to be from the middle of it.'''
+
+import re
+import bisect
+import datetime
+from . import constants
+
+APPOINTMENT = 'appointment'
+TENURE = 'tenure'
+
+# the periods in order; period(date) is an index into this
+PERIODS = ('pre_appointment', 'post_appointment_pre_tenure', 'post_tenure')
+
+MONTHS = ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep',
+    'oct', 'nov', 'dec')
+
+def to_date (value, month = None) : # {{{1
+
+    '''Turns 2019, "2019", "5/2019", "5/15/2019", or a date into a date, or
+       None. A month (a number or a name, e.g. "June 5--7") makes a bare
+       year more precise; otherwise a year means July 1 of that year.'''
+
+    if value is None :
+        return None
+    if isinstance(value, datetime.datetime) :
+        return value.date()
+    if isinstance(value, datetime.date) :
+        return value
+    if isinstance(value, str) :
+        value = value.strip()
+        for form in ('%m/%d/%Y', '%m/%Y', '%Y-%m-%d', '%Y-%m') :
+            try :
+                return datetime.datetime.strptime(value, form).date()
+            except ValueError :
+                continue
+        if not re.fullmatch(r'[0-9]{4}', value) :
+            return None
+    year = int(value)
+    if isinstance(month, int) and 1 <= month <= 12 :
+        return datetime.date(year, month, 1)
+    if isinstance(month, str) :
+        name = month.strip()[:3].lower()
+        if name in MONTHS :
+            return datetime.date(year, MONTHS.index(name) + 1, 1)
+        if re.fullmatch(r'[0-9]{1,2}', month.strip()) :
+            return to_date(year, int(month))
+    return datetime.date(year, 7, 1)
+
+def item_date (item) : # {{{1
+    'When an entry (a publication, grant, student, etc.) happened, or None.'
+    for attribute in ('start_date', 'start') :
+        when = getattr(item, attribute, None)
+        if isinstance(when, (list, tuple)) : # e.g. a service done twice
+            when = when[0] if len(when) > 0 else None
+        if when is not None :
+            return to_date(when)
+    year = getattr(item, 'year', None)
+    if isinstance(year, (list, tuple)) : # e.g. reviews over several years
+        year = min(year, default = None)
+    month = getattr(item, 'month', None)
+    if month is None :
+        month = getattr(item, 'date', None)
+    try :
+        return to_date(year, month)
+    except (TypeError, ValueError) :
+        return None
+
+##############################################################################
+
+class Milestones : # {{{1
+
+    '''The dates of appointment and tenure (either may be None), and which
+       period (see PERIODS) any date falls in.'''
+
+    def __init__ (self, appointment = None, tenure = None) : # {{{2
+        self.appointment = to_date(appointment)
+        self.tenure = to_date(tenure)
+        # boundaries between the periods; a missing milestone is never reached
+        far = datetime.date.max
+        self.dates = [self.appointment or self.tenure or far,
+            self.tenure or far]
+
+    @classmethod
+    def from_jobs (cls, jobs) : # {{{2
+        'Finds the milestones in a job history (see the module docstring).'
+        given = {}
+        for job in jobs :
+            if getattr(job, 'milestone', None) is not None :
+                given.setdefault(job.milestone, to_date(job.start_date))
+        professor = [x for x in jobs if x.academic and \
+            re.search(r'\bprofessor\b', x.title, re.IGNORECASE) and \
+            not re.search(r'\b(visiting|adjunct|emerit)', x.title,
+            re.IGNORECASE)]
+        here = [x for x in professor if x.employer == constants.SCHOOL]
+        if len(here) > 0 :
+            professor = here
+        starts = [to_date(x.start_date) for x in professor]
+        appointment = given.get(APPOINTMENT,
+            min([x for x in starts if x is not None], default = None))
+        tenured = [to_date(x.start_date) for x in professor if \
+            re.search(r'^(associate |full )?professor\b', x.title.strip(),
+            re.IGNORECASE)]
+        tenure = given.get(TENURE,
+            min([x for x in tenured if x is not None], default = None))
+        return cls(appointment, tenure)
+
+    def __bool__ (self) : # {{{2
+        return self.appointment is not None or self.tenure is not None
+
+    def __eq__ (self, other) : # {{{2
+        return isinstance(other, Milestones) and \
+            (self.appointment, self.tenure) == \
+            (other.appointment, other.tenure)
+
+    def __hash__ (self) : # {{{2
+        return hash((self.appointment, self.tenure))
+
+    def __repr__ (self) : # {{{2
+        return 'Milestones(' + repr(self.appointment) + ', ' + \
+            repr(self.tenure) + ')'
+
+    def period (self, when) : # {{{2
+        'The index into PERIODS of the date when (None if it is undated).'
+        if when is None :
+            return None
+        return bisect.bisect_right(self.dates, when)
+
+    def classify (self, items) : # {{{2
+
+        '''Sorts items into periods. Returns a list of three lists, one per
+           period (see PERIODS); undated items are left out.'''
+
+        periods = ([], [], [])
+        for item in items :
+            period = self.period(item_date(item))
+            if period is not None :
+                periods[period].append(item)
+        return periods
+
+# vim: foldmethod=marker
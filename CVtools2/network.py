@@ -0,0 +1,356 @@
+'''The co-authorship network of a CV.
+
+update_collaborators makes a flat list of collaborators. A CoauthorNetwork
+keeps who wrote what with whom, a publication at a time, and answers
+questions about the graph of co-authors:
+
+    network = CV.coauthor_network('group.bib')
+    network.collaborators('J. Smith')       # strongest collaborators first
+    network.strength('J. Smith', 'A. Jones')
+    network.components()                    # groups that never co-authored
+    network.centrality()                    # who holds the network together
+    network.bridges()                       # students' external co-authors
+    network.between(2019, 2021)             # the network of those years
+
+People are nodes, told apart as in people.NameIndex (the authors of one
+paper being different people); papers are kept as the lists of their
+authors' nodes, all in a few flat arrays (the array module), and each node
+has an array of its papers. Co-authorship is never stored as
+pairs: a paper with n authors would make n * (n - 1) / 2 of them, which for
+consortium papers with thousands of authors is millions. Instead, each
+question walks the papers of the people it is about. Two people's
+collaboration strength is Newman's: the sum, over the papers they share, of
+1 / (n - 1) for a paper with n authors, so that a paper with two authors
+counts fully and one with a thousand hardly at all.
+
+Papers can be added at any time (CV_data adds each publication as it is
+appended), and the connected components are kept up to date as they are,
+with a union-find structure, so finding anyone's component takes about
+constant time.'''
+
+import array
+from . import constants
+from .people import NameIndex
+from .bibrender import split_names, name_parts
+from .bibimport import bib_entries
+from .employee import GraduateCommittee
+
+def _names (names) : # {{{1
+    if names is None :
+        return []
+    if isinstance(names, str) :
+        return [names]
+    return list(names)
+
+def _year (year) : # {{{1
+    try :
+        return int(year)
+    except (TypeError, ValueError) :
+        return 0 # unknown
+
+def _full_name (name) : # {{{1
+    '''Puts a name from a .bib file in "First von Last, Jr." order, keeping
+       the given names in full to tell people apart.'''
+    (first, von, last, jr) = name_parts(name)
+    name = ' '.join(first + von + last)
+    return name if len(jr) == 0 else name + ', ' + ' '.join(jr)
+
+def _bib_authors (keys, bibliography) : # {{{1
+    '''Dictionary of the author lists of the entries with keys (lower case)
+       in the .bib files in bibliography (a comma-separated string).'''
+    return {key: [_full_name(x) for x in split_names(entry.get('author')
+        or '')] for (key, entry) in bib_entries(keys, bibliography).items()}
+
+##############################################################################
+
+class CoauthorNetwork : # {{{1
+
+    '''People and the papers they wrote together (see the module docstring).
+       group is the names of the CV author and their group (students,
+       postdocs, and the like); students those of the students, who
+       may also be marked by the student and undergraduate lists of the
+       papers added. Publications with only a key get their authors from
+       the .bib files in bibliography (a comma-separated string).'''
+
+    def __init__ (self, group = (), students = (), # {{{2
+            bibliography = None) :
+        self.names = []                     # the name of each node
+        self._index = NameIndex()           # node of each name
+        self._papers = []                   # each node's papers
+        self.start = array.array('l', [0])  # paper p's authors are
+        self.author = array.array('l')      #   author[start[p]:start[p+1]]
+        self.year = array.array('l')        # year of each paper (0: unknown)
+        self._parent = array.array('l')     # union-find of the nodes
+        self.students = set()
+        self.group = set()
+        self.bibliography = bibliography
+        self.state = None # (id, length) of the publications added
+        for (names, nodes) in ((group, self.group),
+                (students, self.students)) :
+            for name in names :
+                n = self.node(name, True)
+                if n is not None :
+                    nodes.add(n)
+
+    @classmethod
+    def from_data (cls, data, bibliography = None) : # {{{2
+        '''The network of the publications of the CV_data object data; the
+           group is constants.AUTHOR and the employees (but for committee
+           students), and the students those marked on any publication.'''
+        group = _names(constants.AUTHOR)
+        group += [str(x) for x in data.employee if not \
+            isinstance(x, GraduateCommittee)]
+        network = cls(group, bibliography = bibliography)
+        network.add_publications(data.publication)
+        network.state = (id(data.publication), len(data.publication))
+        return network
+
+##############################################################################
+
+    def node (self, name, create = False, exclude = ()) : # {{{2
+        '''The node of the person called name (any spelling), or None (or a
+           new node, if create is True) if there is none. exclude is nodes
+           name cannot be, e.g. the other authors of one paper.'''
+        n = self._index.find(name, create, exclude)
+        if n is None :
+            return None
+        if n == len(self.names) :
+            self.names.append(None)
+            self._papers.append(array.array('l'))
+            self._parent.append(n)
+        if create : # the fullest form
+            self.names[n] = self._index.names[n].replace('~', ' ')
+        return n
+
+    def __len__ (self) : # {{{2
+        return len(self.names)
+
+    def __contains__ (self, name) : # {{{2
+        return self._index.find(name) is not None
+
+    @property
+    def npapers (self) : # {{{2
+        return len(self.year)
+
+    def authors (self, paper) : # {{{2
+        'The nodes of the authors of paper (a number).'
+        return self.author[self.start[paper]:self.start[paper+1]]
+
+    def papers (self, name) : # {{{2
+        'The papers (numbers) of the person called name.'
+        n = self.node(name)
+        return array.array('l') if n is None else self._papers[n]
+
+    def add_paper (self, authors, year = None, students = ()) : # {{{2
+
+        '''Adds a paper by the names authors from year year; students are
+           the names of those of them who were students. Returns its number,
+           or None if it has no authors.'''
+
+        nodes = []
+        seen = set()
+        for name in authors :
+            n = self.node(name, True, seen)
+            if n is not None :
+                nodes.append(n)
+                seen.add(n)
+        for name in students :
+            n = self.node(name)
+            if n is not None :
+                self.students.add(n)
+        if len(nodes) == 0 :
+            return None
+        paper = len(self.year)
+        self.author.extend(nodes)
+        self.start.append(len(self.author))
+        self.year.append(_year(year))
+        for n in nodes :
+            self._papers[n].append(paper)
+        # everyone on a paper is in one component
+        first = self._find(nodes[0])
+        for n in nodes[1:] :
+            root = self._find(n)
+            if root != first :
+                self._parent[root] = first
+        return paper
+
+    def add_publications (self, publications) : # {{{2
+        '''Adds publications (Publication objects); those with a key and no
+           authors get them from the .bib files in self.bibliography.'''
+        missing = [x for x in publications if x.author is None and
+            x.key is not None]
+        found = {}
+        if len(missing) > 0 and self.bibliography is not None :
+            found = _bib_authors(set(x.key.lower() for x in missing),
+                self.bibliography)
+        for pub in publications :
+            authors = pub.author
+            if authors is None and pub.key is not None :
+                authors = found.get(pub.key.lower())
+            self.add_paper(_names(authors), pub.year, _names(pub.student) +
+                _names(pub.undergraduate))
+
+    def added (self, publications, new) : # {{{2
+        '''Adds new, just added to the list publications, if the network was
+           up to date before; returns False if it was not.'''
+        if self.state != (id(publications), len(publications) - len(new)) :
+            return False
+        self.add_publications(new)
+        self.state = (id(publications), len(publications))
+        return True
+
+##############################################################################
+
+    def _find (self, n) : # {{{2
+        parent = self._parent
+        root = n
+        while parent[root] != root :
+            root = parent[root]
+        while parent[n] != root : # path compression
+            (parent[n], n) = (root, parent[n])
+        return root
+
+    def connected (self, name, other) : # {{{2
+        'True if there is a chain of co-authors from name to other.'
+        (a, b) = (self.node(name), self.node(other))
+        return a is not None and b is not None and \
+            self._find(a) == self._find(b)
+
+    def components (self) : # {{{2
+        '''The connected components (lists of names), largest first: people
+           in different components never co-authored, even at a remove.'''
+        found = {}
+        for n in range(len(self.names)) :
+            if len(self._papers[n]) > 0 :
+                found.setdefault(self._find(n), []).append(self.names[n])
+        return sorted(found.values(), key = len, reverse = True)
+
+##############################################################################
+
+    def _in (self, paper, first, last) : # {{{2
+        return first is None or first <= self.year[paper] <= last
+
+    def _neighbors (self, n, first = None, last = None) : # {{{2
+        '''Dictionary of the co-authors of node n to [strength, number of
+           papers] (of the papers from first to last, if first is given).'''
+        found = {}
+        for paper in self._papers[n] :
+            if not self._in(paper, first, last) :
+                continue
+            (lo, hi) = (self.start[paper], self.start[paper+1])
+            if hi - lo < 2 :
+                continue
+            weight = 1.0 / (hi - lo - 1)
+            for m in self.author[lo:hi] :
+                if m != n :
+                    record = found.get(m)
+                    if record is None :
+                        found[m] = [weight, 1]
+                    else :
+                        record[0] += weight
+                        record[1] += 1
+        return found
+
+    def strength (self, name, other, first = None, last = None) : # {{{2
+        '''The collaboration strength of two people (see the module
+           docstring), over the years first to last if given.'''
+        (a, b) = (self.node(name), self.node(other))
+        if a is None or b is None or a == b :
+            return 0.0
+        if len(self._papers[a]) > len(self._papers[b]) :
+            (a, b) = (b, a)
+        shared = set(self._papers[b])
+        total = 0.0
+        for paper in self._papers[a] :
+            if paper in shared and self._in(paper, first, last) :
+                total += 1.0 / (self.start[paper+1] - self.start[paper] - 1)
+        return total
+
+    def collaborators (self, name, first = None, last = None) : # {{{2
+        '''The co-authors of the person called name, as (name, strength,
+           number of papers together), strongest first.'''
+        n = self.node(name)
+        if n is None :
+            return []
+        found = self._neighbors(n, first, last)
+        return sorted(((self.names[m], s, k) for (m, (s, k)) in \
+            found.items()), key = lambda x: (-x[1], x[0]))
+
+    def degree (self, name, first = None, last = None) : # {{{2
+        'The number of different co-authors of the person called name.'
+        n = self.node(name)
+        if n is None :
+            return 0
+        papers = [x for x in self._papers[n] if self._in(x, first, last)]
+        if len(papers) == 1 : # no need to tell co-authors apart
+            return self.start[papers[0]+1] - self.start[papers[0]] - 1
+        return len(self._neighbors(n, first, last))
+
+    def centrality (self, first = None, last = None, # {{{2
+            iterations = 100, tolerance = 1e-9) :
+
+        '''The eigenvector centrality of each person (by name) in the network
+           weighted by collaboration strength, scaled so that the most central
+           person has 1: people are central if their strong collaborators
+           are. Each iteration takes one pass over the authors of the papers,
+           without making the pairs of co-authors.'''
+
+        papers = [p for p in range(self.npapers) if self._in(p, first, last)
+            and self.start[p+1] - self.start[p] > 1]
+        x = [1.0] * len(self.names)
+        for i in range(iterations) :
+            y = [0.0] * len(self.names)
+            for paper in papers :
+                authors = self.author[self.start[paper]:self.start[paper+1]]
+                weight = 1.0 / (len(authors) - 1)
+                total = sum(x[n] for n in authors)
+                for n in authors :
+                    y[n] += weight * (total - x[n])
+            top = max(y, default = 0.0)
+            if top == 0.0 :
+                break
+            y = [v / top for v in y]
+            change = max(abs(a - b) for (a, b) in zip(x, y))
+            x = y
+            if change < tolerance :
+                break
+        return {self.names[n]: x[n] for n in range(len(self.names)) \
+            if len(self._papers[n]) > 0}
+
+    def bridges (self, first = None, last = None) : # {{{2
+        '''The students' co-authors from outside the group, as (student,
+           co-author, strength, papers together), strongest first: the
+           people through whom the students reach beyond the group.'''
+        found = []
+        for n in sorted(self.students) :
+            for (m, (s, k)) in self._neighbors(n, first, last).items() :
+                if m not in self.group and m not in self.students :
+                    found.append((self.names[n], self.names[m], s, k))
+        return sorted(found, key = lambda x: (-x[2], x[0], x[1]))
+
+##############################################################################
+
+    def between (self, first, last = None) : # {{{2
+        '''A new network of only the papers from the years first to last (by
+           default, just first), with the same group and students.'''
+        if last is None :
+            last = first
+        network = CoauthorNetwork()
+        for paper in range(self.npapers) :
+            if self._in(paper, first, last) :
+                network.add_paper([self.names[n] for n in \
+                    self.authors(paper)], self.year[paper])
+        for (nodes, names) in ((self.group, network.group),
+                (self.students, network.students)) :
+            for n in nodes :
+                m = network.node(self.names[n])
+                if m is not None :
+                    names.add(m)
+        return network
+
+    def years (self) : # {{{2
+        'Dictionary of each year (with papers) to its network (see between).'
+        return {year: self.between(year) for year in sorted(set(self.year))
+            if year != 0}
+
+# vim: foldmethod=marker
@@ -0,0 +1,316 @@
+'''An index of the people who appear anywhere in a CV.
+
+Names are written many ways ("John T. Smith", "Smith, John", "J.~T. Smith",
+"J. Smith"). normalize_name reduces every name to its last name and first
+initial, which is only a block: "Daisy Duck" and "D. F. Duck" have the same
+one, but are not the same person. Within a block, NameIndex compares the
+given names (see same_person), so that "J.~T. Smith" is "John Thomas Smith"
+but "Jane Smith" is not, and a name that could be either of two people
+("J. Smith", with John and Jane about) is neither. Everything that mentions
+one person is collected on one Person: the Employee records, the
+publications and presentations on which they are an author (and whether they
+were listed as a student, undergraduate, corresponding author, or presenter),
+the grants on which they are an investigator or were supported, the
+committees they sat on, and their funding sources.
+
+The index is built in one pass over a CV_data object; use
+CV_data.person_index() to get it rather than building one yourself.'''
+
+import re
+import functools
+from .employee import GraduateCommittee
+
+SUFFIXES = ('jr', 'sr', 'ii', 'iii', 'iv')
+
+def _split_name (name) : # {{{1
+
+    '''Splits a name into its last names and given names (lists of words),
+       without LaTeX markup, periods, or suffixes like "Jr."'''
+
+    # \'{e} -> e, \emph{Smith} -> Smith, {van der Berg} -> van der Berg
+    name = re.sub(r'\\[a-zA-Z]+\s*', '', name)
+    name = re.sub(r'\\.', '', name)
+    name = re.sub(r'[{}*]', '', name)
+    name = name.replace('~', ' ').replace('.', ' ')
+    # "King, Jr." is not "Last, First"
+    name = re.sub(r',\s*(' + '|'.join(SUFFIXES) + r')\s*$', '', name,
+        flags = re.IGNORECASE)
+    if ',' in name :
+        (last, first) = name.split(',', 1)
+        last = last.split()
+        first = first.split()
+        # "Smith, Jr., John"
+        if len(first) > 0 and first[0].lower().rstrip(',') in SUFFIXES :
+            first = first[1:]
+        first = [x.strip(',') for x in first if x.strip(',') != '']
+        # "Beethoven, Ludwig van"
+        while len(first) > 1 and first[-1].islower() :
+            last.insert(0, first.pop())
+        return (last, first)
+    names = name.split()
+    while len(names) > 1 and names[-1].lower() in SUFFIXES :
+        names.pop()
+    # "van der Berg" and the like: lower-case particles go with the last
+    i = len(names) - 1
+    while i > 1 and names[i-1].islower() :
+        i -= 1
+    return (names[i:], names[:i])
+
+@functools.lru_cache(maxsize=None)
+def normalize_name (name) : # {{{1
+
+    '''Reduces a name to "last f" (last name and first initial, lower case,
+       without LaTeX markup), e.g. "Smith, J.~T." -> "smith j". This is a
+       block of people who might be the same, not a person: compare their
+       given names (see NameIndex) to tell them apart.'''
+
+    (last, first) = _split_name(name)
+    last = ' '.join(last).lower()
+    if len(first) == 0 or len(first[0]) == 0 :
+        return last
+    return last + ' ' + first[0][0].lower()
+
+@functools.lru_cache(maxsize=None)
+def given_names (name) : # {{{1
+    '''The given names of name, lower case and without markup or periods,
+       e.g. "J.~Thomas Smith" -> "j thomas".'''
+    given = ' '.join(_split_name(name)[1])
+    return ' '.join(re.sub(r'[^\w\s-]', ' ', given.lower()).split())
+
+def compatible (given, other) : # {{{1
+    '''True if two lists of given names (see given_names) could be the same
+       person's: each pair agrees on its initial, and full names that are
+       both spelled out are the same.'''
+    for (a, b) in zip(given.split(), other.split()) :
+        if a[0] != b[0] or (len(a) > 1 and len(b) > 1 and a != b) :
+            return False
+    return True
+
+def initials (given) : # {{{1
+    'True if given names (see given_names) are only initials, e.g. "j t".'
+    return all(len(x) == 1 for x in given.split())
+
+def same_person (given, other) : # {{{1
+    '''True if two lists of given names (see given_names) in one block are
+       taken to be one person's: they are compatible, and if only one of them
+       spells out a name, the other has no more initials than it has names
+       ("d" is "donald f", but "d f" is not "daisy").'''
+    if not compatible(given, other) :
+        return False
+    (a, b) = (given.split(), other.split())
+    if initials(given) and not initials(other) :
+        return len(a) <= len(b)
+    if initials(other) and not initials(given) :
+        return len(b) <= len(a)
+    return True
+
+def _fuller (given, other) : # {{{1
+    'The given names of two forms of one name, as fully as either has them.'
+    (a, b) = (given.split(), other.split())
+    if len(a) < len(b) :
+        (a, b) = (b, a)
+    return ' '.join(x if i >= len(b) or len(x) >= len(b[i]) else b[i] \
+        for (i, x) in enumerate(a))
+
+##############################################################################
+
+class NameIndex : # {{{1
+
+    '''Numbers the people named by any number of names, one number per
+       person however their name is written. Names are blocked by
+       normalize_name and, within a block, are one person's if same_person
+       says so. A name that matches no one (or more than one person) is a
+       new person; each person's given names are kept as fully as any of
+       their names spells them, so "D. Duck" after "Donald F. Duck" is
+       Donald, while "Daisy Duck" is someone else.'''
+
+    def __init__ (self) : # {{{2
+        self.names = []   # the fullest name of each person
+        self._given = []  # their given names (see given_names)
+        self._blocks = {} # normalize_name: the people in that block
+        self._ambiguous = set() # people whose name was several people's
+
+    def find (self, name, create = False, exclude = ()) : # {{{2
+
+        '''The number of the person called name, or None if there is no
+           one person it can be. If create is True, a name that is no one's
+           (or could be anyone of several) is a new person, and a person's
+           name is filled out by name. exclude is people name cannot be,
+           e.g. the other authors of one paper.'''
+
+        block = normalize_name(name)
+        if block == '' :
+            return None
+        given = given_names(name)
+        people = self._blocks.get(block, [])
+        found = [n for n in people if n not in exclude and
+            self._given[n] == given]
+        if len(found) == 0 :
+            found = [n for n in people if n not in exclude and n not in
+                self._ambiguous and same_person(given, self._given[n])]
+        if len(found) == 1 :
+            n = found[0]
+        elif not create :
+            return None
+        else :
+            n = len(self.names)
+            if len(found) > 1 : # only this very name is this person
+                self._ambiguous.add(n)
+            self.names.append(name)
+            self._given.append(given)
+            self._blocks.setdefault(block, []).append(n)
+            return n
+        if create and n not in self._ambiguous :
+            self._given[n] = _fuller(given, self._given[n])
+            if len(name) > len(self.names[n]) :
+                self.names[n] = name
+        return n
+
+    def __len__ (self) : # {{{2
+        return len(self.names)
+
+##############################################################################
+
+def _names (names) : # {{{1
+    'Turns None, a name, or a list/tuple of names into a list of names.'
+    if names is None :
+        return []
+    if isinstance(names, str) :
+        return [names]
+    return list(names)
+
+##############################################################################
+
+class Person : # {{{1
+
+    '''Everything in a CV that mentions one person; key is their number in
+       the NameIndex.'''
+
+    def __init__ (self, key, name) : # {{{2
+        self.key = key
+        self.name = name
+        self.employee = []
+        self.publication = []
+        self.presentation = []
+        self.grant = []
+        self.committee = []
+        self.funding = []
+        self.roles = set()
+
+    def __str__ (self) : # {{{2
+        return self.name
+
+    def __repr__ (self) : # {{{2
+        return 'Person(' + repr(self.name) + ')'
+
+##############################################################################
+
+class PersonIndex : # {{{1
+
+    '''Maps people to Person objects for every name in a CV_data object
+       (see NameIndex). Look people up by any spelling of their name:
+       index['J. Smith'], 'Smith, John' in index, index.get(...).'''
+
+    def __init__ (self, data) : # {{{2
+        self.names = NameIndex()
+        self.person = {}
+        for employee in data.employee :
+            if isinstance(employee, GraduateCommittee) :
+                self._add_all(str(employee), 'committee student', 'employee',
+                    employee)
+            else :
+                self._add_all(str(employee), 'advisee', 'employee', employee)
+                person = self.get(str(employee))
+                for source in _names(employee.funding) :
+                    if person is not None and source not in person.funding :
+                        person.funding.append(source)
+            self._add_all(employee.committee, 'committee', 'committee',
+                employee)
+        for pub in data.publication :
+            self._add_all(pub.author, 'author', 'publication', pub)
+            self._add_all(pub.student, 'student', 'publication', pub)
+            self._add_all(pub.undergraduate, 'undergraduate', 'publication',
+                pub)
+            self._add_all(pub.corauth, 'corauth', 'publication', pub)
+        for pres in data.presentation :
+            self._add_all(pres.author, 'author', 'presentation', pres)
+            self._add_all(pres.student, 'student', 'presentation', pres)
+            self._add_all(pres.undergraduate, 'undergraduate',
+                'presentation', pres)
+            self._add_all(pres.presenter, 'presenter', 'presentation', pres)
+        for grant in data.grant :
+            for role in ('PI', 'coPI', 'coI', 'senior_personnel',
+                    'students_supported') :
+                self._add_all(getattr(grant, role), role, 'grant', grant)
+            for name in _names(grant.students_supported) :
+                person = self.get(name)
+                if person is not None and grant.source not in \
+                        person.funding :
+                    person.funding.append(grant.source)
+        for person in self.person.values() :
+            person.name = self.names.names[person.key]
+
+    def _add (self, name, role, exclude = ()) : # {{{2
+        key = self.names.find(name, True, exclude)
+        if key is None :
+            return None
+        try :
+            person = self.person[key]
+        except KeyError :
+            person = self.person[key] = Person(key, name)
+        person.roles.add(role)
+        return person
+
+    def _add_all (self, names, role, collection, item) : # {{{2
+        added = set() # the names of one list are different people
+        for name in _names(names) :
+            person = self._add(name, role, added)
+            if person is None :
+                continue
+            added.add(person.key)
+            items = getattr(person, collection)
+            # names may repeat on one item (e.g. author and presenter)
+            if len(items) == 0 or items[-1] is not item :
+                items.append(item)
+
+    def __getitem__ (self, name) : # {{{2
+        person = self.get(name)
+        if person is None :
+            raise KeyError(name)
+        return person
+
+    def get (self, name, default = None) : # {{{2
+        return self.person.get(self.names.find(name), default)
+
+    def __contains__ (self, name) : # {{{2
+        return self.get(name) is not None
+
+    def __iter__ (self) : # {{{2
+        return iter(self.person.values())
+
+    def __len__ (self) : # {{{2
+        return len(self.person)
+
+    def has_role (self, name, role) : # {{{2
+        'True if the person called name ever had the given role.'
+        person = self.get(name)
+        return person is not None and role in person.roles
+
+    def is_student (self, name) : # {{{2
+        return self.has_role(name, 'student')
+
+    def is_undergraduate (self, name) : # {{{2
+        return self.has_role(name, 'undergraduate')
+
+    def employee (self, name) : # {{{2
+        '''Returns the Employee record (student, postdoc, etc.) for name, or
+           None if there is not one.'''
+        person = self.get(name)
+        if person is None :
+            return None
+        for employee in person.employee :
+            if not isinstance(employee, GraduateCommittee) :
+                return employee
+        return None
+
+# vim: foldmethod=marker
@@ -137,7 +137,7 @@ class PubCount : # {{{1
                     if pub.post_appointment :
                         self.nproc_notreviewed_post_appointment += 1
                     if pub.post_tenure :
-                        self_notreviewed_post_tenure += 1
+                        self.nproc_notreviewed_post_tenure += 1
             elif isinstance(pub,Book) :
                 self.nbooks += 1
                 if pub.post_appointment :
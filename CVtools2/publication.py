@@ -1,10 +1,16 @@
 import re
 import sys
 import time
+import datetime
+import requests
+from concurrent.futures import ThreadPoolExecutor
 from .recent import Recent
 from . import recent
 from . import constants
-from .utilities import markup_authors, toordinal
+from . import webquery
+from . import browserpool
+from . import citejournal
+from .utilities import markup_authors, toordinal, strip_latex
 
 class Publication (Recent) : # {{{1
 
@@ -200,6 +206,7 @@ class Publication (Recent) : # {{{1
 
 ##############################################################################
 
+    @citejournal.citation_section
     def write_citations (self, texfile) : # {{{2
 
         'Prints "[Cited X times in (a database)]" after an entry.'
@@ -261,7 +268,6 @@ class Publication (Recent) : # {{{1
         '''Updates Google Scholar citation counts. Whether it works varies
            with Google's paranoia and is an open question.'''
 
-        import selenium.webdriver
         import urllib.parse
         if not self.citable : # skip non-citable publications
             return
@@ -269,9 +275,7 @@ class Publication (Recent) : # {{{1
             return
         if self.title is not None :
             try :
-                query_string = re.sub(r'\\[a-zA-Z]+{([^}]+)}', r'\1',
-                    self.title)
-                query_string = re.sub(r'\$', '', query_string)
+                query_string = strip_latex(self.title)
             except TypeError :
                 print ("WARNING: unable to update Google Scholar citations",
                     "for key", self.key, file = sys.stderr)
@@ -280,23 +284,18 @@ class Publication (Recent) : # {{{1
             query_string = self.doi
         else :
             try :
-                query_string = re.sub(r'\\[a-zA-Z]+{([^}]+)}', r'\1',
-                    self.booktitle)
-                query_string = re.sub(r'\$', '', query_string)
+                query_string = strip_latex(self.booktitle)
             except TypeError :
                 print ("WARNING: unable to update Google Scholar citations",
                     "for key", self.key, file = sys.stderr)
                 return
         # Pause for a while so Google doesn't think you're a robot
         time.sleep(constants.GOOGLE_TIME_BETWEEN)
-        # Start the browser, if necessary
-        close_browser = False
+        # Borrow a browser from the shared pool, if necessary
+        pool = None
         if browser is None :
-            options = selenium.webdriver.firefox.options.Options()
-            options.set_headless()
-            assert options.headless
-            browser = selenium.webdriver.Firefox (options = options)
-            close_browser = True
+            pool = browserpool.shared_pool()
+            browser = pool.checkout()
         ncites_google = 0
         try :
             browser.get('https://scholar.google.com/scholar?hl=en&q=' \
@@ -351,10 +350,13 @@ class Publication (Recent) : # {{{1
                     print (urllib.parse.quote(self.title))
                 else :
                     print (urllib.parse.quote(self.doi))
+            old_ncites = self.ncites_google
             self.ncites_google = ncites_google
+            citejournal.record(self, 'google', old_ncites,
+                self.cite_years_google)
         finally :
-            if close_browser :
-                browser.close()
+            if pool is not None :
+                pool.release(browser)
         self.ncites = max(self.ncites_wos, self.ncites_scopus,
             self.ncites_google)
 
@@ -362,21 +364,37 @@ class Publication (Recent) : # {{{1
 
     def update_Google_years (self, browser, url) : # {{{2
 
-        'Updates Google Scholar citation years'
+        '''Updates Google Scholar citation years. If browser is None, the
+           years are looked up side by side in browsers from the shared
+           pool.'''
 
         years = range(self.year, datetime.date.today().year + 1)
-        cite_years = self.cite_years_google
-        for year in years :
-            time.sleep(WAIT_TIME)
+
+        def count_year (browser, year) :
+            time.sleep(constants.WAIT_TIME)
             browser.get(url + '&as_ylo=' + str(year) + '&as_yhi=' + str(year))
             tags = browser.find_elements_by_class_name('gs_ab_mdw')
             for tag in tags :
                 if 'result' in tag.text :
-                    field = tag.text.split()
-                    ninyear = int(field[0])
-                    while ninyear > cite_years.count(year) :
-                        cite_years.append(year)
-                    #cite_years.sort(reverse=True)
+                    return int(tag.text.split()[0])
+            return 0
+
+        if browser is not None :
+            counts = [count_year(browser, year) for year in years]
+        else :
+            pool = browserpool.shared_pool()
+            def pooled_count_year (year) :
+                with pool.browser() as browser :
+                    return count_year(browser, year)
+            with ThreadPoolExecutor(max_workers = pool.size) as executor :
+                counts = list(executor.map(pooled_count_year, years))
+        cite_years = self.cite_years_google
+        old_cite_years = list(cite_years)
+        for (year, ninyear) in zip(years, counts) :
+            while ninyear > cite_years.count(year) :
+                cite_years.append(year)
+            #cite_years.sort(reverse=True)
+        citejournal.record(self, 'google', self.ncites_google, old_cite_years)
 
 ##############################################################################
 
@@ -386,48 +404,51 @@ class Publication (Recent) : # {{{1
 
         if self.doi is None :
             return
-        else :
-            citedata = subprocess.Popen ('wget -q --header '
-                + '"X-ELS-APIKey:' + SCOPUS_API_KEY + '" '
-                + '"http://api.elsevier.com/content/search/scopus?query=DOI('
-                + self.doi + ')&field=citedby-count" -O -',
-                shell=True, stdout=subprocess.PIPE)
-            output = str(citedata.communicate()[0])
-            try :
-                citestr = output.rpartition('"citedby-count":')[-1]
-                citestr = citestr.lstrip('":').rstrip('}]\"\'')
-                ncites_scopus = int(citestr)
-                if self.ncites_scopus != ncites_scopus :
-                    print ('WARNING:  ncites_scopus is out of date for',
-                        'entry', str(self), '(' + str(self.ncites_scopus),
-                        '-->', str(ncites_scopus) + ')', file = sys.stderr)
-                self.ncites_scopus = ncites_scopus
-                self.ncites = max(self.ncites_wos, self.ncites_scopus,
-                    self.ncites_google)
-            except ValueError :
-                print ('WARNING:  unable to extract Scopus cite count for key',
-                    self.key, file = sys.stderr)
+        try :
+            entries = list(webquery.scopus_search('DOI(' + self.doi + ')',
+                field = 'citedby-count'))
+            ncites_scopus = int(entries[0]['citedby-count'])
+        except (KeyError, IndexError, ValueError, requests.RequestException) :
+            print ('WARNING:  unable to extract Scopus cite count for key',
+                self.key, file = sys.stderr)
+            return
+        if self.ncites_scopus != ncites_scopus :
+            print ('WARNING:  ncites_scopus is out of date for',
+                'entry', str(self), '(' + str(self.ncites_scopus),
+                '-->', str(ncites_scopus) + ')', file = sys.stderr)
+        old_ncites = self.ncites_scopus
+        self.ncites_scopus = ncites_scopus
+        citejournal.record(self, 'scopus', old_ncites,
+            self.cite_years_scopus)
+        self.ncites = max(self.ncites_wos, self.ncites_scopus,
+            self.ncites_google)
 
 ##############################################################################
 
     def update_MSacad (self) : # {{{2
         'Update citations from Microsoft Academic. (They suck....)'
+        self.ncites_MSacad = 0
         if self.doi is None :
-            self.ncites_MSacad = 0
-        else :
-            p1 = subprocess.Popen (r'wget -q -O - "http://academic.research.microsoft.com/Search?query=doi(' + self.doi + ')"',
-                shell=True, stdout=subprocess.PIPE)
-            p2 = subprocess.Popen ('fgrep -i Citations', shell=True,
-                stdin=p1.stdout, stdout=subprocess.PIPE)
-            output = str(p2.communicate()[0])
-            output = re.sub(r'.*>Citations:\s*', '', output)
-            output = re.sub(r'</a>.*', '', output)
-            try :
-                self.ncites_MSacad = int(output)
-            except ValueError :
-                self.ncites_MSacad = 0
-            print ('article: ', self.key, '; MSacad_cites:',
-                self.ncites_MSacad, file=sys.stderr)
+            return
+        try :
+            with webquery.session().get(
+                    'http://academic.research.microsoft.com/Search',
+                    params = {'query': 'doi(' + self.doi + ')'},
+                    stream = True) as reply :
+                for line in reply.iter_lines(decode_unicode = True) :
+                    if line is None or 'citations' not in line.lower() :
+                        continue
+                    output = re.sub(r'.*>Citations:\s*', '', line)
+                    output = re.sub(r'</a>.*', '', output)
+                    try :
+                        self.ncites_MSacad = int(output)
+                    except ValueError :
+                        self.ncites_MSacad = 0
+                    break
+        except requests.RequestException :
+            pass
+        print ('article: ', self.key, '; MSacad_cites:',
+            self.ncites_MSacad, file=sys.stderr)
 
 ##############################################################################
 
@@ -437,61 +458,45 @@ class Publication (Recent) : # {{{1
 
         if self.doi is None :
             return
-        else :
-            citedata = subprocess.Popen ('wget -q --header '
-                + '"X-ELS-APIKey: ' + SCOPUS_API_KEY + '" '
-                + '"http://api.elsevier.com/content/search/scopus?query=DOI('
-                + self.doi + ')" -O -',
-                shell=True, stdout=subprocess.PIPE)
-            output = str(citedata.communicate()[0])
-            if re.search ('scopus-citedby', output) :
-                citestr = output.rpartition('"scopus-citedby", "@href": "')[-1]
-                citestr = citestr.partition('}')[0]
-                url = citestr.rstrip('"')
-                # FIXME:  Hack until you are able to solve the problem
-                if ( len(self.cite_years_scopus) != self.ncites_scopus ) :
-                    print ('URL for updating Scopus years for', self.key,
-                        'is', url)
-                return
-                # END HACK
-                citedata = subprocess.Popen ('wget -q --header '
-                    + '"X-ELS-APIKey:' + SCOPUS_API_KEY + '" "'
-                    + url + '" -O -', shell=True, stdout=subprocess.PIPE)
-                output = citedata.communicate()[0]
-                flag = False
-                years = []
-                for line in output.split('\n') :
-                    if re.match ('<span class="">', line) :
-                        continue
-                    if re.match('</span>', line) :
-                        flag = False
-                        continue
-                    if flag :
-                        years.append(int(line))
-                    if re.match('<label class="hidden-label">Year the Document was Publish</label>', line) :
-                        flag = True
-                        continue
-                print ('key: ', self.key, '; years =', years,
-                    '; self.cite_years =', self.cite_years_scopus,
-                    file=sys.stderr)
-                print ('url:  "' + url + '"', file=sys.stderr)
-                print ('output:', output)
-                y = self.cite_years_scopus[:]
-                extras = []
-                while years > y :
-                    extras.append(years.pop(0))
-                if len(extras) > 0 :
-                    print ('WARNING:  cite_years_scopus is out of date for',
-                            'entry', str(self) + ';',
-                            'these dates seem to be missing:', extras)
-                    self.cite_years_scopus = extras + self.cite_years_scopus
-            elif re.search ('Result set was empty', output) :
-                print('WARNING:  No document found for key', self.key,
-                    'with DOI', self.doi, file=sys.stderr)
-            else :
-                print('WARNING:  unable to extract Scopus cited document URL',
-                    'from this:', file = sys.stderr)
-                print(output, file=sys.stderr)
+        try :
+            entries = list(webquery.scopus_search('DOI(' + self.doi + ')',
+                field = 'eid'))
+        except (KeyError, requests.RequestException) as err :
+            print('WARNING:  unable to look up Scopus EID for key', self.key,
+                '(' + str(err) + ')', file = sys.stderr)
+            return
+        if len(entries) == 0 :
+            print('WARNING:  No document found for key', self.key,
+                'with DOI', self.doi, file=sys.stderr)
+            return
+        eid = str(entries[0]['eid'])
+        # Every page of citing documents is requested at once
+        years = []
+        try :
+            for paper in webquery.scopus_search_concurrent(
+                    'refeid(' + eid + ')', field = 'coverDate') :
+                try :
+                    years.append(int(paper['prism:coverDate'].split('-')[0]))
+                except KeyError :
+                    pass
+        except (KeyError, requests.RequestException) as err :
+            print('WARNING:  unable to extract Scopus citing documents',
+                'for key', self.key, '(' + str(err) + ')', file = sys.stderr)
+            return
+        years.sort(reverse=True)
+        if years == sorted(self.cite_years_scopus, reverse=True) :
+            return
+        print ('WARNING:  cite_years_scopus is out of date for entry',
+            str(self), file = sys.stderr)
+        if len(years) > 0 :
+            for year in reversed(range(min(years),max(years)+1)) :
+                a = self.cite_years_scopus.count(year)
+                b = years.count(year)
+                if a != b :
+                    print (a, '*[', year, '] -> ', b, '*[', year, ']', sep='')
+        old_cite_years = self.cite_years_scopus
+        self.cite_years_scopus = years
+        citejournal.record(self, 'scopus', self.ncites_scopus, old_cite_years)
 
 ##############################################################################
 
@@ -5,6 +5,7 @@ RECENT = False  # used to set whether things are marked recent by default
 SHOW_RECENT = True # whether recent things are highlighted
 POST_APPOINTMENT = False # used to easily set whether things are pre/post-appt
 POST_TENURE = False # ...and pre/post-tenure
+PERIODS_SET = set() # which of those two were set, and so are not worked out
 
 def set_RECENT (value = True) :
     global RECENT
@@ -17,10 +18,12 @@ def set_SHOW_RECENT (value = True) :
 def set_POST_APPOINTMENT (value = True) :
     global POST_APPOINTMENT
     POST_APPOINTMENT = value
+    PERIODS_SET.add('post_appointment')
 
 def set_POST_TENURE (value = True) :
     global POST_TENURE
     POST_TENURE = value
+    PERIODS_SET.add('post_tenure')
 
 class Recent : # {{{1
 
@@ -36,6 +39,11 @@ class Recent : # {{{1
         if self.recent is None :
             self.recent = RECENT
         # We set pre/post appointment and pre/post tenure, too (why not?)
+        # Those given here or with set_POST_APPOINTMENT/set_POST_TENURE are
+        # kept; the rest can be worked out from the dates of appointment and
+        # tenure (see milestones.py)
+        self._periods_given = tuple(x for x in ('post_appointment',
+            'post_tenure') if args.get(x) is not None or x in PERIODS_SET)
         if 'post_appointment' in args :
             self.post_appointment = args['post_appointment']
         else :
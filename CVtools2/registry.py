@@ -0,0 +1,177 @@
+'''Which collection of a CV_data object each kind of entry goes in.
+
+CV_data.append used to test an entry against each kind in turn. A Registry
+instead keeps a list of (class, collection) rules, in order of precedence,
+and works out the collection for each class the first time it sees one,
+from the classes it inherits from (its method resolution order), just as the
+isinstance tests did. After that, dispatch is a dictionary lookup.
+
+CollectionIndex keeps a secondary index of one collection by one attribute
+(publications by DOI, presentations by year, and so on), so that lookups do
+not scan the list. Indexes are brought up to date incrementally when entries
+are appended through CV_data, and rebuilt if the list was changed some other
+way.
+
+MergeIndex keeps the entries of a collection by a canonical key (their
+merge_key()), so that CV_data can tell whether a new service or session
+duplicates one it has already with a single dictionary lookup, and keeps a
+consolidated view of collections whose entries are kept apart (manuscript
+reviews, one per manuscript, summarized by journal).'''
+
+def normalize (attribute, value) : # {{{1
+
+    '''The form of value an index on attribute compares: strings without
+       case or surrounding space, and DOIs without any resolver prefix.'''
+
+    if not isinstance(value, str) :
+        return value
+    value = value.strip().lower()
+    if attribute == 'doi' :
+        for prefix in ('https://doi.org/', 'http://doi.org/',
+                'https://dx.doi.org/', 'http://dx.doi.org/', 'doi:') :
+            if value.startswith(prefix) :
+                return value[len(prefix):]
+    return value
+
+##############################################################################
+
+class Registry : # {{{1
+
+    '''Maps classes of entries to the names of the CV_data collections they
+       go in. rules is a list of (class, collection) pairs; an entry goes in
+       the collection of the first rule whose class it is an instance of.'''
+
+    def __init__ (self, rules = ()) : # {{{2
+        self.rules = list(rules)
+        self._resolved = {}
+
+    def register (self, cls, collection, first = False) : # {{{2
+        '''Adds a rule, after the others (or, if first is True, before them,
+           so that it overrides them for subclasses of cls).'''
+        if first :
+            self.rules.insert(0, (cls, collection))
+        else :
+            self.rules.append((cls, collection))
+        self._resolved.clear()
+
+    def collection (self, x) : # {{{2
+        'The name of the collection entry x goes in. Raises TypeError.'
+        cls = type(x)
+        try :
+            name = self._resolved[cls]
+        except KeyError :
+            name = self._resolved[cls] = self._resolve(cls)
+        if name is None :
+            raise TypeError('no CV_data collection for ' + cls.__name__ +
+                ' objects')
+        return name
+
+    def _resolve (self, cls) : # {{{2
+        # the first rule for any class cls inherits from, as isinstance
+        # tests in the same order would find
+        mro = set(cls.__mro__)
+        for (rule, name) in self.rules :
+            if rule in mro :
+                return name
+        return None
+
+    def collections (self) : # {{{2
+        'The names of all the collections, in the order of the rules.'
+        return list(dict.fromkeys(name for (rule, name) in self.rules))
+
+##############################################################################
+
+class CollectionIndex : # {{{1
+
+    '''An index of the entries of one collection by the (normalized) value
+       of one of their attributes. Use lookup(); the index is brought up to
+       date with the collection itself as needed.'''
+
+    def __init__ (self, attribute) : # {{{2
+        self.attribute = attribute
+        self.table = {}
+        self.state = None # (id, length) of the list the table describes
+
+    def _key (self, item) : # {{{2
+        value = normalize(self.attribute, getattr(item, self.attribute, None))
+        try :
+            hash(value)
+        except TypeError : # e.g. a list of years
+            value = tuple(value)
+        return value
+
+    def rebuild (self, items) : # {{{2
+        self.table = {}
+        for item in items :
+            self.table.setdefault(self._key(item), []).append(item)
+        self.state = (id(items), len(items))
+
+    def added (self, items, new, appended = True) : # {{{2
+
+        '''Records that the entries new were just added to the list items,
+           at its end if appended is True.'''
+
+        if not appended or self.state != (id(items), len(items) - len(new)) :
+            self.state = None # rebuilt at the next lookup
+            return
+        for item in new :
+            self.table.setdefault(self._key(item), []).append(item)
+        self.state = (id(items), len(items))
+
+    def lookup (self, items, value) : # {{{2
+        'The entries of the list items whose attribute is value.'
+        if self.state != (id(items), len(items)) :
+            self.rebuild(items)
+        return list(self.table.get(normalize(self.attribute, value), []))
+
+##############################################################################
+
+class MergeIndex : # {{{1
+
+    '''Entries of one collection by their merge_key(). Without copies, the
+       first entry with each key stands for it (see find); with copies, each
+       key has a copy of its first entry into which every later entry with
+       the key is merged (see merged), leaving the entries themselves alone.'''
+
+    def __init__ (self, copies = False) : # {{{2
+        self.copies = copies
+        self.table = {}
+        self.state = None # (id, length) of the list the table describes
+
+    def _add (self, item) : # {{{2
+        key = item.merge_key()
+        found = self.table.get(key)
+        if found is None :
+            self.table[key] = item.merged_copy() if self.copies else item
+        elif self.copies :
+            found.merge(item)
+
+    def rebuild (self, items) : # {{{2
+        self.table = {}
+        for item in items :
+            self._add(item)
+        self.state = (id(items), len(items))
+
+    def added (self, items, new, appended = True) : # {{{2
+        'As CollectionIndex.added.'
+        if not appended or self.state != (id(items), len(items) - len(new)) :
+            self.state = None
+            return
+        for item in new :
+            self._add(item)
+        self.state = (id(items), len(items))
+
+    def find (self, items, item) : # {{{2
+        '''The entry of the list items that item duplicates (or, with copies,
+           the consolidated entry), or None.'''
+        if self.state != (id(items), len(items)) :
+            self.rebuild(items)
+        return self.table.get(item.merge_key())
+
+    def merged (self, items) : # {{{2
+        'One entry per key, in the order of their first entries in items.'
+        if self.state != (id(items), len(items)) :
+            self.rebuild(items)
+        return list(self.table.values())
+
+# vim: foldmethod=marker
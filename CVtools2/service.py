@@ -1,6 +1,27 @@
 from .recent import Recent
+from .registry import normalize
+from .milestones import to_date
+import copy
 import datetime
 
+def _overlaps (dates, start) : # {{{1
+    'True if a range starting at start overlaps dates, a (start, end) pair.'
+    if dates[1] is None or start == dates[0] :
+        return True
+    (start, end) = (to_date(start), to_date(dates[1]))
+    return start is not None and end is not None and start <= end
+
+def _canonical (attribute, value) : # {{{1
+    'The form of value compared by merge_key: see registry.normalize.'
+    value = normalize(attribute, value)
+    return ' '.join(value.split()) if isinstance(value, str) else value
+
+def _hashable (value) : # {{{1
+    'value, or a tuple of it if it is a list (e.g. of years).'
+    return tuple(value) if isinstance(value, list) else value
+
+##############################################################################
+
 class SocietyMembership (Recent) : # {{{1
 
     'Membership in a professional society.'
@@ -128,6 +149,20 @@ class SessionChair (Recent) : # {{{1
             print (r'  \emph{' + self.note + '}', file = texfile)
         self.end_recent(texfile)
 
+##############################################################################
+
+    def merge_key (self) : # {{{2
+        'What makes two sessions the same (see CV_data.append).'
+        return (type(self), _canonical('role', self.role),
+            _canonical('event', self.event), _canonical('date', self.date),
+            _hashable(self.year))
+
+    def merge (self, other) : # {{{2
+        'Folds a duplicate of this session into it.'
+        self.recent = self.recent or other.recent
+        if self.note is None :
+            self.note = other.note
+
 ##############################################################################
 ##############################################################################
 
@@ -239,6 +274,27 @@ class ManuscriptReview (Recent) : # {{{1
     def __str__ (self) : # {{{2
         return str(self.journal)
 
+##############################################################################
+
+    def merge_key (self) : # {{{2
+        'Reviews for the same journal are summarized together.'
+        return _canonical('journal', self.journal)
+
+    def merged_copy (self) : # {{{2
+        'A summary of reviews for this journal, starting with this one.'
+        summary = copy.copy(self)
+        summary.count = 1
+        return summary
+
+    def merge (self, other) : # {{{2
+        'Adds another review for the same journal to this summary.'
+        self.recent = self.recent or other.recent
+        self.count += 1
+        if other.earliest < self.earliest :
+            self.earliest = other.earliest
+        if other.latest > self.latest :
+            self.latest = other.latest
+
 ##############################################################################
 
     def write (self, texfile, print_count = True) : # {{{2
@@ -290,20 +346,48 @@ class Service (Recent) : # {{{1
 
 ##############################################################################
 
+    def merge_key (self) : # {{{2
+        'What makes two services the same, apart from their dates.'
+        return (type(self), _canonical('role', self.role),
+            _canonical('description', self.description))
+
+    def ranges (self) : # {{{2
+        '''The (start, end) of each time this service was done; end is None
+           for one still going on.'''
+        if not isinstance(self.start, (list,tuple)) :
+            return [(self.start, self.end)]
+        ends = list(self.end or [])
+        ends += [None] * (len(self.start) - len(ends))
+        return list(zip(self.start, ends))
+
     def merge (self, other) : # {{{2
+
+        '''Merges other (the same service, see merge_key) into this one:
+           their date ranges are put in order and those that overlap are
+           joined, so start and end are lists only if there are still
+           several ranges.'''
+
         if not isinstance(other, Service) :
-            raise TypeError
-        if isinstance(self.start,list) \
-                and isinstance(other.start,(list,tuple)) :
-            self.start.extend(other.start)
-        elif isinstance(self.start,list) and isinstance(other.start,str) :
-            self.start.extend(other.start)
-        elif isinstance(self.start,tuple) and isinstance(other.start,tuple) :
-            self.start = self.start + other.start
-        elif isinstance(self.start,tuple) and isinstance(other.start,str) :
-            self.start = self.start + (other.start,)
+            raise TypeError('cannot merge ' + other.__class__.__name__ +
+                ' into ' + self.__class__.__name__)
+        ranges = []
+        for (start, end) in sorted(self.ranges() + other.ranges(),
+                key = lambda x: to_date(x[0]) or datetime.date.min) :
+            if len(ranges) > 0 and _overlaps(ranges[-1], start) :
+                # keep the later end (None, "present", is latest of all)
+                last = ranges[-1][1]
+                if last is not None and (end is None or
+                        (to_date(end) or datetime.date.min) >
+                        (to_date(last) or datetime.date.min)) :
+                    ranges[-1][1] = end
+                continue
+            ranges.append([start, end])
+        if len(ranges) == 1 :
+            (self.start, self.end) = ranges[0]
         else :
-            self.start = [self.start,self.other]
+            self.start = [x[0] for x in ranges]
+            self.end = [x[1] for x in ranges]
+        self.recent = self.recent or other.recent
 
 ##############################################################################
 
@@ -323,7 +407,7 @@ class Service (Recent) : # {{{1
                 else :
                     print (self.start[i], 'to', self.end[i],
                         end='', file = texfile)
-                if i < len(self.end) :
+                if i < len(self.start) - 1 :
                     print ('; ', end='', file=texfile)
             # Catch the last one if end is shorter than start
             # (assumes one would not be serving twice simultaneously)
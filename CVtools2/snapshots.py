@@ -0,0 +1,284 @@
+'''What changed in a CV since a given time, e.g. since the last annual review.
+
+Entries added since the last review are marked recent (and printed in color
+in the dossier) by hand, with set_RECENT or recent = True. Instead, save a
+snapshot of the CV at the review,
+
+    CV.save_snapshot('review-2025.json.gz')
+
+and next year have everything added or changed since marked for you:
+
+    diff = CV.mark_recent('review-2025.json.gz')
+    diff.report()
+
+A Snapshot keeps, for each entry of each collection, a hash of what
+identifies the entry (IDENTITY: a publication's key or DOI, a course's number
+and semester, a student's name, and so on), the hashes of the other things
+that identify it as well (its aliases: a publication has its key, its DOI,
+and its title and year), and a hash of its content. Comparing two snapshots
+takes time proportional to the number of entries: entries of the new
+snapshot are matched to those of the old one by identity or else by any
+alias they share (so that a publication that has since been given a DOI is
+the same publication), those left over in the new snapshot were added, those
+left over in the old one were removed, and matched ones whose content
+differs were changed. Attributes that change without anyone editing the
+entry (VOLATILE: the recent and period flags, DOIs and citation counts
+filled in from the databases, journal metrics) are not part of the
+content.'''
+
+import re
+import sys
+import gzip
+import json
+import hashlib
+import datetime
+
+FORMAT = 2 # of snapshot files (1 had no aliases)
+
+# attributes left out of the content hash
+VOLATILE = re.compile(r'_|recent$|post_appointment$|post_tenure$|doi$|' +
+    r'ncites|cite_years_|citing_dois_|journal_IF$|journal_immediacy$|' +
+    r'wos_update_url$|count$|earliest$|latest$')
+
+# collection: the attributes that identify an entry in it (after key and
+# doi, which identify anything that has them), with the name of its class;
+# entries of other collections are identified by their whole content
+IDENTITY = {
+    'publication': ('title', 'booktitle', 'year'),
+    'patent': ('title', 'number'),
+    'grant': ('title', 'source'),
+    'employee': ('last', 'first', 'middle'),
+    'collaborator': ('last', 'first', 'middle'),
+    'course': ('number', 'semester', 'year'),
+    'presentation': ('title', 'event', 'year'),
+    'award': ('description', 'agency', 'year'),
+    'service': ('role', 'description'),
+    'session': ('role', 'event', 'year'),
+    'panel': ('agency', 'division', 'year'),
+    'journal_review': ('journal', 'year', 'date'),
+    'society': ('name',),
+    'degree': ('degree', 'major', 'school'),
+    'jobhistory': ('title', 'employer', 'start_date'),
+    'news': ('title', 'source', 'year'),
+}
+
+# attributes tried in order for an entry's label in reports
+LABELS = ('key', 'title', 'description', 'name', 'journal', 'agency',
+    'role', 'degree')
+
+def _plain (value) : # {{{1
+    'value as something json.dumps writes the same way every time.'
+    if value is None or isinstance(value, (str, int, float, bool)) :
+        return value
+    if isinstance(value, (list, tuple)) :
+        return [_plain(x) for x in value]
+    if isinstance(value, (set, frozenset)) :
+        return sorted(repr(_plain(x)) for x in value)
+    if isinstance(value, dict) :
+        return {str(k): _plain(v) for (k, v) in value.items()}
+    if isinstance(value, (datetime.date, datetime.datetime)) :
+        return value.isoformat()
+    if hasattr(value, '__dict__') :
+        return [type(value).__name__, {k: _plain(v) for (k, v) in \
+            vars(value).items() if not k.startswith('_')}]
+    return repr(value)
+
+def _hash (value) : # {{{1
+    return hashlib.sha1(json.dumps(_plain(value), sort_keys = True,
+        ensure_ascii = False).encode()).hexdigest()[:20]
+
+def _normal (value) : # {{{1
+    'value with case and spacing of strings evened out.'
+    if isinstance(value, str) :
+        return ' '.join(value.lower().split())
+    return value
+
+def content (item) : # {{{1
+    'The hash of what item says, less its VOLATILE attributes.'
+    if not hasattr(item, '__dict__') :
+        return _hash(item)
+    return _hash([type(item).__name__, {k: v for (k, v) in \
+        vars(item).items() if not VOLATILE.match(k)}])
+
+def aliases (name, item) : # {{{1
+
+    '''The hashes of what identifies item in the collection name, best
+       first: its key, its DOI, and its IDENTITY attributes (if any of them
+       that are strings are given; else its content).'''
+
+    found = []
+    for attribute in ('key', 'doi') :
+        value = getattr(item, attribute, None)
+        if isinstance(value, str) and value.strip() != '' :
+            found.append(_hash([attribute, _normal(value)]))
+    if name not in IDENTITY :
+        return found + [content(item)]
+    values = [_normal(getattr(item, x, None)) for x in IDENTITY[name]]
+    if any(isinstance(x, str) and x != '' for x in values) or \
+            len(found) == 0 :
+        found.append(_hash([type(item).__name__] + values))
+    return found
+
+def identity (name, item) : # {{{1
+    'The hash of what identifies item in the collection name (see aliases).'
+    return aliases(name, item)[0]
+
+def identities (name, items) : # {{{1
+    '''The identities of items, entries of the collection name, in order;
+       the second (third, ...) entry with the same identity gets "#2" ("#3",
+       ...) after it, so that each is different.'''
+    found = []
+    seen = {}
+    for item in items :
+        key = identity(name, item)
+        n = seen[key] = seen.get(key, 0) + 1
+        found.append(key if n == 1 else key + '#' + str(n))
+    return found
+
+def label (item) : # {{{1
+    'A short description of item, for reports.'
+    for attribute in LABELS :
+        value = getattr(item, attribute, None)
+        if isinstance(value, str) and value.strip() != '' :
+            return value
+    if getattr(item, 'last', None) is not None :
+        return str(getattr(item, 'first', '')) + ' ' + item.last
+    return type(item).__name__
+
+##############################################################################
+
+class Snapshot : # {{{1
+
+    '''The identity and content hashes (and labels) of every entry of every
+       collection of a CV at one time: collections maps the name of each
+       collection to a dictionary of identities to (content, label,
+       aliases).'''
+
+    def __init__ (self, collections = None) : # {{{2
+        self.collections = collections or {}
+
+    @classmethod
+    def of (cls, data) : # {{{2
+        'The snapshot of the CV_data object data now.'
+        snapshot = cls()
+        for (name, value) in vars(data).items() :
+            if isinstance(value, list) and not name.startswith('_') :
+                snapshot.collections[name] = cls._entries(name, value)
+        if data.professor is not None :
+            snapshot.collections['professor'] = cls._entries('professor',
+                [data.professor])
+        return snapshot
+
+    @staticmethod
+    def _entries (name, items) : # {{{2
+        return dict(zip(identities(name, items), ((content(x), label(x),
+            aliases(name, x)) for x in items)))
+
+    def save (self, filename) : # {{{2
+        'Writes the snapshot to filename as JSON (gzipped if it ends in .gz).'
+        opener = gzip.open if filename.endswith('.gz') else open
+        with opener(filename, 'wt', encoding = 'utf-8') as jsonfile :
+            json.dump({'format': FORMAT, 'collections': {name: [[key] + \
+                list(value) for (key, value) in entries.items()] for \
+                (name, entries) in self.collections.items()}}, jsonfile,
+                ensure_ascii = False)
+
+    @classmethod
+    def load (cls, filename) : # {{{2
+        'Reads a snapshot written by save.'
+        opener = gzip.open if filename.endswith('.gz') else open
+        with opener(filename, 'rt', encoding = 'utf-8') as jsonfile :
+            saved = json.load(jsonfile)
+        if saved.get('format') not in (1, FORMAT) :
+            raise ValueError(filename + ' is not a snapshot this version ' +
+                'can read')
+        return cls({name: {x[0]: (x[1], x[2], x[3] if len(x) > 3 else
+            [x[0]]) for x in entries} for (name, entries) in \
+            saved['collections'].items()})
+
+    def diff (self, new) : # {{{2
+        'What changed from this snapshot to the snapshot new (a SnapshotDiff).'
+        return SnapshotDiff(self, new)
+
+##############################################################################
+
+def _match (before, after) : # {{{1
+
+    '''Dictionary of the identities of the entries in after (a collection
+       of a Snapshot) to those of the same entries in before: by identity,
+       or else by the first alias of theirs that an entry of before left
+       over has.'''
+
+    matched = {x: x for x in after.keys() & before.keys()}
+    taken = set(matched)
+    owners = {} # alias: the identities of the entries of before with it
+    for (key, value) in before.items() :
+        if key not in taken :
+            for alias in value[2] :
+                owners.setdefault(alias, []).append(key)
+    for (key, value) in after.items() :
+        if key in matched :
+            continue
+        for alias in value[2] :
+            found = [x for x in owners.get(alias, ()) if x not in taken]
+            if len(found) > 0 :
+                matched[key] = found[0]
+                taken.add(found[0])
+                break
+    return matched
+
+##############################################################################
+
+class SnapshotDiff : # {{{1
+
+    '''The differences between two snapshots: added, removed, and changed map
+       the name of each collection to the set of identities of its entries
+       that were added, removed, or changed between old and new.'''
+
+    def __init__ (self, old, new) : # {{{2
+        self.old = old
+        self.new = new
+        self.added = {}
+        self.removed = {}
+        self.changed = {}
+        for name in set(old.collections) | set(new.collections) :
+            before = old.collections.get(name, {})
+            after = new.collections.get(name, {})
+            matched = _match(before, after)
+            added = after.keys() - matched.keys()
+            removed = before.keys() - set(matched.values())
+            changed = set(x for (x, y) in matched.items() \
+                if after[x][0] != before[y][0])
+            for (found, value) in ((self.added, added),
+                    (self.removed, removed), (self.changed, changed)) :
+                if len(value) > 0 :
+                    found[name] = value
+
+    def __bool__ (self) : # {{{2
+        return any((self.added, self.removed, self.changed))
+
+    def new_or_changed (self, name) : # {{{2
+        'The identities of entries of the collection name added or changed.'
+        return self.added.get(name, set()) | self.changed.get(name, set())
+
+    def summary (self) : # {{{2
+        '''A dictionary mapping the name of each collection that changed to
+           (number added, number removed, number changed).'''
+        return {name: (len(self.added.get(name, ())),
+            len(self.removed.get(name, ())), len(self.changed.get(name, ())))
+            for name in set(self.added) | set(self.removed) |
+            set(self.changed)}
+
+    def report (self, file = sys.stdout) : # {{{2
+        'Prints what was added, removed, and changed in each collection.'
+        for name in sorted(self.summary()) :
+            print (name + ':', file = file)
+            for (heading, found, snapshot) in (('added', self.added,
+                    self.new), ('removed', self.removed, self.old),
+                    ('changed', self.changed, self.new)) :
+                labels = sorted(snapshot.collections[name][x][1] for x in \
+                    found.get(name, ()))
+                for text in labels :
+                    print ('  ' + heading + ':', text, file = file)
+
+# vim: foldmethod=marker
@@ -1,20 +1,217 @@
 import re
 import os
-import subprocess
 import sys
+import json
+import hashlib
+import subprocess
+from . import constants
+from . import figcache
+from .bibrender import write_bbl, bib_files
+from .htmlpreview import HTMLDocument
 
-def generate_pdf (filename, run_bibtex = True, run_once_only = False) : # {{{1
+# extension: what to write documents with that extension with, instead of
+# LaTeX (the writers still print LaTeX to it, and nothing is compiled)
+BACKENDS = {'.html': HTMLDocument, '.htm': HTMLDocument}
 
-    'Generates a PDF from the given LaTeX input file.'
+# filename: (hash of its source, {dependency: mtime}) as of its last build
+_built = {}
 
-    (stem, extension) = os.path.splitext (filename)
-    code = subprocess.Popen(['pdflatex','--interaction','batchmode',filename],
+def open_document (filename) : # {{{1
+    '''Opens the document filename for the writers: a LaTeX file, or an
+       output backend (see BACKENDS) if it has one of their extensions.'''
+    if not is_latex(filename) :
+        return BACKENDS[os.path.splitext(filename)[1].lower()](filename)
+    return open(filename, 'w')
+
+def is_latex (filename) : # {{{1
+    'False if the document filename is written by one of the BACKENDS.'
+    return os.path.splitext(filename)[1].lower() not in BACKENDS
+
+##############################################################################
+
+def read_preamble (filename) : # {{{1
+    '''Returns everything in filename before \\begin{document}, or None if
+       the document body has not begun.'''
+    preamble = []
+    with open(filename, 'r') as texfile :
+        for line in texfile :
+            if re.match(r'\s*\\begin{document}', line) :
+                return ''.join(preamble)
+            preamble.append(line)
+    return None
+
+##############################################################################
+
+def preamble_format (filename) : # {{{1
+
+    '''Returns the name of a precompiled pdflatex format holding the preamble
+       of filename (everything before the document body), building it in
+       constants.FORMAT_CACHE if it is not already there. Formats are named
+       by a hash of the preamble, so documents that share a preamble share a
+       format and a changed preamble gets a new one; a format is built again
+       if any file its preamble read (the document class, say) has changed
+       since (see _format_inputs). Returns None (and the document should be
+       compiled normally) if there is no cache or the format cannot be
+       built; building needs the mylatexformat package.'''
+
+    if constants.FORMAT_CACHE is None :
+        return None
+    preamble = read_preamble(filename)
+    if preamble is None :
+        return None
+    digest = hashlib.sha1(preamble.encode()).hexdigest()
+    fmt = 'CVpreamble-' + digest[:16]
+    stem = os.path.join(constants.FORMAT_CACHE, fmt)
+    if os.path.isfile(stem + '.fmt') :
+        try :
+            with open(stem + '.json', 'r') as jsonfile :
+                inputs = json.load(jsonfile)
+        except (OSError, ValueError) :
+            inputs = None
+        if inputs is not None and all(_mtime(x) == inputs[x] for x in \
+                inputs) :
+            return fmt
+    os.makedirs(constants.FORMAT_CACHE, exist_ok = True)
+    code = subprocess.Popen(['pdflatex', '-ini', '-interaction=batchmode',
+        '-recorder', '-jobname=' + fmt,
+        '-output-directory=' + constants.FORMAT_CACHE,
+        '&pdflatex', 'mylatexformat.ltx', filename],
         stdout=subprocess.DEVNULL).wait()
-    if code != 0 :
-        print ('Error running pdflatex on', filename, '(first time)',
+    if code != 0 or not os.path.isfile(stem + '.fmt') :
+        print ('WARNING: unable to precompile the preamble of', filename,
+            '(is mylatexformat installed?); see', stem + '.log',
             file = sys.stderr)
+        return None
+    with open(stem + '.json', 'w') as jsonfile :
+        json.dump(_format_inputs(stem + '.fls', filename), jsonfile)
+    return fmt
+
+def _format_inputs (fls, filename) : # {{{1
+    '''Dictionary of the files (but for the document filename) that the
+       run that wrote the .fls file fls read, to their modification times.'''
+    inputs = {}
+    try :
+        with open(fls, 'r', errors = 'replace') as recorded :
+            for line in recorded :
+                if line.startswith('INPUT ') :
+                    path = os.path.abspath(line[6:].rstrip('\n'))
+                    if path != os.path.abspath(filename) :
+                        inputs[path] = _mtime(path)
+    except FileNotFoundError :
+        pass
+    return inputs
+
+def _mtime (filename) : # {{{1
+    try :
+        return os.path.getmtime(filename)
+    except OSError :
+        return None
+
+##############################################################################
+
+def run_pdflatex (filename, which = '', fmt = None, draft = False) : # {{{1
+
+    '''Runs pdflatex once on filename, using the precompiled format fmt if
+       given and only writing the .aux (not the PDF) if draft is True. Exits
+       on error; which (e.g. "first time") is used in the error message.'''
+
+    command = ['pdflatex', '--interaction', 'batchmode', '-recorder']
+    env = None
+    if fmt is not None :
+        command.append('-fmt=' + fmt)
+        env = dict(os.environ,
+            TEXFORMATS = constants.FORMAT_CACHE + os.pathsep)
+    if draft :
+        command.append('-draftmode')
+    code = subprocess.Popen(command + [filename], stdout=subprocess.DEVNULL,
+        env = env).wait()
+    if code != 0 :
+        print ('Error running pdflatex on', filename,
+            '(' + which + ')' if which else '', file = sys.stderr)
         raise SystemExit (code)
-    if run_bibtex :
+
+##############################################################################
+
+def needs_rerun (logfile) : # {{{1
+    'True if the pdflatex log says labels or references are not yet right.'
+    try :
+        with open(logfile, 'r', errors = 'replace') as log :
+            return any(re.search(r'Rerun to get|Label\(s\) may have changed'
+                r'|There were undefined references', line) for line in log)
+    except FileNotFoundError :
+        return True
+
+##############################################################################
+
+def _source_hash (filename) : # {{{1
+    with open(filename, 'rb') as texfile :
+        return hashlib.sha1(texfile.read()).hexdigest()
+
+def dependencies (filename, depends = ()) : # {{{1
+
+    '''The files the last pdflatex run on filename read, besides the TeX
+       installation and its own auxiliary files (from the .fls file that
+       -recorder writes), along with its .bib files and depends.'''
+
+    (stem, extension) = os.path.splitext(filename)
+    here = os.getcwd()
+    files = set(bib_files(filename)) | set(depends)
+    try :
+        with open(stem + '.fls', 'r', errors = 'replace') as fls :
+            for line in fls :
+                if not line.startswith('INPUT ') :
+                    continue
+                path = os.path.normpath(line[6:].rstrip('\n'))
+                if os.path.isabs(path) and \
+                        os.path.commonpath([path, here]) != here :
+                    continue # part of the TeX installation
+                if os.path.splitext(path)[0] == os.path.normpath(stem) :
+                    continue
+                files.add(path)
+    except FileNotFoundError :
+        pass
+    return files
+
+def up_to_date (filename, depends = ()) : # {{{1
+
+    '''True if filename was built into a PDF in this session and neither
+       it nor anything it read (see dependencies) has changed since.'''
+
+    (stem, extension) = os.path.splitext(filename)
+    try :
+        (digest, mtimes) = _built[os.path.abspath(filename)]
+    except KeyError :
+        return False
+    if _source_hash(filename) != digest or not os.path.isfile(stem + '.pdf') :
+        return False
+    return all(_mtime(x) == mtimes[x] for x in set(depends) | set(mtimes))
+
+##############################################################################
+
+def generate_pdf (filename, run_bibtex = True, run_once_only = False,
+        depends = ()) : # {{{1
+
+    '''Generates a PDF from the given LaTeX input file. With
+       constants.NATIVE_BIBLIOGRAPHY, the .bbl is written before the first
+       pass (see bibrender) and pdflatex is only run again as long as the
+       log asks for it; otherwise bibtex runs after the first pass and
+       pdflatex twice more. depends lists files outside the LaTeX source
+       that the PDF is made from (see up_to_date). Returns False, without
+       running pdflatex, if the PDF is already up to date (or filename is
+       not LaTeX; see BACKENDS), and True otherwise.'''
+
+    (stem, extension) = os.path.splitext (filename)
+    if not is_latex (filename) :
+        return False
+    if not run_once_only and up_to_date (filename, depends) :
+        return False
+    _built.pop (os.path.abspath(filename), None)
+    fmt = preamble_format (filename)
+    native = run_bibtex and constants.NATIVE_BIBLIOGRAPHY \
+        and write_bbl (filename)
+    figcache.wait_for_figures ()
+    run_pdflatex (filename, 'first time', fmt)
+    if run_bibtex and not native :
         with open(stem + '.aux','r') as bibfile :
             if any(re.match(r'\\citation',line) for line in bibfile) :
                 bibtex = subprocess.Popen(['bibtex','-terse',stem + '.aux'],
@@ -23,19 +220,15 @@ def generate_pdf (filename, run_bibtex = True, run_once_only = False) : # {{{1
                 if code != 0 :
                     print ('WARNING: Error running bibtex on', stem + '.aux',
                         file = sys.stderr)
-    if not run_once_only :
-        code = subprocess.Popen(['pdflatex','--interaction','batchmode',
-            filename], stdout=subprocess.DEVNULL).wait()
-        if code != 0 :
-            print ('Error running pdflatex on', filename, '(second time)',
-                file = sys.stderr)
-            raise SystemExit (code)
-        code = subprocess.Popen(['pdflatex','--interaction','batchmode',
-            filename], stdout=subprocess.DEVNULL).wait()
-        if code != 0 :
-            print ('Error running pdflatex on', filename, '(third time)',
-                file = sys.stderr)
-            raise SystemExit (code)
+    if run_once_only :
+        return True
+    for which in ('second time', 'third time') :
+        if native and not needs_rerun (stem + '.log') :
+            break
+        run_pdflatex (filename, which, fmt)
+    _built[os.path.abspath(filename)] = (_source_hash (filename),
+        {x: _mtime (x) for x in dependencies (filename, depends)})
+    return True
 
 ##############################################################################
 
@@ -88,6 +88,12 @@ def datestring2monthyear (thedate) : # {{{1
 def remove_duplicates (values) : # {{{1
     return list(collections.OrderedDict.fromkeys(values))
 
+def strip_latex (text) : # {{{1
+    '''Removes simple LaTeX markup from text, for searching: commands with
+       one argument (\\emph{x} -> x) and math shifts ($).'''
+    text = re.sub(r'\\[a-zA-Z]+{([^}]+)}', r'\1', text)
+    return re.sub(r'\$', '', text)
+
 ##############################################################################
 
 def any_entries_match (list1, list2) : # {{{1
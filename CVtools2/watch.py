@@ -0,0 +1,165 @@
+'''Rebuilds the CV, dossier, etc. whenever their sources change.
+
+    python -m CVtools2.watch my-cv.py [arguments for my-cv.py]
+
+or watch_CV('my-cv.py') runs the input script, then waits for it, any .bib file
+or attached PDF a document was built from, or any other file given to change,
+and runs it again, until interrupted. The script runs in this process, so
+everything this package keeps in memory stays warm between runs: parsed .bib
+files and rendered references (bibrender), compiled figures (figcache) and
+preamble formats, and the Web of Science and Scopus lookups. What the script
+sets in constants and recent (set_AUTHOR, set_RECENT, set_POST_TENURE, and
+the like) is put back as it was before each run, so each run makes the same
+entries a fresh python would.
+
+Each run reports which collections of the CV_data (publications, grants, and
+so on) changed since the last. The writers then write every document as
+usual, which is fast; what is slow is pdflatex, and generate_pdf skips it for
+every document whose LaTeX source and inputs are the same as when it was last
+built (see tex2pdf.up_to_date). Editing a grant thus recompiles the documents
+that list grants and leaves the rest alone.'''
+
+import sys
+import copy
+import time
+import runpy
+import collections
+import traceback
+from . import tex2pdf
+from . import constants
+from . import recent
+from .data import CV_data
+
+SETTINGS = (constants, recent) # modules whose globals scripts set
+
+def _fingerprint (value, seen = None) : # {{{1
+
+    '''A hashable summary of value that is the same from run to run for
+       equal data (unlike repr, which gives addresses for objects).'''
+
+    if value is None or isinstance(value, (str, int, float, bool)) :
+        return value
+    if isinstance(value, (list, tuple)) :
+        return tuple(_fingerprint(x, seen) for x in value)
+    if isinstance(value, (set, frozenset)) :
+        return frozenset(_fingerprint(x, seen) for x in value)
+    if isinstance(value, dict) :
+        return tuple(sorted((str(k), _fingerprint(v, seen)) \
+            for (k, v) in value.items()))
+    if hasattr(value, '__dict__') :
+        seen = set() if seen is None else seen
+        if id(value) in seen :
+            return value.__class__.__name__
+        seen = seen | {id(value)}
+        return (value.__class__.__name__,) + _fingerprint(vars(value), seen)
+    return repr(value)
+
+def snapshot (data) : # {{{1
+
+    '''Fingerprints of a CV_data object: for each of its collections (the
+       lists it keeps, such as publication or grant, and professor), a
+       Counter of fingerprints of its items.'''
+
+    fingerprints = {}
+    for (name, value) in vars(data).items() :
+        if isinstance(value, list) :
+            fingerprints[name] = collections.Counter(_fingerprint(x) \
+                for x in value)
+    fingerprints['professor'] = collections.Counter([_fingerprint(
+        data.professor)])
+    return fingerprints
+
+def changes (old, new) : # {{{1
+
+    '''Compares two snapshots. Returns a dictionary mapping the name of each
+       collection that changed to (number added, number removed); an item
+       that was edited counts as one of each.'''
+
+    changed = {}
+    for name in set(old) | set(new) :
+        before = old.get(name, collections.Counter())
+        after = new.get(name, collections.Counter())
+        if before != after :
+            changed[name] = (sum((after - before).values()),
+                sum((before - after).values()))
+    return changed
+
+##############################################################################
+
+def settings () : # {{{1
+    'The globals (in capitals) of the modules in SETTINGS, by module.'
+    return {module: {name: copy.copy(value) for (name, value) in \
+        vars(module).items() if name.isupper()} for module in SETTINGS}
+
+def restore (saved) : # {{{1
+    'Puts back the globals saved by settings.'
+    for (module, values) in saved.items() :
+        for (name, value) in values.items() :
+            setattr(module, name, copy.copy(value))
+
+def _run (script, args, saved = None) : # {{{1
+    '''Runs script as __main__, with the globals saved (see settings) put
+       back first; returns its globals, or None if it failed.'''
+    if saved is not None :
+        restore(saved)
+    argv = sys.argv
+    sys.argv = [script] + list(args)
+    try :
+        return runpy.run_path(script, run_name = '__main__')
+    except (Exception, SystemExit) :
+        traceback.print_exc()
+        return None
+    finally :
+        sys.argv = argv
+
+def _sources (script, files) : # {{{1
+    'The files to watch and their modification times.'
+    sources = {script} | set(files)
+    for (digest, mtimes) in tex2pdf._built.values() :
+        sources |= set(mtimes)
+    return {x: tex2pdf._mtime(x) for x in sources}
+
+def watch_CV (script, files = (), interval = 0.5, args = ()) : # {{{1
+
+    '''Runs the input script (with arguments args), then runs it again each
+       time it or anything the documents it builds were made from changes,
+       as well as any of files, checking every interval seconds. Stops on
+       Ctrl-C.'''
+
+    previous = {}
+    saved = settings()
+    while True :
+        start = time.time()
+        namespace = _run(script, args, saved)
+        if namespace is not None :
+            current = {name: snapshot(value) for (name, value) in \
+                namespace.items() if isinstance(value, CV_data)}
+            for name in sorted(current) :
+                if name not in previous :
+                    continue
+                changed = changes(previous[name], current[name])
+                if len(changed) == 0 :
+                    print (name + ': no changes', file = sys.stderr)
+                for (collection, (added, removed)) in sorted(changed.items()) :
+                    print (name + '.' + collection + ': +' + str(added),
+                        '-' + str(removed), file = sys.stderr)
+            previous = current
+        print ('Done in', round(time.time() - start, 1), 'seconds; watching',
+            script, 'for changes', file = sys.stderr)
+        sources = _sources(script, files)
+        try :
+            while all(tex2pdf._mtime(x) == mtime for (x, mtime) in \
+                    sources.items()) :
+                time.sleep(interval)
+        except KeyboardInterrupt :
+            return
+        time.sleep(interval) # let the editor finish writing
+
+if __name__ == '__main__' :
+    if len(sys.argv) < 2 :
+        print ('usage: python -m CVtools2.watch script.py [arguments]',
+            file = sys.stderr)
+        raise SystemExit (2)
+    watch_CV (sys.argv[1], args = sys.argv[2:])
+
+# vim: foldmethod=marker
@@ -0,0 +1,113 @@
+'''In-process HTTP helpers for the citation databases.
+
+All requests go through a single requests.Session, so connections to the
+same host are kept alive and reused rather than re-established for every
+DOI. Replies are decoded straight from the socket rather than buffered.'''
+
+import json
+import requests
+import requests.adapters
+from concurrent.futures import ThreadPoolExecutor
+from . import constants
+
+SCOPUS_SEARCH_URL = 'https://api.elsevier.com/content/search/scopus'
+
+_session = None
+
+def session () : # {{{1
+
+    'Returns the shared, connection-pooling HTTP session.'
+
+    global _session
+    if _session is None :
+        _session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections = constants.MAX_HTTP_THREADS,
+            pool_maxsize = constants.MAX_HTTP_THREADS)
+        _session.mount('http://', adapter)
+        _session.mount('https://', adapter)
+    return _session
+
+##############################################################################
+
+def get_json (url, params = None, headers = None) : # {{{1
+
+    'Fetches url and decodes the JSON reply as it streams in.'
+
+    with session().get(url, params = params, headers = headers,
+            stream = True) as reply :
+        reply.raw.decode_content = True
+        return json.load(reply.raw)
+
+##############################################################################
+
+def _scopus_headers () : # {{{1
+    return {'Accept': 'application/json',
+        'X-ELS-APIKey': constants.SCOPUS_API_KEY}
+
+##############################################################################
+
+def scopus_page (query, start = 0, field = None) : # {{{1
+
+    '''Returns the "search-results" block of a single page of a Scopus
+       search. Raises KeyError if Scopus did not send one back.'''
+
+    params = {'query': query, 'start': start,
+        'count': constants.MAX_SCOPUS_QUERIES}
+    if field is not None :
+        params['field'] = field
+    output = get_json(SCOPUS_SEARCH_URL, params = params,
+        headers = _scopus_headers())
+    if 'search-results' not in output :
+        raise KeyError('search invalid for query ' + query + '; output is '
+            + str(output))
+    return output['search-results']
+
+##############################################################################
+
+def _entries (results) : # {{{1
+    # Scopus reports an empty search as a single entry holding "error"
+    for entry in results.get('entry', []) :
+        if 'error' not in entry :
+            yield entry
+
+##############################################################################
+
+def scopus_search (query, field = None) : # {{{1
+
+    '''Generator over every entry matching a Scopus search, requesting the
+       next page only once the previous one has been used up.'''
+
+    start = 0
+    while True :
+        results = scopus_page(query, start, field)
+        yield from _entries(results)
+        total = int(results['opensearch:totalResults'])
+        start += constants.MAX_SCOPUS_QUERIES
+        if start >= total :
+            break
+
+##############################################################################
+
+def scopus_search_concurrent (query, field = None) : # {{{1
+
+    '''Like scopus_search, but once the first page has given the total
+       number of results, the remaining pages are all requested at once
+       (up to constants.MAX_HTTP_THREADS at a time). Entries are still
+       returned in page order.'''
+
+    results = scopus_page(query, 0, field)
+    yield from _entries(results)
+    total = int(results['opensearch:totalResults'])
+    offsets = range(constants.MAX_SCOPUS_QUERIES, total,
+        constants.MAX_SCOPUS_QUERIES)
+    if len(offsets) == 0 :
+        return
+    with ThreadPoolExecutor(max_workers = constants.MAX_HTTP_THREADS) \
+            as pool :
+        pages = pool.map(lambda start : scopus_page(query, start, field),
+            offsets)
+        for results in pages :
+            yield from _entries(results)
+
+# vim: foldmethod=marker
@@ -0,0 +1,28 @@
+from CVtools2.affiliations import AffiliationIndex, organization
+from CVtools2.employee import Collaborator
+
+def test_organization () :
+    assert organization('Dept. of Physics, Univ. of Somewhere, City, ' +
+        'ST 12345, USA') == 'Univ. of Somewhere'
+
+def test_resolve () :
+    index = AffiliationIndex()
+    index.add([('John T. Smith', 'Univ. of Somewhere', 2019),
+        ('J. T. Smith', 'Somewhere Institute', 2021),
+        ('James Smith', 'Elsewhere College', 2022),
+        ('Daisy Duck', 'Pond University', 2020)])
+    assert index.resolve('John Smith') == 'Univ. of Somewhere'
+    assert index.resolve('J. T. Smith') == 'Somewhere Institute'
+    assert index.resolve('James Smith') == 'Elsewhere College'
+    assert index.resolve('J. Smith') is None # John or James
+    assert index.resolve('D. Duck') == 'Pond University'
+    assert index.resolve('D. F. Duck') is None
+    assert index.resolve('Mickey Mouse') is None
+
+def test_fill () :
+    index = AffiliationIndex()
+    index.add([('Pluto Dog', 'Disney', 2020)])
+    people = [Collaborator('Pluto', 'Dog', 'UNKNOWN/FIXME'),
+        Collaborator('Goofy', 'Dog', None)]
+    assert index.fill(people) == 1
+    assert [x.institution for x in people] == ['Disney', None]
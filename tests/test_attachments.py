@@ -0,0 +1,35 @@
+import io
+import pytest
+from CVtools2.attachments import Attachment, AttachmentManifest, PDFAssembly
+
+pypdf = pytest.importorskip('pypdf')
+
+def _pdf (filename, widths) :
+    'A PDF with a blank page of each width (so the pages can be told apart).'
+    writer = pypdf.PdfWriter()
+    for width in widths :
+        writer.add_blank_page(width = width, height = 792)
+    with open(filename, 'wb') as pdf :
+        writer.write(pdf)
+    return str(filename)
+
+def test_assemble_order (tmp_path) :
+    'Attachments placed at the same page come out in the order placed.'
+    document = _pdf(tmp_path / 'dossier.pdf', [600, 601, 602])
+    reviews = [Attachment(_pdf(tmp_path / ('review%d.pdf' % i), [700 + i]),
+        'Review ' + str(i)) for i in range(1, 4)]
+    other = Attachment(_pdf(tmp_path / 'letter.pdf', [800]), 'Letter')
+    assembly = PDFAssembly(AttachmentManifest(), external = True)
+    texfile = io.StringIO()
+    for attachment in reviews + [other] :
+        assembly.include(texfile, attachment)
+    # three reviews after the first page (numbered 2-4), the letter after
+    # the second (numbered 6)
+    with open(tmp_path / 'dossier.att', 'w') as places :
+        places.write('0 1 2\n1 1 3\n2 1 4\n3 2 6\n')
+    assert assembly.assemble(document) == 4
+    pages = pypdf.PdfReader(document).pages
+    assert [int(x.mediabox.width) for x in pages] == [600, 701, 702, 703,
+        601, 800, 602]
+    labels = list(pypdf.PdfReader(document).page_labels)
+    assert labels[1:4] == ['2', '3', '4'] and labels[5] == '6'
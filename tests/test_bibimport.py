@@ -0,0 +1,36 @@
+import os
+from CVtools2 import constants, bibimport
+from CVtools2.data import CV_data
+
+BIB = '''
+@article{Donald2018, author = {Duck, Donald F. and Mouse, Mickey},
+  title = {Quacking}, journal = {J. Waterfowl}, year = 2018}
+@article{Initials2019, author = {Duck, D. and Goofy, G.},
+  title = {Ponds}, journal = {J. Waterfowl}, year = 2019}
+@article{Daisy2020, author = {Duck, Daisy and Duck, Dewey},
+  title = {Not his}, journal = {J. Waterfowl}, year = 2020}
+'''
+
+def test_only_author (tmp_path, monkeypatch) :
+    monkeypatch.setattr(constants, 'AUTHOR', 'D.~F. Duck')
+    (tmp_path / 'group.bib').write_text(BIB)
+    cv = CV_data()
+    assert cv.import_bib(str(tmp_path / 'group.bib')) == 2
+    assert [x.key for x in cv.publication] == ['Donald2018', 'Initials2019']
+    assert cv.publication[0].author == ['D.~F. Duck', 'M.~Mouse']
+
+def test_cache_keeps_last_reading (tmp_path) :
+    bib = tmp_path / 'group.bib'
+    for year in range(2000, 2010) :
+        bib.write_text(BIB.replace('2018', str(year)))
+        assert len(list(bibimport.read_entries(str(bib)))) == 3
+    assert len(bibimport._chunk_cache[os.path.abspath(str(bib))]) == \
+        len(list(bibimport._chunks(str(bib))))
+
+def test_bib_entries (tmp_path) :
+    (tmp_path / 'group.bib').write_text(BIB)
+    found = bibimport.bib_entries({'daisy2020', 'nobody'},
+        str(tmp_path / 'group'))
+    assert list(found) == ['daisy2020']
+    assert found['daisy2020'].get('title') == 'Not his'
+    assert bibimport.bib_entries({'daisy2020'}, None) == {}
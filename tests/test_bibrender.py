@@ -0,0 +1,45 @@
+import os
+import shutil
+import subprocess
+import pytest
+from CVtools2.bibrender import read_bib, render_bbl, bst_macros, \
+    format_name, split_names, name_parts
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TOP = os.path.dirname(HERE)
+BIB = os.path.join(HERE, 'data', 'ducks.bib')
+KEYS = ('CV', 'Duck2018', 'Duck2021', 'Duck2019', 'Duck2020')
+STYLES = ('CV', 'CV-short', 'CV-with-doi')
+
+def _render (style) :
+    (entries, preamble) = read_bib(BIB, bst_macros(os.path.join(TOP,
+        style + '.bst')))
+    return render_bbl([entries[x.lower()] for x in KEYS], style, preamble)
+
+def test_names () :
+    assert split_names('Duck, Donald F. and Daisy Duck') == \
+        ['Duck, Donald F.', 'Daisy Duck']
+    assert format_name('Duck, Donald F.') == 'D.~F. Duck'
+    assert format_name('Ludwig van Beethoven') == 'L.~van Beethoven'
+    assert name_parts('van der Berg, Jr, Anna') == (['Anna'],
+        ['van', 'der'], ['Berg'], ['Jr'])
+
+@pytest.mark.parametrize('style', STYLES)
+def test_golden (style) :
+    'The .bbl matches one checked against the .bst file by hand.'
+    with open(os.path.join(HERE, 'data', 'ducks-' + style + '.bbl')) as bbl :
+        assert _render(style) == bbl.read()
+
+@pytest.mark.skipif(shutil.which('bibtex') is None, reason = 'no bibtex')
+@pytest.mark.parametrize('style', STYLES)
+def test_bibtex (style, tmp_path) :
+    'The .bbl is the one bibtex writes.'
+    shutil.copy(BIB, tmp_path / 'ducks.bib')
+    shutil.copy(os.path.join(TOP, style + '.bst'), tmp_path)
+    with open(tmp_path / 'test.aux', 'w') as aux :
+        for key in KEYS :
+            aux.write('\\citation{' + key + '}\n')
+        aux.write('\\bibstyle{' + style + '}\n\\bibdata{ducks}\n')
+    subprocess.run(['bibtex', 'test'], cwd = tmp_path, check = True,
+        stdout = subprocess.DEVNULL)
+    assert _render(style) == (tmp_path / 'test.bbl').read_text()
@@ -0,0 +1,54 @@
+from CVtools2 import browserpool
+from CVtools2.browserpool import BrowserPool, FakeDriver, FakeElement
+
+def _pool (size = 2, max_pages = 3) :
+    made = []
+    def factory () :
+        made.append(FakeDriver())
+        return made[-1]
+    return (BrowserPool(size, max_pages, factory), made)
+
+def test_reuse_and_recycle () :
+    (pool, made) = _pool()
+    for i in range(3) :
+        with pool.browser() as browser :
+            browser.get('https://example.com/' + str(i))
+    assert len(made) == 1 and made[0].closed # worn out after 3 pages
+    with pool.browser() as browser :
+        browser.get('https://example.com/3')
+    assert len(made) == 2 and not made[1].closed
+    assert made[1].history == ['https://example.com/3']
+
+def test_replace_quit_browser () :
+    (pool, made) = _pool()
+    with pool.browser() as browser :
+        browser.get('https://example.com/')
+    made[0].quit() # e.g. Firefox crashed while idle
+    with pool.browser() as browser :
+        assert browser.driver is made[1]
+    assert pool._started == 1
+
+def test_size_and_close () :
+    (pool, made) = _pool(size = 2)
+    (a, b) = (pool.checkout(), pool.checkout())
+    assert a.driver is not b.driver
+    pool.release(a)
+    assert pool.checkout() is a # idle browsers are reused first
+    pool.release(a)
+    pool.release(b)
+    pool.close()
+    assert all(x.closed for x in made) and pool._started == 0
+
+def test_shared_pool () :
+    pool = BrowserPool(1, 10, lambda : FakeDriver({'https://x/':
+        {'h3': [FakeElement('Quacking', href='https://x/1')]}}))
+    browserpool.set_browser_pool(pool)
+    try :
+        with browserpool.shared_pool().browser() as browser :
+            browser.get('https://x/')
+            found = browser.find_elements_by_tag_name('h3')
+        assert [(x.text, x.get_attribute('href')) for x in found] == \
+            [('Quacking', 'https://x/1')]
+    finally :
+        browserpool.set_browser_pool(None)
+    assert browser.driver.closed # set_browser_pool closed the old one
@@ -0,0 +1,60 @@
+import os
+import time
+import pytest
+from CVtools2 import constants, citejournal, tex2pdf
+from CVtools2.data import CV_data
+from CVtools2.publication import JournalArticle
+
+@pytest.fixture
+def journal (tmp_path, monkeypatch) :
+    monkeypatch.setattr(constants, 'AUTHOR', 'D.~F. Duck')
+    monkeypatch.setattr(constants, 'CITATION_JOURNAL',
+        str(tmp_path / 'citations.jsonl'))
+    monkeypatch.setattr(tex2pdf, 'generate_pdf', lambda filename : None)
+    return constants.CITATION_JOURNAL
+
+def _cited (pub, ncites, years) :
+    (old_ncites, old_years) = (pub.ncites_scopus, pub.cite_years_scopus)
+    pub.ncites_scopus = ncites
+    pub.cite_years_scopus = years
+    citejournal.record(pub, 'scopus', old_ncites, old_years)
+
+def test_record_and_replay (journal) :
+    pub = JournalArticle(key='Duck2018', year=2018, doi='10.1000/duck')
+    _cited(pub, 2, [2019, 2020])
+    _cited(pub, 2, [2019, 2020]) # nothing changed
+    _cited(pub, 3, [2019, 2020, 2020])
+    found = list(citejournal.entries())
+    assert len(found) == 2
+    assert found[1]['years'] == {'2020': [1, 2]}
+    cv = CV_data()
+    cv.append(JournalArticle(key=None, year=2018, doi='10.1000/DUCK'))
+    assert citejournal.replay(cv) == cv.publication
+    assert cv.publication[0].ncites_scopus == 3
+    assert cv.publication[0].cite_years_scopus == [2020, 2020, 2019]
+    assert citejournal.replay(cv) == []
+
+def test_rerender (journal, tmp_path) :
+    cv = CV_data()
+    cv.append(JournalArticle(key='Duck2018', year=2018))
+    cv.append(JournalArticle(key='Duck2019', year=2019))
+    filename = str(tmp_path / 'CV.tex')
+    with open(filename, 'w') as texfile :
+        print ('top', file = texfile)
+        for pub in cv.publication :
+            pub.write_citations(texfile)
+        print ('bottom', file = texfile)
+    old = os.path.getmtime(filename) - 10
+    os.utime(filename, (old, old))
+    assert not citejournal.rerender(cv, filename)
+    cv.publication[1].key = 'Duck2019a' # its section is now stale
+    for pub in cv.publication :
+        _cited(pub, 5, [2020] * 5)
+    (pub.ncites_scopus, pub.cite_years_scopus) = (0, [])
+    cv.publication[0].ncites_scopus = 0
+    assert citejournal.rerender(cv, filename)
+    with open(filename) as f :
+        text = f.read()
+    assert text.startswith('top\n') and text.endswith('bottom\n')
+    assert text.count('[Cited') == 1 and 'Duck2019' in text
+    assert not os.path.exists(filename + '.tmp')
@@ -0,0 +1,42 @@
+import datetime
+import pytest
+from CVtools2 import constants
+from CVtools2.coa import coa_rows, HEADINGS
+from CVtools2.data import CV_data
+from CVtools2.professor import Professor
+from CVtools2.employee import DoctoralStudent, Collaborator
+from CVtools2.publication import JournalArticle
+
+@pytest.fixture
+def cv (monkeypatch) :
+    monkeypatch.setattr(constants, 'AUTHOR', 'D.~F. Duck')
+    monkeypatch.setattr(constants, 'AFFILIATIONS', None)
+    year = datetime.date.today().year
+    cv = CV_data()
+    cv.append(Professor('Donald F. Duck', 'Ph.D.', 'Professor', 'Ponds',
+        'Duckburg University', '1', 'Duckburg', 'CA', '00000', '555', 'd@x'))
+    cv.append(DoctoralStudent(first='Mickey', last='Mouse', major='Ponds',
+        start_date='2015-09-01', graduation='2020-05-15',
+        current=False))
+    cv.append(Collaborator('Pluto', 'Dog', 'Disney', year=year))
+    cv.extend([JournalArticle(key='Duck1', year=year,
+            author=['D.~F. Duck', 'Daisy Duck', 'Minnie Mouse', 'G. Goofy']),
+        JournalArticle(key='Duck2', year=year - 1,
+            author=['Donald F. Duck', 'George Goofy', 'M. Mouse'])])
+    return cv
+
+def test_coa_rows (cv) :
+    rows = list(coa_rows(cv))
+    year = str(datetime.date.today().year)
+    width = None
+    for row in rows :
+        if row in HEADINGS.values() :
+            width = len(row)
+        assert len(row) == width
+    assert rows[rows.index(HEADINGS[3]) + 1][:3] == ('', 'T:', 'Mouse, Mickey')
+    table4 = rows[rows.index(HEADINGS[4]) + 1:]
+    assert [x[1:3] for x in table4] == [('C:', 'Dog, Pluto'),
+        ('A:', 'Duck, Daisy'), ('A:', 'Goofy, George'), ('A:', 'Mouse, M.'),
+        ('A:', 'Mouse, Minnie')]
+    assert table4[0][2:] == ('Dog, Pluto', 'Disney', '', year)
+    assert table4[2][-1] == year
@@ -0,0 +1,56 @@
+import pytest
+from CVtools2 import columnar
+from CVtools2.data import CV_data
+from CVtools2.publication import JournalArticle
+
+def _cv () :
+    cv = CV_data()
+    cv.extend([JournalArticle(key='Duck2018', year=2018, title='Ponds',
+            author='Duck, Donald F. and Mouse, Mickey', ncites_scopus=3),
+        JournalArticle(key='Duck2019', year=2019, title='More Ponds',
+            author='Duck, Donald F.', ncites_scopus=5),
+        JournalArticle(key='Duck2021', year=2021, title='Lakes',
+            author='Duck, Daisy', peer_reviewed=False),
+        JournalArticle(key='Duck2020', year=2020, title='Rivers',
+            author='Duck, Donald F.', ncites_scopus=1)])
+    return cv
+
+def _reports (cv) :
+    'Everything the tables of cv answer, in plain Python.'
+    pubs = columnar.columns(cv, faculty = 'Duck')['publication']
+    both = columnar.Table.concat([pubs, pubs.where('year', '<', 2020)])
+    grouped = both.group_by('year').aggregate(papers = ('title', 'count'),
+        citations = ('ncites', 'sum'), mean = ('ncites', 'mean'),
+        keys = ('key', 'count_distinct'))
+    return {'rows': list(pubs.rows()), 'names': pubs.names,
+        'recent': pubs.where('year', '>=', 2019).column('key'),
+        'in': pubs.where('key', 'in', ['Duck2018', 'Duck2020']).column(
+            'key'),
+        'contains': pubs.where('title', 'contains', 'Ponds').column('key'),
+        'sorted': pubs.sort_by('ncites', reverse = True).column('key'),
+        'select': list(pubs.select('key', 'year').rows()),
+        'grouped': sorted(grouped.rows(), key = lambda x: x['year']),
+        'total': list(both.aggregate(n = ('key', 'count'),
+            most = ('ncites', 'max'), least = ('year', 'min')).rows())}
+
+def test_fallback (monkeypatch) :
+    monkeypatch.setattr(columnar, '_pyarrow', lambda : None)
+    reports = _reports(_cv())
+    assert reports['names'][:2] == ['faculty', 'kind']
+    assert reports['rows'][0]['faculty'] == 'Duck'
+    assert reports['rows'][0]['author'] == [
+        'Duck, Donald F. and Mouse, Mickey']
+    assert reports['recent'] == ['Duck2019', 'Duck2021', 'Duck2020']
+    assert reports['in'] == ['Duck2018', 'Duck2020']
+    assert reports['contains'] == ['Duck2018', 'Duck2019']
+    assert reports['sorted'] == ['Duck2019', 'Duck2018', 'Duck2020',
+        'Duck2021']
+    assert reports['grouped'][0] == {'year': 2018, 'papers': 2,
+        'citations': 6, 'mean': 3.0, 'keys': 1}
+    assert reports['total'] == [{'n': 6, 'most': 5, 'least': 2018}]
+
+def test_arrow_matches_fallback (monkeypatch) :
+    pytest.importorskip('pyarrow')
+    arrow = _reports(_cv())
+    monkeypatch.setattr(columnar, '_pyarrow', lambda : None)
+    assert arrow == _reports(_cv())
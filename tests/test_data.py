@@ -0,0 +1,28 @@
+import pytest
+from CVtools2 import constants
+from CVtools2.data import CV_data
+from CVtools2.publication import JournalArticle
+
+@pytest.fixture
+def cv (monkeypatch) :
+    monkeypatch.setattr(constants, 'AUTHOR', 'D.~F. Duck')
+    return CV_data()
+
+def test_lookup_after_edit (cv) :
+    cv.append(JournalArticle(key='Duck2018', year=2018, doi='10.1000/a'))
+    assert len(cv.lookup('publication', 'doi', '10.1000/A')) == 1
+    cv.publication[0].doi = '10.1000/b'
+    cv.edited('publication', cv.publication)
+    assert cv.lookup('publication', 'doi', '10.1000/a') == []
+    assert cv.lookup('publication', 'doi', '10.1000/b') == cv.publication
+
+def test_listeners (cv) :
+    heard = []
+    cv.add_listener(lambda name, entries: heard.append((name, len(entries))))
+    cv.extend([JournalArticle(key='Duck2018', year=2018),
+        JournalArticle(key='Duck2019', year=2019)])
+    cv.edited('publication')
+    assert heard == [('publication', 2), ('publication', 2)]
+    index = cv.person_index()
+    cv.edited('publication')
+    assert cv.person_index() is not index
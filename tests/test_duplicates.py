@@ -0,0 +1,48 @@
+import os
+from CVtools2 import constants
+from CVtools2.data import CV_data
+from CVtools2.duplicates import find_duplicates
+from CVtools2.publication import Book, JournalArticle
+
+BIB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data',
+    'ducks.bib')
+
+def test_each_pair_once () :
+    pubs = [Book(key='Duck2020', year=2020, doi='10.1000/ponds'),
+        JournalArticle(title='Nephews', year=2021),
+        Book(title='A book of ponds', year=2020, author='D.~F. Duck',
+            doi='https://doi.org/10.1000/PONDS')]
+    found = find_duplicates(pubs, BIB)
+    assert [(x[0], x[1], x[3]) for x in found] == [(pubs[0], pubs[2], 'doi')]
+    pubs[2].doi = None
+    found = find_duplicates(pubs, BIB)
+    assert [(x[0], x[1], x[3]) for x in found] == \
+        [(pubs[0], pubs[2], 'title')]
+
+def test_title_only () :
+    article = lambda title, year = 2018, author = 'D.~F. Duck' : \
+        JournalArticle(title=title, year=year, author=[author, 'G. Goofy'])
+    pubs = [article('Quacking in ponds of the world, Part I: Theory'),
+        article('Quacking in ponds of the world, Part II: Theory'),
+        article('Erratum: Quacking in ponds of the world, Part I: Theory'),
+        article('Quacking in the ponds of the world, part I: theory', 2019,
+            'Duck, Donald'),
+        article('Quacking in ponds of the world, Part I: Theory', 2015),
+        article('Quacking in ponds of the world, Part I: Theory',
+            author='Mouse, Mickey')]
+    found = {(pubs.index(x[0]), pubs.index(x[1])): x[3] for x in
+        find_duplicates(pubs)}
+    assert found[(0, 3)] == 'title'
+    assert found[(0, 1)] == found[(0, 2)] == found[(0, 4)] == 'title only'
+    assert found[(0, 5)] == 'title' # Goofy is on both
+
+def test_purge_title_only (monkeypatch, capsys) :
+    monkeypatch.setattr(constants, 'AUTHOR', 'D.~F. Duck')
+    cv = CV_data()
+    cv.extend([JournalArticle(title='Quacking in ponds, Part I: Theory',
+            year=2018, author='D.~F. Duck'),
+        JournalArticle(title='Quacking in ponds, Part II: Theory',
+            year=2018, author='D.~F. Duck')])
+    assert cv.purge_duplicate_publications() == []
+    assert len(cv.publication) == 2
+    assert 'different papers' in capsys.readouterr().err
@@ -0,0 +1,77 @@
+import os
+import pytest
+from CVtools2 import constants, figcache
+
+PREAMBLE = '\\documentclass{article}\n\\usepackage{tikz}\n'
+PLOT = '\\begin{tikzpicture}\\draw (0,0) -- (1,1);\\end{tikzpicture}'
+
+class FakePdflatex :
+    'Stands in for pdflatex: writes the PDF unless the figure says FAIL.'
+    runs = []
+    def __init__ (self, command, **kwargs) :
+        tex = command[-1]
+        FakePdflatex.runs.append(os.path.basename(tex))
+        with open(tex) as texfile :
+            self.code = 1 if 'FAIL' in texfile.read() else 0
+        if self.code == 0 :
+            open(tex[:-len('.tex')] + '.pdf', 'w').close()
+    def wait (self) :
+        return self.code
+
+@pytest.fixture
+def cache (tmp_path, monkeypatch) :
+    monkeypatch.setattr(constants, 'FIGURE_CACHE', str(tmp_path / 'figs'))
+    monkeypatch.setattr(figcache.subprocess, 'Popen', FakePdflatex)
+    FakePdflatex.runs = []
+    yield constants.FIGURE_CACHE
+    figcache.wait_for_figures()
+
+def test_hit_and_miss (cache) :
+    latex = figcache.figure(PLOT, PREAMBLE)
+    assert figcache.wait_for_figures() == 0
+    assert len(FakePdflatex.runs) == 1
+    pdf = os.path.join(cache, FakePdflatex.runs[0][:-len('.tex')] + '.pdf')
+    assert os.path.isfile(pdf) and pdf in latex and PLOT in latex
+    assert figcache.figure(PLOT, PREAMBLE) == latex # a hit
+    assert figcache.wait_for_figures() == 0
+    assert len(FakePdflatex.runs) == 1
+    other = PLOT.replace('(1,1)', '(2,1)') # a miss
+    assert figcache.figure(other, PREAMBLE) != latex
+    assert figcache.wait_for_figures() == 0
+    assert len(FakePdflatex.runs) == 2
+
+def test_invalidation (cache) :
+    latex = figcache.figure(PLOT, PREAMBLE)
+    figcache.wait_for_figures()
+    # the same plot in a document with another typeface
+    changed = figcache.figure(PLOT, PREAMBLE + '\\usepackage{lmodern}\n')
+    assert changed != latex
+    figcache.wait_for_figures()
+    assert len(FakePdflatex.runs) == 2
+    assert figcache.figure(PLOT, PREAMBLE, size = '\\small') != latex
+    figcache.wait_for_figures()
+    assert len(FakePdflatex.runs) == 3
+
+def test_failure (cache, capsys) :
+    latex = figcache.figure(PLOT.replace('--', '-- node {FAIL}'), PREAMBLE)
+    assert figcache.wait_for_figures() == 1
+    assert 'unable to compile figure' in capsys.readouterr().err
+    assert not any(x.endswith('.pdf') for x in os.listdir(cache))
+    assert 'FAIL' in latex # drawn in the document instead
+
+def test_cached_figure (cache, tmp_path) :
+    @figcache.cached_figure(size = '\\small')
+    def plot (data, texfile) :
+        print ('Before', file = texfile)
+        print (PLOT, file = texfile)
+        print ('After', file = texfile)
+    filename = str(tmp_path / 'CV.tex')
+    with open(filename, 'w') as texfile :
+        print (PREAMBLE + '\\begin{document}', file = texfile)
+        plot (None, texfile)
+    with open(filename) as texfile :
+        text = texfile.read()
+    assert 'Before' in text and 'After' in text
+    assert '\\includegraphics' in text
+    assert figcache.wait_for_figures() == 0
+    assert len(FakePdflatex.runs) == 1
@@ -0,0 +1,85 @@
+import random
+import datetime
+import pytest
+from CVtools2 import constants, makeCurrentPending
+from CVtools2.data import CV_data
+from CVtools2.grant import Grant
+from CVtools2.professor import Professor
+from CVtools2.grantportfolio import IntervalTree, GrantPortfolio, parse_date
+
+def test_interval_tree () :
+    rng = random.Random(2021)
+    for size in (0, 1, 2, 7, 50) :
+        intervals = []
+        for item in range(size) :
+            first = rng.randrange(100)
+            intervals.append((first, first + rng.randrange(30), item))
+        tree = IntervalTree(intervals)
+        assert len(tree) == size
+        for trial in range(200) :
+            first = rng.randrange(-10, 140)
+            last = first + rng.randrange(20)
+            expected = sorted(item for (start, end, item) in intervals
+                if start <= last and end >= first)
+            assert sorted(tree.overlapping(first, last)) == expected
+            assert sorted(tree.at(first)) == sorted(item for (start, end,
+                item) in intervals if start <= first <= end)
+
+def test_parse_date () :
+    assert parse_date('5/15/2019') == (datetime.date(2019, 5, 15),) * 2
+    assert parse_date('12/2019') == (datetime.date(2019, 12, 1),
+        datetime.date(2019, 12, 31))
+    assert parse_date(2019)[1] == datetime.date(2019, 12, 31)
+    with pytest.raises(ValueError) :
+        parse_date('soon')
+
+def _grants () :
+    return [Grant(title='Ponds', PI='D.~F. Duck', source='NSF',
+            start='7/2020', end='6/2022', amount='240,000', awarded=True,
+            months_summer=1),
+        Grant(title='Old Ponds', PI='D.~F. Duck', source='NSF',
+            start='2015', end='2017', amount=100000, awarded=True),
+        Grant(title='Lakes', PI='M. Mouse', coPI='D.~F. Duck', source='DOE',
+            start='1/2022', end='12/2023', amount=50000,
+            months_calendar=0.5),
+        Grant(title='Rivers', PI='D.~F. Duck', source='DOE', start='2021',
+            end='2022', amount=1, rejected=True),
+        Grant(title='Streams', PI='D.~F. Duck', source='NSF', start='soon',
+            end='later', amount=1)]
+
+def test_portfolio () :
+    portfolio = GrantPortfolio(_grants())
+    assert [x.title for x in portfolio.undated] == ['Streams']
+    when = datetime.date(2021, 3, 1)
+    assert [x.title for x in portfolio.active(when)] == ['Ponds']
+    assert [x.title for x in portfolio.pending(when)] == ['Lakes']
+    assert portfolio.effort(2022, pending = True) == \
+        {'calendar': 0.5, 'academic': 0, 'summer': 1}
+    assert portfolio.support(2021) == {'NSF': pytest.approx(120000)}
+
+def test_current_and_pending (tmp_path, monkeypatch) :
+    monkeypatch.setattr(constants, 'INVESTIGATOR', 'D.~F. Duck')
+    monkeypatch.setattr(makeCurrentPending, 'generate_pdf',
+        lambda filename : None)
+    cv = CV_data()
+    cv.append(Professor('Donald F. Duck', 'Ph.D.', 'Professor', 'Ponds',
+        'Pond U.', '1 Pond', 'Pond', 'MO', '65211', '555-1234',
+        'duck@pond.edu'))
+    cv.extend(_grants())
+    filename = str(tmp_path / 'CP.tex')
+    makeCurrentPending.write_Current_and_Pending(cv, filename,
+        when = '3/1/2021')
+    with open(filename) as f :
+        text = f.read()
+    assert r'\textbf{As of:} March 1, 2021' in text
+    (current, pending) = text.split(r'\section{Pending Support}')
+    assert 'Ponds' in current and 'Old Ponds' not in current
+    assert 'Lakes' in pending and 'Rivers' not in pending
+    assert r'Role & Co-PI \\' in pending
+    assert r'Total Award Amount & \$240,000 \\' in current
+    assert r'2022 & 0 & 0 & 1 & 0.5 \\' in text
+    assert r'2024 &' not in text
+    makeCurrentPending.write_Current_and_Pending(cv, filename,
+        when = '3/1/2021', show_pending = False)
+    with open(filename) as f :
+        assert 'Lakes' not in f.read()
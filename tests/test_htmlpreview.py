@@ -0,0 +1,52 @@
+import os
+import re
+import shutil
+import pytest
+from CVtools2 import constants, htmlpreview
+from CVtools2.data import CV_data
+from CVtools2.professor import Professor
+from CVtools2.publication import JournalArticle
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+@pytest.fixture
+def cv (tmp_path, monkeypatch) :
+    monkeypatch.setattr(constants, 'AUTHOR', 'D.~F. Duck')
+    monkeypatch.setattr(constants, 'IDENTIFY_MINIONS', False)
+    monkeypatch.setattr(constants, 'CITATION_JOURNAL',
+        str(tmp_path / 'citations.jsonl'))
+    shutil.copy(os.path.join(HERE, 'data', 'ducks.bib'), tmp_path)
+    cv = CV_data()
+    cv.professor = Professor('Donald F. Duck', 'Ph.D.', 'Professor',
+        'Ponds', 'Pond U.', '1 Pond', 'Pond', 'MO', '65211', '555-1234',
+        'duck@pond.edu')
+    cv.append(JournalArticle(key='Duck2018', year=2018, doi='10.1000/duck'))
+    return cv
+
+def test_translate () :
+    translator = htmlpreview.Translator()
+    assert translator.translate(r"Sch\"{o}n---\emph{et al.}, 1--2") == \
+        'Schön—<i>et al.</i>, 1–2'
+    assert translator.translate(r'{\bfseries A \& B} C') == \
+        '<b>A &amp; B</b> C'
+    assert translator.translate(r'\begin{tabular}{ll}a & b \\ c & d' +
+        r'\\\end{tabular}') == '\n<table>\n<tr><td>a</td><td>b</td></tr>' + \
+        '\n<tr><td>c</td><td>d</td></tr>\n</table>\n'
+    assert translator.translate(r'\vspace{1ex}\bibentry{Duck2018}') == \
+        '[Duck2018]'
+
+def test_preview (cv, tmp_path) :
+    filename = htmlpreview.preview(cv, str(tmp_path / 'cv.html'),
+        bibliography = 'ducks')
+    with open(filename, encoding = 'utf-8') as htmlfile :
+        page = htmlfile.read()
+    assert page.startswith('<!DOCTYPE html>')
+    body = page[page.index('<body>'):]
+    assert 'Donald F. Duck' in body
+    assert '<h2>Research</h2>' in body
+    entry = re.search(r'<li>(.*Quacking in 3D.*)', body).group(1)
+    assert '<b>D. F. Duck</b>' in entry
+    assert '<i>J. Waterfowl</i>' in entry and '100–110' in entry
+    # nothing is left of the LaTeX
+    assert '\\' not in body and '{' not in body and '}' not in body
+    assert not os.path.exists(tmp_path / 'cv.pdf')
@@ -0,0 +1,32 @@
+import os
+from CVtools2.journalmetrics import JournalMetrics
+from CVtools2.publication import JournalArticle
+
+CSV = '''Journal Data Filtered By: Selected JCR Year
+Full Journal Title,JCR Abbreviated Title,ISSN,Journal Impact Factor,Immediacy Index
+Journal of Waterfowl,J WATERFOWL,1234-5678,"2,345.6",0.5
+'''
+
+def test_load_without_year (tmp_path, capsys) :
+    (tmp_path / 'jcr.csv').write_text(CSV)
+    metrics = JournalMetrics()
+    assert metrics.load_csv(str(tmp_path / 'jcr.csv')) == 0
+    assert 'no year' in capsys.readouterr().err
+    assert metrics.load_csv(str(tmp_path / 'jcr.csv'), 2019) == 1
+    assert metrics.load_csv(str(tmp_path / 'jcr.csv'), 2019) == 0
+    assert metrics.get('J. Waterfowl', 2020) == (2345.6, 0.5)
+
+def test_fill_from_bib (tmp_path) :
+    (tmp_path / 'jcr-2019.csv').write_text(CSV)
+    (tmp_path / 'group.bib').write_text('@article{Duck2020, ' +
+        'journal = {J.\\ Waterfowl}, year = 2020}\n')
+    metrics = JournalMetrics()
+    metrics.load_csv(str(tmp_path / 'jcr-2019.csv'))
+    pubs = [JournalArticle(key='Duck2020', year=2020),
+        JournalArticle(journal='Journal of Waterfowl', year=2018),
+        JournalArticle(journal='Journal of Waterfowl', year=2019)]
+    assert metrics.fill(pubs) == 1
+    assert metrics.fill(pubs, bibliography =
+        os.path.join(str(tmp_path), 'group')) == 1
+    assert pubs[0].journal_IF == 2345.6 and pubs[0].journal is None
+    assert pubs[1].journal_IF is None
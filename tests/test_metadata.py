@@ -0,0 +1,59 @@
+import os
+import gzip
+import json
+import pytest
+from CVtools2 import constants
+from CVtools2.data import CV_data
+from CVtools2.metadata import MetadataIndex
+from CVtools2.publication import JournalArticle
+
+BIB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data',
+    'ducks.bib')
+CROSSREF = {'items': [
+    {'DOI': '10.1000/DUCK', 'title': ['Quacking in <i>3D</i>'],
+        'issued': {'date-parts': [[2018, 3]]}, 'is-referenced-by-count': 2,
+        'author': [{'given': 'Donald F.', 'family': 'Duck'},
+            {'given': 'Daisy', 'family': 'Duck'}]},
+    {'DOI': '10.1000/goofy', 'title': ['Citing ducks'],
+        'issued': {'date-parts': [[2020]]},
+        'reference': [{'DOI': '10.1000/duck'}]},
+    {'DOI': '10.1000/other', 'title': ['Unrelated'],
+        'issued': {'date-parts': [[2021]]}}]}
+
+@pytest.fixture
+def cv (monkeypatch) :
+    monkeypatch.setattr(constants, 'AUTHOR', 'D.~F. Duck')
+    monkeypatch.setattr(constants, 'CITATION_JOURNAL', None)
+    return CV_data()
+
+def test_compact_crossref (tmp_path) :
+    filename = str(tmp_path / '0.json.gz')
+    with gzip.open(filename, 'wt') as f :
+        f.write(json.dumps(CROSSREF, separators = (',', ':')))
+    pub = JournalArticle(key='Duck2018', year=2018, doi='10.1000/duck')
+    index = MetadataIndex()
+    assert index.load(filename, [pub]) == 2 # the work and its citation
+    assert index.load(filename, [pub]) == 0 # read already
+    assert index.fill([pub]) == [pub]
+    assert pub.author == ['D.~F. Duck', 'D.~Duck']
+    assert (pub.ncites_scopus, pub.cite_years_scopus) == (1, [2020])
+
+def test_unknown_dump (tmp_path, capsys) :
+    (tmp_path / 'odd.jsonl').write_text('{"what": "10.1000/duck"}\n')
+    pub = JournalArticle(key='Duck2018', year=2018, doi='10.1000/duck')
+    index = MetadataIndex()
+    for i in range(2) : # not marked as read
+        assert index.load(str(tmp_path / 'odd.jsonl'), [pub]) == 0
+        assert 'has a DOI' in capsys.readouterr().err
+
+def test_backfill_from_bib (tmp_path, cv) :
+    (tmp_path / 'works.jsonl').write_text('\n'.join(json.dumps(x) for x in
+        CROSSREF['items']) + '\n')
+    cv.append(JournalArticle(key='Duck2018', year=2018))
+    assert cv.backfill_metadata(filenames = [str(tmp_path / 'works.jsonl')]) \
+        == 0
+    index = MetadataIndex()
+    assert cv.backfill_metadata(index, [str(tmp_path / 'works.jsonl')],
+        bibliography = BIB) == 1
+    assert cv.publication[0].doi == '10.1000/duck'
+    assert cv.publication[0].ncites_scopus == 1
@@ -0,0 +1,47 @@
+import pytest
+from CVtools2 import constants, recent
+from CVtools2.data import CV_data
+from CVtools2.job import Job
+from CVtools2.publication import JournalArticle
+from CVtools2.milestones import Milestones, to_date
+
+@pytest.fixture
+def cv (monkeypatch) :
+    monkeypatch.setattr(constants, 'AUTHOR', 'D.~F. Duck')
+    monkeypatch.setattr(constants, 'SCHOOL', 'Duckburg University')
+    for name in ('POST_APPOINTMENT', 'POST_TENURE') :
+        monkeypatch.setattr(recent, name, False)
+    monkeypatch.setattr(recent, 'PERIODS_SET', set())
+    return CV_data()
+
+def _job (start, title) :
+    return Job(start, title, 'Duckburg University', 'Duckburg')
+
+def test_to_date () :
+    assert to_date('5/2019') == to_date('5/1/2019')
+    assert to_date(2019) == to_date('7/1/2019')
+    assert to_date('2019', 'June 5--7') == to_date('6/2019')
+
+def test_periods (cv) :
+    cv.append(_job('8/2012', 'Assistant Professor'))
+    cv.append(_job('8/2018', 'Associate Professor'))
+    assert cv.milestones() == Milestones('8/2012', '8/2018')
+    cv.extend([JournalArticle(key='Duck2010', year=2010),
+        JournalArticle(key='Duck2015', year=2015),
+        JournalArticle(key='Duck2021', year=2021),
+        JournalArticle(key='Duck2022', year=2022, post_tenure=False)])
+    periods = cv.classify_periods()['publication']
+    assert [x.key for x in periods['pre_appointment']] == ['Duck2010']
+    assert [x.key for x in periods['post_appointment_pre_tenure']] == \
+        ['Duck2015', 'Duck2022']
+    assert [x.key for x in periods['post_tenure']] == ['Duck2021']
+
+def test_no_tenure_keeps_set_flag (cv) :
+    'Without a tenure date, set_POST_TENURE is not undone.'
+    cv.append(_job('8/2012', 'Assistant Professor'))
+    recent.set_POST_APPOINTMENT()
+    recent.set_POST_TENURE()
+    cv.append(JournalArticle(key='Duck2021', year=2021))
+    cv.classify_periods()
+    assert cv.publication[0].post_appointment
+    assert cv.publication[0].post_tenure
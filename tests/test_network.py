@@ -0,0 +1,19 @@
+import os
+from CVtools2.network import CoauthorNetwork
+from CVtools2.publication import JournalArticle
+
+BIB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data',
+    'ducks.bib')
+
+def test_coauthors_apart () :
+    network = CoauthorNetwork(['D.~F. Duck'], bibliography = BIB)
+    network.add_publications([JournalArticle(key='Duck2018', year=2018),
+        JournalArticle(key='Duck2021', year=2021)])
+    assert len(network.authors(0)) == 3
+    assert network.names[network.authors(0)[0]] == 'Donald F. Duck'
+    assert network.strength('D. F. Duck', 'Daisy Duck') == 0.5
+    assert network.degree('Donald F. Duck') == 5
+    assert 'Daisy Duck' in network and 'Dewey Duck' in network
+    assert 'D. Duck' not in network # Donald, Daisy, or Dewey
+    assert network.components() == [['Donald F. Duck', 'Daisy Duck',
+        'Mickey Mouse', 'Huey Duck', 'Dewey Duck', 'Louie Duck']]
@@ -0,0 +1,38 @@
+from CVtools2 import constants
+from CVtools2.people import NameIndex, normalize_name, same_person
+from CVtools2.data import CV_data
+from CVtools2.publication import JournalArticle
+from CVtools2.employee import DoctoralStudent
+
+def test_normalize_name_is_a_block () :
+    assert normalize_name('Daisy Duck') == normalize_name('D.~F. Duck')
+    assert normalize_name('Smith, J.~T.') == 'smith j'
+
+def test_same_person () :
+    assert same_person('j t', 'john thomas')
+    assert same_person('d', 'donald f')
+    assert not same_person('d f', 'daisy')
+    assert not same_person('minnie', 'mickey')
+
+def test_name_index () :
+    names = NameIndex()
+    author = names.find('D.~F. Duck', True)
+    assert names.find('Duck, Donald F.', True) == author
+    assert names.find('Daisy Duck', True) != author
+    # "D. Duck" could be Donald or Daisy, so is neither
+    assert names.find('D. Duck') is None
+    assert names.find('Mickey Mouse', True) != names.find('Minnie Mouse',
+        True)
+
+def test_person_index (monkeypatch) :
+    monkeypatch.setattr(constants, 'AUTHOR', 'D.~F. Duck')
+    cv = CV_data()
+    cv.append(DoctoralStudent(first='Daisy', last='Duck',
+        start_date='8/2015', major='ChE'))
+    cv.append(JournalArticle(year=2018, author=['Duck, Donald F.',
+        'Daisy Duck'], student='Daisy Duck'))
+    index = cv.person_index()
+    assert index['D. F. Duck'] is not index['Daisy Duck']
+    assert index.is_student('Duck, Daisy')
+    assert not index.is_student('Donald F. Duck')
+    assert len(index['Daisy Duck'].publication) == 1
@@ -0,0 +1,27 @@
+from CVtools2 import constants
+from CVtools2.data import CV_data
+from CVtools2.service import Service, ReviewPanel
+
+def test_service_merge () :
+    service = Service(role='Chair', description='Pond committee',
+        start='2010', end='2012')
+    service.merge(Service(role='chair', description='Pond  committee',
+        start='2015', end=None))
+    service.merge(Service(role='Chair', description='Pond committee',
+        start='2011', end='2013'))
+    assert (service.start, service.end) == (['2010', '2015'], ['2013', None])
+    service.merge(Service(role='Chair', description='Pond committee',
+        start='2013', end='2016'))
+    assert (service.start, service.end) == ('2010', None)
+
+def test_append_merges (monkeypatch) :
+    monkeypatch.setattr(constants, 'AUTHOR', 'D.~F. Duck')
+    cv = CV_data()
+    cv.append(Service(role='Chair', description='Pond committee',
+        start='2010', end='2012'))
+    cv.append(Service(role='Chair', description='pond committee',
+        start='2012', end='2014'))
+    assert len(cv.service) == 1 and cv.service[0].end == '2014'
+    for i in range(2) :
+        cv.append(ReviewPanel(agency='NSF', division='Ponds', year=2019))
+    assert len(cv.panel) == 2
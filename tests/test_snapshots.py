@@ -0,0 +1,45 @@
+import pytest
+from CVtools2 import constants
+from CVtools2.data import CV_data
+from CVtools2.snapshots import Snapshot
+from CVtools2.publication import JournalArticle
+
+@pytest.fixture
+def cv (monkeypatch) :
+    monkeypatch.setattr(constants, 'AUTHOR', 'D.~F. Duck')
+    cv = CV_data()
+    cv.extend([JournalArticle(title='Quacking', year=2015, author='D. Duck'),
+        JournalArticle(key='Duck2016', year=2016)])
+    return cv
+
+def test_save_and_load (cv, tmp_path) :
+    cv.save_snapshot(str(tmp_path / 'review.json.gz'))
+    old = Snapshot.load(str(tmp_path / 'review.json.gz'))
+    assert old.collections == cv.snapshot().collections
+    assert not old.diff(cv.snapshot())
+
+def test_doi_keeps_identity (cv) :
+    old = cv.snapshot()
+    cv.publication[0].doi = '10.1000/quack' # e.g. by backfill_metadata
+    cv.publication[0].ncites_scopus = 4
+    diff = cv.mark_recent(old)
+    assert diff.summary() == {}
+    assert not any(x.recent for x in cv.publication)
+
+def test_added_and_changed (cv) :
+    old = cv.snapshot()
+    cv.append(JournalArticle(key='Duck2024', year=2024))
+    cv.publication[0].doi = '10.1000/quack'
+    cv.publication[0].pages = '1--10'
+    diff = cv.mark_recent(old, changed = False)
+    assert diff.summary() == {'publication': (1, 0, 1)}
+    assert [x.recent for x in cv.publication] == [False, False, True]
+    cv.mark_recent(old)
+    assert [x.recent for x in cv.publication] == [True, False, True]
+
+def test_merge_is_a_removal (cv) :
+    cv.append(JournalArticle(title='Quacking', year=2015, author='D. Duck',
+        doi='10.1000/quack'))
+    old = cv.snapshot()
+    assert len(cv.purge_duplicate_publications()) == 1
+    assert cv.mark_recent(old).summary() == {'publication': (0, 1, 0)}
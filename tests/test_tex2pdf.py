@@ -0,0 +1,35 @@
+import os
+import pytest
+from CVtools2 import constants, tex2pdf
+
+class FakePdflatex :
+    'Stands in for pdflatex -ini: writes the format and the .fls file.'
+    runs = 0
+    def __init__ (self, command, **kwargs) :
+        FakePdflatex.runs += 1
+        option = lambda name : [x for x in command if
+            x.startswith(name)][0].split('=', 1)[1]
+        stem = os.path.join(option('-output-directory'), option('-jobname'))
+        open(stem + '.fmt', 'w').close()
+        with open(stem + '.fls', 'w') as fls :
+            for name in ('MU-dossier.cls', command[-1]) :
+                print ('INPUT', name, file = fls)
+    def wait (self) :
+        return 0
+
+def test_preamble_format (tmp_path, monkeypatch) :
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(constants, 'FORMAT_CACHE', str(tmp_path / 'cache'))
+    monkeypatch.setattr(tex2pdf.subprocess, 'Popen', FakePdflatex)
+    (tmp_path / 'MU-dossier.cls').write_text('% class\n')
+    (tmp_path / 'dossier.tex').write_text('\\documentclass{MU-dossier}\n' +
+        '\\begin{document}\nHello\n\\end{document}\n')
+    fmt = tex2pdf.preamble_format('dossier.tex')
+    assert fmt is not None and FakePdflatex.runs == 1
+    (tmp_path / 'dossier.tex').write_text('\\documentclass{MU-dossier}\n' +
+        '\\begin{document}\nGoodbye\n\\end{document}\n')
+    assert tex2pdf.preamble_format('dossier.tex') == fmt
+    assert FakePdflatex.runs == 1 # the body does not matter
+    os.utime(tmp_path / 'MU-dossier.cls', (1, 1))
+    assert tex2pdf.preamble_format('dossier.tex') == fmt
+    assert FakePdflatex.runs == 2 # the class changed
@@ -0,0 +1,35 @@
+import textwrap
+from CVtools2 import watch
+
+SCRIPT = '''
+from CVtools2 import *
+set_AUTHOR('D.~F. Duck')
+CV = CV_data()
+CV.append(JournalArticle(key='Duck2010', year=2010))
+set_RECENT()
+set_POST_TENURE()
+CV.append(JournalArticle(key='Duck2021', year=2021))
+'''
+
+def _flags (namespace) :
+    return [(x.key, x.recent, x.post_appointment, x.post_tenure) \
+        for x in namespace['CV'].publication]
+
+def test_reruns_start_afresh (tmp_path) :
+    'A second run makes the same entries as the first.'
+    script = tmp_path / 'cv.py'
+    script.write_text(textwrap.dedent(SCRIPT))
+    saved = watch.settings()
+    try :
+        first = _flags(watch._run(str(script), (), saved))
+        second = _flags(watch._run(str(script), (), saved))
+    finally :
+        watch.restore(saved)
+    assert first == second
+    assert first[0] == ('Duck2010', False, False, False)
+    assert first[1] == ('Duck2021', True, False, True)
+
+def test_submodule () :
+    import CVtools2
+    assert CVtools2.watch is watch
+    assert callable(CVtools2.watch_CV)